@@ -0,0 +1,283 @@
+"""Throughput and allocation regression suite for the adapter and streaming hot paths.
+
+Every case runs on realistic fixtures (200-turn chats, multimodal parts, 10k-delta
+streams) and reports ops/sec, the peak memory traced during one call and the memory
+blocks still held by its result. Baselines live in ``benchmarks/baselines/hotpaths.json``.
+
+Run with ``python benchmarks/bench_hotpaths.py [--check] [--update] [--cases a,b]``.
+``--check`` exits non-zero when a case regresses past the tolerances. Memory figures
+are compared whenever the Python version matches the baseline; ops/sec only when the
+baseline was recorded on the same architecture and interpreter.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gc
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from openai_responses_bridge import codec  # noqa: E402
+from openai_responses_bridge.adapter import (  # noqa: E402
+    _normalize_message_content,
+    build_responses_request,
+    extract_text_from_response,
+    to_chat_completions,
+    to_completions,
+)
+from openai_responses_bridge.streaming import stream_chat_completions, stream_completions  # noqa: E402
+
+BASELINE = ROOT / "benchmarks" / "baselines" / "hotpaths.json"
+STREAM_DELTAS = 10000
+CHUNK_SIZE = 4096
+
+
+def chat_payload(turns: int = 200) -> Dict[str, Any]:
+    messages: List[Dict[str, Any]] = [{"role": "system", "content": "You are a careful assistant. " * 8}]
+    for turn in range(turns):
+        if turn % 2 == 0:
+            content = f"Question {turn}: how does step {turn} of the migration affect the schema? " * 3
+            messages.append({"role": "user", "content": content})
+        else:
+            content = f"Step {turn} adds a nullable column, backfills it in batches and then adds the index. " * 6
+            messages.append({"role": "assistant", "content": content})
+    return {"model": "gpt-4o", "messages": messages, "temperature": 0.2, "max_tokens": 1024}
+
+
+def multimodal_content() -> List[Any]:
+    inline = "data:image/png;base64," + "iVBORw0KGgo" * 2000
+    parts: List[Any] = []
+    for index in range(8):
+        parts.append({"type": "text", "text": f"Compare figure {index} with the previous one."})
+        remote = {"url": f"https://example.com/fig{index}.png", "detail": "high"}
+        parts.append({"type": "image_url", "image_url": remote})
+        parts.append({"type": "image_url", "image_url": {"url": inline, "detail": "low"}})
+        parts.append(f"Note {index}")
+    return parts
+
+
+def multimodal_payload() -> Dict[str, Any]:
+    messages = [{"role": "user", "content": multimodal_content()} for _ in range(4)]
+    return {"model": "gpt-4o", "messages": messages, "max_completion_tokens": 512}
+
+
+def response_body(items: int = 20) -> Dict[str, Any]:
+    output = [{"type": "reasoning", "summary": []}]
+    for index in range(items):
+        text = f"Paragraph {index} explains the change and its rollout plan in detail. " * 12
+        output.append({"type": "message", "role": "assistant", "content": [{"type": "output_text", "text": text}]})
+    return {
+        "id": "resp_bench",
+        "object": "response",
+        "created": 1700000000,
+        "model": "gpt-4o",
+        "output": output,
+        "usage": {"input_tokens": 12000, "output_tokens": 4000, "total_tokens": 16000},
+    }
+
+
+def upstream_stream(deltas: int = STREAM_DELTAS) -> List[bytes]:
+    events = []
+    for index in range(deltas):
+        event = {
+            "type": "response.output_text.delta",
+            "item_id": "msg_1",
+            "output_index": 0,
+            "content_index": 0,
+            "delta": f" tok{index}",
+            "sequence_number": index,
+        }
+        events.append(b"event: response.output_text.delta\ndata: " + codec.dumps(event) + b"\n\n")
+    completed = {"type": "response.completed", "response": {"id": "resp_1", "status": "completed"}}
+    events.append(b"event: response.completed\ndata: " + codec.dumps(completed) + b"\n\n")
+    raw = b"".join(events)
+    return [raw[start:start + CHUNK_SIZE] for start in range(0, len(raw), CHUNK_SIZE)]
+
+
+def _drain(translate: Callable[..., AsyncIterator[bytes]], chunks: List[bytes], **options: Any) -> Callable[[], int]:
+    loop = asyncio.new_event_loop()
+
+    async def source() -> AsyncIterator[bytes]:
+        for chunk in chunks:
+            yield chunk
+
+    async def consume() -> int:
+        frames = 0
+        async for _ in translate(source(), **options):
+            frames += 1
+        return frames
+
+    return lambda: loop.run_until_complete(consume())
+
+
+def build_cases() -> Dict[str, Callable[[], Any]]:
+    chat = chat_payload()
+    multimodal = multimodal_payload()
+    content = multimodal_content()
+    body = response_body()
+    raw_body = codec.dumps(body)
+    chunks = upstream_stream()
+    return {
+        "build_request_chat_200": lambda: build_responses_request(chat, {}),
+        "build_request_multimodal": lambda: build_responses_request(multimodal, {}),
+        "normalize_content_multimodal": lambda: _normalize_message_content(content),
+        "encode_request_chat_200": lambda: codec.dumps(build_responses_request(chat, {})),
+        "extract_text": lambda: extract_text_from_response(body["output"]),
+        "to_chat_completions": lambda: to_chat_completions(body),
+        "to_completions": lambda: to_completions(body),
+        "decode_and_convert_reply": lambda: codec.dumps(to_chat_completions(codec.loads(raw_body))),
+        "stream_chat_10k": _drain(stream_chat_completions, chunks),
+        "stream_completions_10k": _drain(stream_completions, chunks),
+        "stream_chat_10k_coalesced": _drain(stream_chat_completions, chunks, coalesce=(256, 0.005)),
+    }
+
+
+def measure_speed(func: Callable[[], Any], min_time: float = 0.2, repeat: int = 5) -> float:
+    func()
+    iterations = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time / repeat:
+            break
+        iterations *= 2
+    best = elapsed
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        best = min(best, time.perf_counter() - start)
+    return iterations / best
+
+
+def measure_memory(func: Callable[[], Any]) -> Dict[str, float]:
+    func()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        result = func()
+        current, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    blocks = sum(stat.count_diff for stat in after.compare_to(before, "filename") if stat.count_diff > 0)
+    del result
+    return {
+        "peak_kb": round((peak - baseline) / 1024, 1),
+        "retained_kb": round((current - baseline) / 1024, 1),
+        "alloc_blocks": blocks,
+    }
+
+
+def machine() -> str:
+    # Architecture and interpreter only: the baseline is committed, so it must not carry the host name.
+    return f"{platform.machine()}/{platform.python_implementation()}-{platform.python_version()}"
+
+
+def python_version() -> str:
+    return ".".join(platform.python_version_tuple()[:2])
+
+
+def run(names: Optional[List[str]], timing: bool) -> Dict[str, Any]:
+    cases = build_cases()
+    results: Dict[str, Any] = {}
+    for name, func in cases.items():
+        if names and name not in names:
+            continue
+        entry: Dict[str, Any] = measure_memory(func)
+        if timing:
+            entry["ops_per_sec"] = round(measure_speed(func), 1)
+        results[name] = entry
+    return {"python": python_version(), "machine": machine(), "cases": results}
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], tolerance: float, time_tolerance: float) -> List[str]:
+    failures: List[str] = []
+    same_python = baseline.get("python") == current["python"]
+    same_machine = baseline.get("machine") == current["machine"]
+    if not same_python:
+        print(f"memory checks skipped: baseline is Python {baseline.get('python')}, running {current['python']}")
+    if not same_machine:
+        print("throughput checks skipped: baseline was recorded on another architecture or interpreter")
+    for name, measured in current["cases"].items():
+        expected = baseline.get("cases", {}).get(name)
+        if expected is None:
+            print(f"{name:<30} no baseline")
+            continue
+        if same_python:
+            for key in ("peak_kb", "alloc_blocks"):
+                # Small absolute slack keeps tiny cases from failing on a single extra object.
+                limit = expected[key] * (1 + tolerance) + (4 if key == "peak_kb" else 8)
+                if measured[key] > limit:
+                    failures.append(f"{name}: {key} {measured[key]} > {expected[key]} (+{tolerance:.0%})")
+        if same_machine and "ops_per_sec" in measured and "ops_per_sec" in expected:
+            floor = expected["ops_per_sec"] * (1 - time_tolerance)
+            if measured["ops_per_sec"] < floor:
+                failures.append(
+                    f"{name}: {measured['ops_per_sec']} ops/s < {expected['ops_per_sec']} (-{time_tolerance:.0%})"
+                )
+    return failures
+
+
+def report(current: Dict[str, Any], baseline: Optional[Dict[str, Any]]) -> None:
+    print(f"{'case':<30} {'ops/s':>12} {'peak KB':>10} {'kept KB':>10} {'blocks':>8} {'vs base':>9}")
+    for name, entry in current["cases"].items():
+        ops = entry.get("ops_per_sec")
+        delta = ""
+        expected = (baseline or {}).get("cases", {}).get(name, {})
+        if ops and expected.get("ops_per_sec"):
+            delta = f"{ops / expected['ops_per_sec'] - 1:+.1%}"
+        ops_text = f"{ops:12.1f}" if ops else f"{'-':>12}"
+        print(
+            f"{name:<30} {ops_text} {entry['peak_kb']:10.1f} {entry['retained_kb']:10.1f} "
+            f"{entry['alloc_blocks']:8d} {delta:>9}"
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cases", help="comma-separated case names to run")
+    parser.add_argument("--check", action="store_true", help="fail when a case regresses past the tolerances")
+    parser.add_argument("--update", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--no-timing", action="store_true", help="only measure memory")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed memory growth (default 0.10)")
+    parser.add_argument("--time-tolerance", type=float, default=0.25, help="allowed ops/sec drop (default 0.25)")
+    parser.add_argument("--baseline", default=str(BASELINE))
+    args = parser.parse_args(argv)
+
+    path = Path(args.baseline)
+    baseline = json.loads(path.read_text()) if path.exists() else None
+    names = [name.strip() for name in args.cases.split(",")] if args.cases else None
+    current = run(names, timing=not args.no_timing)
+    report(current, baseline)
+
+    if args.update:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(current, indent=2, sort_keys=True) + "\n")
+        print(f"baseline written to {path}")
+    if args.check:
+        if baseline is None:
+            print(f"no baseline at {path}; run with --update first")
+            return 1
+        failures = compare(baseline, current, args.tolerance, args.time_tolerance)
+        for failure in failures:
+            print(f"REGRESSION {failure}")
+        return 1 if failures else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+"""Peak memory per request for multimodal chat payloads, with and without image offload.
+
+Measures the bridge's request path from the raw client body to the encoded upstream body:
+JSON decode, ``build_responses_request``, image offload (store already warm, so no upload),
+and JSON encode. Run with ``python benchmarks/bench_images.py [--images N] [--image-mb N]``.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import base64
+import os
+import sys
+import tracemalloc
+from pathlib import Path
+from typing import Any, Dict
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from openai_responses_bridge import codec  # noqa: E402
+from openai_responses_bridge.adapter import build_responses_request  # noqa: E402
+from openai_responses_bridge.images import ImageStore, offload_images  # noqa: E402
+
+
+def build_body(images: int, image_bytes: int) -> bytes:
+    content: list = [{"type": "text", "text": "what changed between these screenshots?"}]
+    for index in range(images):
+        data = base64.b64encode(os.urandom(image_bytes)).decode("ascii")
+        content.append({"type": "image_url", "image_url": {"url": f"data:image/png;base64,{data}"}})
+        del data
+    payload: Dict[str, Any] = {"model": "gpt-4.1", "messages": [{"role": "user", "content": content}]}
+    return codec.dumps(payload)
+
+
+async def _upload(mime: str, data: str) -> str:
+    return "file-%d" % len(data)
+
+
+async def request_path(body: bytes, store: ImageStore = None) -> int:
+    payload = build_responses_request(codec.loads(body), {})
+    if store is not None:
+        await offload_images(payload, store, _upload, 64 * 1024)
+    return len(codec.dumps(payload))
+
+
+def measure(label: str, body: bytes, store: ImageStore = None) -> None:
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    upstream_bytes = asyncio.run(request_path(body, store))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(
+        f"{label:<10} peak {peak / 1024 / 1024:8.1f} MB  ({peak / len(body):4.2f}x body)  "
+        f"upstream body {upstream_bytes / 1024:10.1f} KB"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=4)
+    parser.add_argument("--image-mb", type=float, default=2.0)
+    args = parser.parse_args()
+
+    body = build_body(args.images, int(args.image_mb * 1024 * 1024))
+    print(f"client body {len(body) / 1024 / 1024:.1f} MB")
+    measure("inline", body)
+    store = ImageStore(max_entries=64)
+    asyncio.run(request_path(body, store))
+    measure("offload", body, store)
+
+
+if __name__ == "__main__":
+    main()
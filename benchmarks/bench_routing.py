@@ -0,0 +1,55 @@
+"""Per-request model routing cost as the rule count grows.
+
+Compares re-parsing ``MODEL_MAP`` on every request (the previous behaviour) with the
+compiled routing table: exact lookups, memoized pattern matches, and a cold pattern scan.
+Run with ``python benchmarks/bench_routing.py [--rules 10,1000,10000]``.
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import timeit
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from openai_responses_bridge import codec  # noqa: E402
+from openai_responses_bridge.config import Settings  # noqa: E402
+from openai_responses_bridge.routing import RoutingTable  # noqa: E402
+
+
+def _ns(stmt, number: int) -> float:
+    return min(timeit.repeat(stmt, number=number, repeat=5)) / number * 1e9
+
+
+def run(count: int, number: int) -> None:
+    model_map = {f"alias-{i}": f"target-{i}" for i in range(count)}
+    settings = Settings(model_map=codec.dumps(model_map).decode())
+    rules = [{"match": f"family-{i}-*", "model": f"target-{i}"} for i in range(count)]
+    table = RoutingTable.from_sources(model_map, rules)
+    last_exact = f"alias-{count - 1}"
+    last_pattern = f"family-{count - 1}-large"
+    table.resolve(last_pattern)
+
+    reparse = _ns(lambda: settings.resolved_model_map().get(last_exact), max(number // count, 10))
+    exact = _ns(lambda: table.resolve(last_exact), number)
+    memoized = _ns(lambda: table.resolve(last_pattern), number)
+    cold = _ns(lambda: (table._memo.clear(), table.resolve(last_pattern)), max(number // count, 10))
+    print(
+        f"{count:>6} rules  reparse {reparse:12.0f} ns  exact {exact:6.0f} ns  "
+        f"pattern (memoized) {memoized:6.0f} ns  prefix (cold, last rule) {cold:10.0f} ns"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rules", default="10,1000,10000")
+    parser.add_argument("--number", type=int, default=200000)
+    args = parser.parse_args()
+    for count in (int(item) for item in args.rules.split(",")):
+        run(count, args.number)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""Per-token overhead of the SSE translators versus the line-based baseline.
+
+Run with ``python benchmarks/bench_streaming.py [--tokens N] [--chunk-size N]``.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+from typing import AsyncIterator, Dict, List
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from openai_responses_bridge.streaming import stream_chat_completions  # noqa: E402
+
+
+def _legacy_sse(data: Dict) -> bytes:
+    return f"data: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8")
+
+
+async def legacy_stream_chat_completions(lines: AsyncIterator[str]) -> AsyncIterator[bytes]:
+    async for line in lines:
+        if not line.startswith("data: "):
+            continue
+        payload = line[6:].strip()
+        if payload == "[DONE]":
+            yield b"data: [DONE]\n\n"
+            continue
+        try:
+            event = json.loads(payload)
+        except json.JSONDecodeError:
+            continue
+        event_type = event.get("type")
+        if event_type == "response.output_text.delta":
+            delta = event.get("delta") or event.get("text") or ""
+            yield _legacy_sse(
+                {
+                    "id": "chatcmpl-adapter",
+                    "object": "chat.completion.chunk",
+                    "choices": [{"index": 0, "delta": {"content": delta}, "finish_reason": None}],
+                }
+            )
+        elif event_type == "response.completed":
+            yield _legacy_sse(
+                {
+                    "id": "chatcmpl-adapter",
+                    "object": "chat.completion.chunk",
+                    "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                }
+            )
+            yield b"data: [DONE]\n\n"
+
+
+def build_upstream_stream(tokens: int) -> bytes:
+    events = []
+    for i in range(tokens):
+        event = {
+            "type": "response.output_text.delta",
+            "item_id": "msg_1",
+            "output_index": 0,
+            "content_index": 0,
+            "delta": " tok%d" % i,
+            "sequence_number": i,
+        }
+        events.append(b"event: response.output_text.delta\ndata: " + json.dumps(event).encode() + b"\n\n")
+    completed = {"type": "response.completed", "response": {"id": "resp_1", "status": "completed"}}
+    events.append(b"event: response.completed\ndata: " + json.dumps(completed).encode() + b"\n\n")
+    return b"".join(events)
+
+
+def split_chunks(raw: bytes, size: int) -> List[bytes]:
+    return [raw[i:i + size] for i in range(0, len(raw), size)]
+
+
+async def _drain_bytes(chunks: List[bytes]) -> int:
+    async def source() -> AsyncIterator[bytes]:
+        for chunk in chunks:
+            yield chunk
+
+    count = 0
+    async for _ in stream_chat_completions(source()):
+        count += 1
+    return count
+
+
+async def _drain_legacy(chunks: List[bytes]) -> int:
+    async def source() -> AsyncIterator[str]:
+        # Mirrors httpx's aiter_lines(): decode each chunk and split into lines.
+        pending = ""
+        for chunk in chunks:
+            pending += chunk.decode("utf-8")
+            lines = pending.split("\n")
+            pending = lines.pop()
+            for line in lines:
+                yield line
+        if pending:
+            yield pending
+
+    count = 0
+    async for _ in legacy_stream_chat_completions(source()):
+        count += 1
+    return count
+
+
+def measure(label: str, func, chunks: List[bytes], tokens: int, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        asyncio.run(func(chunks))
+        best = min(best, time.perf_counter() - start)
+    per_token_ns = best / tokens * 1e9
+    print(f"{label:<10} {best * 1000:8.2f} ms total  {per_token_ns:8.0f} ns/token")
+    return per_token_ns
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tokens", type=int, default=10000)
+    parser.add_argument("--chunk-size", type=int, default=4096)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    chunks = split_chunks(build_upstream_stream(args.tokens), args.chunk_size)
+    legacy = measure("legacy", _drain_legacy, chunks, args.tokens, args.repeat)
+    current = measure("bytes", _drain_bytes, chunks, args.tokens, args.repeat)
+    print(f"speedup    {legacy / current:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
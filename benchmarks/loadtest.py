@@ -0,0 +1,263 @@
+"""End-to-end load test of the bridge against a local mock Responses upstream.
+
+Starts ``mock_upstream.py`` and the bridge as separate uvicorn processes on localhost,
+drives each route at the configured concurrency, and reports throughput, latency
+overhead over calling the mock directly, time to first token, and the bridge
+process's CPU time per request and memory high-water mark. Runs fully offline.
+
+    python benchmarks/loadtest.py --requests 2000 --concurrency 32 --output results.json
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+import orjson
+
+ROOT = Path(__file__).resolve().parents[1]
+
+SCENARIOS: Dict[str, Tuple[str, bool]] = {
+    "chat": ("/v1/chat/completions", False),
+    "chat-stream": ("/v1/chat/completions", True),
+    "completions": ("/v1/completions", False),
+    "completions-stream": ("/v1/completions", True),
+    "responses": ("/v1/responses", False),
+    "responses-stream": ("/v1/responses", True),
+}
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _clock_ticks() -> int:
+    return os.sysconf("SC_CLK_TCK")
+
+
+def process_cpu_seconds(pid: int) -> float:
+    fields = Path(f"/proc/{pid}/stat").read_text().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / _clock_ticks()
+
+
+def process_peak_rss_kb(pid: int) -> int:
+    for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+        if line.startswith("VmHWM:"):
+            return int(line.split()[1])
+    return 0
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def _start(args: List[str], env: Dict[str, str]) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", *args, "--log-level", "warning"],
+        env={**os.environ, **env},
+        cwd=str(ROOT),
+        stdout=subprocess.DEVNULL,
+    )
+
+
+def _wait_ready(url: str, timeout: float = 20.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    raise RuntimeError(f"server at {url} did not become ready")
+
+
+def _payload(path: str, stream: bool, prompt_bytes: int) -> Dict[str, Any]:
+    text = "x" * prompt_bytes
+    if path == "/v1/chat/completions":
+        return {"model": "mock-model", "stream": stream, "messages": [{"role": "user", "content": text}]}
+    if path == "/v1/completions":
+        return {"model": "mock-model", "stream": stream, "prompt": text}
+    return {"model": "mock-model", "stream": stream, "input": text}
+
+
+def _upstream_payload(path: str, stream: bool, prompt_bytes: int) -> Dict[str, Any]:
+    sys.path.insert(0, str(ROOT / "src"))
+    from openai_responses_bridge.adapter import build_responses_request
+
+    payload = _payload(path, stream, prompt_bytes)
+    if path == "/v1/responses":
+        return payload
+    return build_responses_request(payload, {})
+
+
+async def _one(client: httpx.AsyncClient, url: str, body: bytes, stream: bool) -> Tuple[float, Optional[float], bool]:
+    start = time.perf_counter()
+    headers = {"Content-Type": "application/json", "Authorization": "Bearer load-test"}
+    try:
+        if not stream:
+            response = await client.post(url, content=body, headers=headers)
+            return time.perf_counter() - start, None, response.status_code < 400
+        first: Optional[float] = None
+        async with client.stream("POST", url, content=body, headers=headers) as response:
+            async for _ in response.aiter_bytes():
+                if first is None:
+                    first = time.perf_counter() - start
+            ok = response.status_code < 400
+        return time.perf_counter() - start, first, ok
+    except httpx.HTTPError:
+        return time.perf_counter() - start, None, False
+
+
+async def drive(url: str, body: bytes, stream: bool, requests: int, concurrency: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+    ttfts: List[float] = []
+    errors = 0
+    remaining = requests
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(timeout=60.0, limits=limits) as client:
+
+        async def worker() -> None:
+            nonlocal remaining, errors
+            while remaining > 0:
+                remaining -= 1
+                latency, ttft, ok = await _one(client, url, body, stream)
+                if not ok:
+                    errors += 1
+                    continue
+                latencies.append(latency)
+                if ttft is not None:
+                    ttfts.append(ttft)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    return {
+        "requests": requests,
+        "errors": errors,
+        "elapsed_s": elapsed,
+        "throughput_rps": requests / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "ttft_p50_ms": percentile(ttfts, 50) * 1000 if ttfts else None,
+        "ttft_p99_ms": percentile(ttfts, 99) * 1000 if ttfts else None,
+    }
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=str(ROOT), text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma separated scenario names")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--prompt-bytes", type=int, default=1024)
+    parser.add_argument("--tokens", type=int, default=64)
+    parser.add_argument("--token-interval-ms", type=float, default=0.0)
+    parser.add_argument("--token-bytes", type=int, default=4)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--output", help="write machine-readable results to this JSON file")
+    parser.add_argument("--compare", help="print deltas against a previous --output file")
+    args = parser.parse_args()
+
+    mock_port, bridge_port = _free_port(), _free_port()
+    mock_env = {
+        "MOCK_TOKENS": str(args.tokens),
+        "MOCK_TOKEN_INTERVAL_MS": str(args.token_interval_ms),
+        "MOCK_TOKEN_BYTES": str(args.token_bytes),
+        "MOCK_LATENCY_MS": str(args.latency_ms),
+        "MOCK_FAILURE_RATE": str(args.failure_rate),
+    }
+    bridge_env = {"UPSTREAM_BASE_URL": f"http://127.0.0.1:{mock_port}", "LOG_LEVEL": "WARNING"}
+    mock = _start(["--app-dir", "benchmarks", "mock_upstream:app", "--port", str(mock_port)], mock_env)
+    bridge = _start(
+        ["--app-dir", "src", "openai_responses_bridge.main:app", "--port", str(bridge_port)], bridge_env
+    )
+    results: Dict[str, Any] = {
+        "commit": _git_commit(),
+        "timestamp": time.time(),
+        "config": vars(args),
+        "scenarios": {},
+    }
+    try:
+        _wait_ready(f"http://127.0.0.1:{mock_port}/")
+        _wait_ready(f"http://127.0.0.1:{bridge_port}/healthz")
+        for name in [item.strip() for item in args.scenarios.split(",") if item.strip()]:
+            path, stream = SCENARIOS[name]
+            body = orjson.dumps(_payload(path, stream, args.prompt_bytes))
+            upstream_body = orjson.dumps(_upstream_payload(path, stream, args.prompt_bytes))
+            mock_url = f"http://127.0.0.1:{mock_port}/v1/responses"
+            bridge_url = f"http://127.0.0.1:{bridge_port}{path}"
+
+            asyncio.run(drive(bridge_url, body, stream, args.warmup, args.concurrency))
+            baseline = asyncio.run(drive(mock_url, upstream_body, stream, args.requests, args.concurrency))
+            cpu_before = process_cpu_seconds(bridge.pid)
+            measured = asyncio.run(drive(bridge_url, body, stream, args.requests, args.concurrency))
+            cpu_used = process_cpu_seconds(bridge.pid) - cpu_before
+
+            measured["overhead_p50_ms"] = measured["p50_ms"] - baseline["p50_ms"]
+            measured["overhead_p99_ms"] = measured["p99_ms"] - baseline["p99_ms"]
+            measured["cpu_ms_per_request"] = cpu_used / args.requests * 1000
+            measured["peak_rss_kb"] = process_peak_rss_kb(bridge.pid)
+            results["scenarios"][name] = {"bridge": measured, "direct": baseline}
+            print(
+                f"{name:<20} {measured['throughput_rps']:8.0f} rps  "
+                f"overhead p50 {measured['overhead_p50_ms']:6.2f} ms  p99 {measured['overhead_p99_ms']:6.2f} ms  "
+                f"cpu {measured['cpu_ms_per_request']:5.2f} ms/req  "
+                f"rss {measured['peak_rss_kb'] / 1024:6.1f} MB  errors {measured['errors']}"
+                + (f"  ttft p50 {measured['ttft_p50_ms']:.2f} ms" if measured["ttft_p50_ms"] is not None else "")
+            )
+    finally:
+        for proc in (bridge, mock):
+            proc.send_signal(signal.SIGINT)
+        for proc in (bridge, mock):
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+    if args.output:
+        Path(args.output).write_bytes(orjson.dumps(results, option=orjson.OPT_INDENT_2))
+    if args.compare:
+        compare(orjson.loads(Path(args.compare).read_bytes()), results)
+
+
+def compare(previous: Dict[str, Any], current: Dict[str, Any]) -> None:
+    print(f"compared with {previous.get('commit', 'unknown')[:12]}")
+    keys = ("throughput_rps", "overhead_p50_ms", "overhead_p99_ms", "cpu_ms_per_request", "peak_rss_kb")
+    for name, result in current["scenarios"].items():
+        before = previous.get("scenarios", {}).get(name)
+        if before is None:
+            continue
+        deltas = []
+        for key in keys:
+            old, new = before["bridge"].get(key), result["bridge"].get(key)
+            if old:
+                deltas.append(f"{key} {(new - old) / abs(old) * 100:+.1f}%")
+        print(f"{name:<20} " + "  ".join(deltas))
+
+
+if __name__ == "__main__":
+    main()
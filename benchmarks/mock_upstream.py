@@ -0,0 +1,132 @@
+"""Local mock of the Responses API for load tests.
+
+Serve with ``python -m uvicorn --app-dir benchmarks mock_upstream:app``. Behaviour is
+configured through environment variables:
+
+- ``MOCK_TOKENS``: number of output deltas per response (default 64)
+- ``MOCK_TOKEN_INTERVAL_MS``: delay between streamed deltas (default 0)
+- ``MOCK_LATENCY_MS``: delay before the response headers (default 0)
+- ``MOCK_TOKEN_BYTES``: size of each delta in bytes (default 4)
+- ``MOCK_FAILURE_RATE``: fraction of requests answered with a 500 (default 0)
+- ``MOCK_GENERATION_MS``: time a non-streaming response takes to generate (default 0)
+
+Like a real upstream, generation stops when the caller disconnects; ``GET /mock/stats``
+reports requests still generating and those abandoned by their caller.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import random
+import time
+from typing import Any, AsyncIterator, Dict
+
+import orjson
+from fastapi import FastAPI, Request
+from fastapi.responses import Response, StreamingResponse
+
+TOKENS = int(os.environ.get("MOCK_TOKENS", "64"))
+TOKEN_INTERVAL = float(os.environ.get("MOCK_TOKEN_INTERVAL_MS", "0")) / 1000
+LATENCY = float(os.environ.get("MOCK_LATENCY_MS", "0")) / 1000
+TOKEN_BYTES = int(os.environ.get("MOCK_TOKEN_BYTES", "4"))
+FAILURE_RATE = float(os.environ.get("MOCK_FAILURE_RATE", "0"))
+GENERATION = float(os.environ.get("MOCK_GENERATION_MS", "0")) / 1000
+
+STATS = {"active": 0, "aborted": 0}
+
+app = FastAPI()
+
+_TOKEN = ("x" * TOKEN_BYTES)
+
+
+def _event(name: str, data: Dict[str, Any]) -> bytes:
+    return b"event: " + name.encode() + b"\ndata: " + orjson.dumps(data) + b"\n\n"
+
+
+def _response_body(model: str) -> Dict[str, Any]:
+    return {
+        "id": "resp_mock",
+        "object": "response",
+        "created": int(time.time()),
+        "model": model,
+        "status": "completed",
+        "output": [
+            {
+                "type": "message",
+                "role": "assistant",
+                "content": [{"type": "output_text", "text": _TOKEN * TOKENS}],
+            }
+        ],
+        "usage": {"input_tokens": 10, "output_tokens": TOKENS, "total_tokens": 10 + TOKENS},
+    }
+
+
+async def _stream(model: str) -> AsyncIterator[bytes]:
+    STATS["active"] += 1
+    try:
+        yield _event("response.created", {"type": "response.created", "response": {"id": "resp_mock"}})
+        for index in range(TOKENS):
+            if TOKEN_INTERVAL:
+                await asyncio.sleep(TOKEN_INTERVAL)
+            yield _event(
+                "response.output_text.delta",
+                {
+                    "type": "response.output_text.delta",
+                    "item_id": "msg_mock",
+                    "output_index": 0,
+                    "content_index": 0,
+                    "delta": _TOKEN,
+                    "sequence_number": index,
+                },
+            )
+        yield _event("response.completed", {"type": "response.completed", "response": _response_body(model)})
+    except BaseException:
+        STATS["aborted"] += 1
+        raise
+    finally:
+        STATS["active"] -= 1
+
+
+async def _generate(request: Request) -> bool:
+    deadline = time.monotonic() + GENERATION
+    STATS["active"] += 1
+    try:
+        while time.monotonic() < deadline:
+            await asyncio.sleep(min(0.01, GENERATION))
+            if await request.is_disconnected():
+                STATS["aborted"] += 1
+                return False
+        return True
+    finally:
+        STATS["active"] -= 1
+
+
+@app.post("/v1/responses")
+async def responses(request: Request) -> Response:
+    payload = orjson.loads(await request.body())
+    if LATENCY:
+        await asyncio.sleep(LATENCY)
+    if FAILURE_RATE and random.random() < FAILURE_RATE:
+        return Response(status_code=500, content=b'{"error":"mock_failure"}', media_type="application/json")
+    model = payload.get("model") or "mock-model"
+    if payload.get("stream"):
+        return StreamingResponse(_stream(model), media_type="text/event-stream")
+    if GENERATION and not await _generate(request):
+        return Response(status_code=499)
+    return Response(content=orjson.dumps(_response_body(model)), media_type="application/json")
+
+
+@app.get("/v1/models")
+async def models() -> Response:
+    return Response(content=b'{"object":"list","data":[{"id":"mock-model","object":"model"}]}')
+
+
+@app.get("/mock/stats")
+async def stats() -> Dict[str, int]:
+    return STATS
+
+
+@app.head("/")
+@app.get("/")
+async def root() -> Response:
+    return Response(status_code=204)
@@ -10,6 +10,21 @@ def map_model(model: Optional[str], model_map: Dict[str, str]) -> Optional[str]:
     return model_map.get(model, model)
 
 
+def alias_models(data: Dict[str, Any], model_map: Dict[str, str]) -> Dict[str, Any]:
+    entries = data.get("data")
+    if not model_map or not isinstance(entries, list):
+        return data
+    by_id = {entry.get("id"): entry for entry in entries if isinstance(entry, dict)}
+    aliases = []
+    for alias, target in model_map.items():
+        if alias in by_id or target not in by_id:
+            continue
+        aliases.append({**by_id[target], "id": alias})
+    if not aliases:
+        return data
+    return {**data, "data": entries + aliases}
+
+
 def _to_input_image(part: Dict[str, Any]) -> Dict[str, Any]:
     item: Dict[str, Any] = {"type": "input_image"}
     image_url = part.get("image_url")
@@ -164,3 +179,17 @@ def to_completions(response: Dict[str, Any]) -> Dict[str, Any]:
             "total_tokens": total_tokens,
         },
     }
+
+
+def merge_choices(replies: List[Dict[str, Any]]) -> Dict[str, Any]:
+    choices = []
+    usage: Dict[str, Any] = {}
+    for index, reply in enumerate(replies):
+        for choice in reply.get("choices", []):
+            choices.append({**choice, "index": index})
+        for key, value in (reply.get("usage") or {}).items():
+            if value is None:
+                usage.setdefault(key, None)
+            else:
+                usage[key] = (usage.get(key) or 0) + value
+    return {**replies[0], "choices": choices, "usage": usage}
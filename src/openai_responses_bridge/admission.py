@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, Optional, Sequence, Tuple
+
+from .logging_setup import get_logger
+from .metrics import ADMISSION_QUEUE_DEPTH, ADMISSION_REJECTED, ADMISSION_WAIT_SECONDS
+
+logger = get_logger()
+
+PRIORITY_HEADER = "X-Bridge-Priority"
+LANES: Tuple[str, ...] = ("interactive", "batch")
+
+
+def parse_lane(value: Optional[str], default: str) -> str:
+    lane = (value or "").strip().lower()
+    return lane if lane in LANES else default
+
+
+class Rejected(Exception):
+    def __init__(self, status: int, reason: str, retry_after: float) -> None:
+        super().__init__(reason)
+        self.status = status
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        global_limit: int,
+        per_key_limit: int,
+        queue_size: int,
+        queue_timeout: float,
+        retry_after: float = 1.0,
+        lanes: Sequence[str] = LANES,
+    ) -> None:
+        self.global_limit = global_limit
+        self.per_key_limit = per_key_limit
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.lanes = tuple(lanes)
+        self.active = 0
+        self.active_by_key: Dict[str, int] = {}
+        # lane -> key -> waiters; keys are served round-robin inside a lane.
+        self.queues: Dict[str, "OrderedDict[str, Deque[asyncio.Future[None]]]"] = {
+            lane: OrderedDict() for lane in self.lanes
+        }
+        self.queued = 0
+        self.queued_by_key: Dict[str, int] = {}
+        self.admitted = 0
+        self.rejected = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.global_limit > 0 or self.per_key_limit > 0
+
+    def _has_room(self, key: str) -> bool:
+        if self.global_limit > 0 and self.active >= self.global_limit:
+            return False
+        if self.per_key_limit > 0 and self.active_by_key.get(key, 0) >= self.per_key_limit:
+            return False
+        return True
+
+    def _admit(self, key: str) -> None:
+        self.active += 1
+        self.active_by_key[key] = self.active_by_key.get(key, 0) + 1
+        self.admitted += 1
+
+    def _reject(self, lane: str, status: int, reason: str) -> Rejected:
+        self.rejected += 1
+        ADMISSION_REJECTED.labels(lane, reason).inc()
+        logger.warning("admission.rejected", lane=lane, reason=reason)
+        return Rejected(status, reason, self.retry_after)
+
+    async def acquire(self, key: str, lane: str) -> None:
+        if not self.queued and self._has_room(key):
+            self._admit(key)
+            ADMISSION_WAIT_SECONDS.labels(lane).observe(0.0)
+            return
+        if self.per_key_limit > 0 and self.queued_by_key.get(key, 0) >= self.per_key_limit:
+            raise self._reject(lane, 429, "key_queue_full")
+        if self.queued >= self.queue_size:
+            raise self._reject(lane, 503, "queue_full")
+
+        waiter: "asyncio.Future[None]" = asyncio.get_running_loop().create_future()
+        self.queues[lane].setdefault(key, deque()).append(waiter)
+        self._queued(lane, key, 1)
+        self._dispatch()
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except BaseException as exc:
+            if waiter.done() and not waiter.cancelled():
+                # Admitted just as the wait ended; hand the slot back.
+                self.release(key)
+            else:
+                waiter.cancel()
+                self._discard(lane, key, waiter)
+            if isinstance(exc, asyncio.TimeoutError):
+                raise self._reject(lane, 503, "queue_timeout") from None
+            raise
+        finally:
+            ADMISSION_WAIT_SECONDS.labels(lane).observe(time.perf_counter() - started)
+
+    def release(self, key: str) -> None:
+        self.active -= 1
+        remaining = self.active_by_key.get(key, 1) - 1
+        if remaining:
+            self.active_by_key[key] = remaining
+        else:
+            self.active_by_key.pop(key, None)
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        for lane in self.lanes:
+            queue = self.queues[lane]
+            for key in list(queue):
+                if not self._has_room(key):
+                    if self.global_limit > 0 and self.active >= self.global_limit:
+                        return
+                    continue
+                waiters = queue.pop(key)
+                waiter = waiters.popleft()
+                if waiters:
+                    queue[key] = waiters
+                self._queued(lane, key, -1)
+                self._admit(key)
+                waiter.set_result(None)
+
+    def _discard(self, lane: str, key: str, waiter: "asyncio.Future[None]") -> None:
+        waiters = self.queues[lane].get(key)
+        if waiters is None or waiter not in waiters:
+            return
+        waiters.remove(waiter)
+        if not waiters:
+            del self.queues[lane][key]
+        self._queued(lane, key, -1)
+
+    def _queued(self, lane: str, key: str, delta: int) -> None:
+        self.queued += delta
+        count = self.queued_by_key.get(key, 0) + delta
+        if count:
+            self.queued_by_key[key] = count
+        else:
+            self.queued_by_key.pop(key, None)
+        ADMISSION_QUEUE_DEPTH.labels(lane).inc(delta)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "global_limit": self.global_limit,
+            "per_key_limit": self.per_key_limit,
+            "queue_size": self.queue_size,
+            "active": self.active,
+            "active_keys": len(self.active_by_key),
+            "queued": {lane: sum(len(waiters) for waiters in self.queues[lane].values()) for lane in self.lanes},
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+        }
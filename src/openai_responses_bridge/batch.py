@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Set, Tuple
+
+from fastapi.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+from . import codec
+from .logging_setup import get_logger
+
+logger = get_logger()
+
+BATCH_ROUTES = {"/v1/chat/completions": "chat", "/v1/completions": "completions"}
+MEDIA_TYPE = "application/x-ndjson"
+
+Line = Tuple[int, Optional[bytes]]
+Handler = Callable[[int, Optional[bytes]], Awaitable[bytes]]
+
+_DONE = object()
+
+
+async def iter_lines(chunks: AsyncIterator[bytes], max_bytes: int) -> AsyncIterator[Line]:
+    # Yields (line number, line) as the body arrives; an over-long line yields None and is skipped.
+    buffer = bytearray()
+    number = 0
+    skipping = False
+    async for chunk in chunks:
+        start = 0
+        while True:
+            end = chunk.find(b"\n", start)
+            if end < 0:
+                if not skipping:
+                    buffer += chunk[start:]
+                    if len(buffer) > max_bytes:
+                        number += 1
+                        skipping = True
+                        buffer.clear()
+                        yield number, None
+                break
+            if skipping:
+                skipping = False
+            else:
+                buffer += chunk[start:end]
+                line = bytes(buffer).strip()
+                buffer.clear()
+                if len(line) > max_bytes:
+                    number += 1
+                    yield number, None
+                elif line:
+                    number += 1
+                    yield number, line
+            start = end + 1
+    line = bytes(buffer).strip()
+    if line and not skipping:
+        yield number + 1, line
+
+
+class BatchResponse(StreamingResponse):
+    # The request body is still being read while results stream out, so the response must not
+    # compete for ``receive`` the way StreamingResponse's disconnect listener does.
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await self.stream_response(send)
+        finally:
+            # Cancels outstanding items at once if the client disconnected mid-batch.
+            await self.body_iterator.aclose()
+        if self.background is not None:
+            await self.background()
+
+
+def result_line(custom_id: Any, status: int, body: Any = None, error: Optional[Dict[str, Any]] = None) -> bytes:
+    response = {"status_code": status, "body": body} if status else None
+    return codec.dumps({"custom_id": custom_id, "response": response, "error": error}) + b"\n"
+
+
+def error_line(custom_id: Any, code: str, message: str, status: int = 0) -> bytes:
+    return result_line(custom_id, status, error={"code": code, "message": message})
+
+
+async def run_batch(lines: AsyncIterator[Line], handle: Handler, concurrency: int) -> AsyncIterator[bytes]:
+    # At most ``concurrency`` items are in flight or waiting to be written, so neither the
+    # input nor the output is held in memory; input is only read as slots free up.
+    results: "asyncio.Queue[Any]" = asyncio.Queue(maxsize=concurrency)
+    slots = asyncio.Semaphore(concurrency)
+    tasks: Set["asyncio.Task[None]"] = set()
+    stats = {"items": 0, "errors": 0}
+
+    async def run_one(number: int, line: Optional[bytes]) -> None:
+        try:
+            try:
+                result = await handle(number, line)
+            except Exception as exc:
+                logger.error("batch.item_error", line=number, error=str(exc))
+                stats["errors"] += 1
+                result = error_line(None, "internal_error", f"line {number}: {exc}")
+            await results.put(result)
+        finally:
+            slots.release()
+
+    async def produce() -> None:
+        try:
+            async for number, line in lines:
+                await slots.acquire()
+                stats["items"] += 1
+                task = asyncio.ensure_future(run_one(number, line))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        finally:
+            await results.put(_DONE)
+
+    producer = asyncio.ensure_future(produce())
+    try:
+        while True:
+            result = await results.get()
+            if result is _DONE:
+                break
+            yield result
+        await producer
+    finally:
+        producer.cancel()
+        for task in list(tasks):
+            task.cancel()
+        logger.info("batch.finished", **stats)
@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Mapping, Optional, Tuple
+
+from . import codec
+from .logging_setup import get_logger
+
+logger = get_logger()
+
+CACHE_HEADER = "X-Bridge-Cache"
+
+_ENTRY_OVERHEAD = 128
+
+
+def credential_scope(headers: Mapping[str, str], auth_header: str) -> str:
+    value = headers.get(auth_header, "")
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()[:16]
+
+
+def request_key(payload: Dict[str, Any], scope: str) -> str:
+    canonical = {k: v for k, v in payload.items() if k != "stream"}
+    digest = hashlib.sha256(scope.encode("utf-8"))
+    digest.update(codec.dumps_canonical(canonical))
+    return digest.hexdigest()
+
+
+def is_deterministic(payload: Dict[str, Any]) -> bool:
+    return payload.get("temperature") == 0
+
+
+def cache_directive(headers: Mapping[str, str]) -> str:
+    override = headers.get(CACHE_HEADER, "").strip().lower()
+    if override in ("bypass", "off", "no-store"):
+        return "bypass"
+    cache_control = headers.get("Cache-Control", "").lower()
+    if "no-store" in cache_control:
+        return "bypass"
+    if "no-cache" in cache_control or override == "refresh":
+        return "refresh"
+    return "use"
+
+
+class ResponseCache:
+    def __init__(self, max_bytes: int, ttl: float, clock: Callable[[], float] = time.monotonic) -> None:
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.clock = clock
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires, value = entry
+        if expires <= self.clock():
+            self._remove(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: str, value: bytes) -> None:
+        cost = len(value) + len(key) + _ENTRY_OVERHEAD
+        if cost > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (self.clock() + self.ttl, value)
+        self.size += cost
+        while self.size > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, key: str) -> None:
+        _, value = self._entries.pop(key)
+        self.size -= len(value) + len(key) + _ENTRY_OVERHEAD
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self.size,
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class ModelsCache:
+    def __init__(
+        self, ttl: float, stale_ttl: float, max_entries: int = 256, clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries: "OrderedDict[str, Tuple[float, int, bytes]]" = OrderedDict()
+        self._loading: Dict[str, "asyncio.Task[Tuple[int, bytes]]"] = {}
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refresh_errors = 0
+        self.evictions = 0
+
+    async def get(self, key: str, fetch: Callable[[], Awaitable[Tuple[int, bytes]]]) -> Tuple[int, bytes]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            fetched_at, status, content = entry
+            age = self.clock() - fetched_at
+            self._entries.move_to_end(key)
+            if age < self.ttl:
+                self.hits += 1
+                return status, content
+            if age < self.ttl + self.stale_ttl:
+                self.stale_hits += 1
+                self._load(key, fetch, background=True)
+                return status, content
+        self.misses += 1
+        return await asyncio.shield(self._load(key, fetch))
+
+    def _load(
+        self, key: str, fetch: Callable[[], Awaitable[Tuple[int, bytes]]], background: bool = False
+    ) -> "asyncio.Task[Tuple[int, bytes]]":
+        task = self._loading.get(key)
+        if task is not None:
+            return task
+
+        async def load() -> Tuple[int, bytes]:
+            try:
+                status, content = await fetch()
+                if status < 400:
+                    self._store(key, status, content)
+                return status, content
+            finally:
+                self._loading.pop(key, None)
+
+        task = asyncio.ensure_future(load())
+        self._loading[key] = task
+        if background:
+            task.add_done_callback(self._log_refresh)
+        return task
+
+    def _store(self, key: str, status: int, content: bytes) -> None:
+        # Keys carry client query parameters, so the entry count is bounded like ResponseCache's bytes.
+        self._entries.pop(key, None)
+        self._entries[key] = (self.clock(), status, content)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _log_refresh(self, task: "asyncio.Task[Tuple[int, bytes]]") -> None:
+        if task.cancelled():
+            return
+        exc = task.exception()
+        if exc is not None or task.result()[0] >= 400:
+            self.refresh_errors += 1
+            logger.warning("models_cache.refresh_error", error=str(exc) if exc else task.result()[0])
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "stale_ttl": self.stale_ttl,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "refresh_errors": self.refresh_errors,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+import argparse
+import importlib.util
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+# Only the standard library is imported here. The supervisor never loads the web stack,
+# and each worker pays for FastAPI, httpx and the app exactly once.
+
+
+def _available(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def _event_loop() -> str:
+    return "uvloop" if _available("uvloop") and sys.platform != "win32" else "asyncio"
+
+
+def _http_protocol() -> str:
+    return "httptools" if _available("httptools") else "h11"
+
+
+def bind_socket(host: str, port: int, backlog: int, reuse_port: bool) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuse_port:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _log(event: str, **fields: Any) -> None:
+    from .logging_setup import get_logger
+
+    get_logger().info(event, **fields)
+
+
+def run_worker(options: Dict[str, Any], spawned_at: float, ready: Any = None) -> None:
+    imports_started = time.perf_counter()
+    if options["log_level"]:
+        os.environ["LOG_LEVEL"] = options["log_level"]
+    import uvicorn
+
+    from .main import app
+
+    import_ms = (time.perf_counter() - imports_started) * 1000
+    loop, http = _event_loop(), _http_protocol()
+
+    class Server(uvicorn.Server):
+        async def startup(self, sockets: Optional[List[socket.socket]] = None) -> None:
+            await super().startup(sockets=sockets)
+            if self.should_exit:
+                return
+            report = {
+                "pid": os.getpid(),
+                "import_ms": round(import_ms, 1),
+                "ready_ms": round((time.time() - spawned_at) * 1000, 1),
+                "loop": loop,
+                "http": http,
+            }
+            _log("worker.ready", **report)
+            if ready is not None:
+                ready.put(report)
+
+    config = uvicorn.Config(
+        app,
+        loop=loop,
+        http=http,
+        log_level=(options["log_level"] or "info").lower(),
+        timeout_graceful_shutdown=options["graceful_timeout"],
+        lifespan="on",
+    )
+    sock = bind_socket(options["host"], options["port"], options["backlog"], options["reuse_port"])
+    Server(config).run(sockets=[sock])
+
+
+class Supervisor:
+    def __init__(self, options: Dict[str, Any], workers: int) -> None:
+        self.options = options
+        self.workers = workers
+        self.context = multiprocessing.get_context("spawn")
+        self.ready = self.context.Queue()
+        self.processes: List[Any] = []
+        self.stopping = False
+
+    def _spawn(self) -> Any:
+        process = self.context.Process(
+            target=run_worker, args=(self.options, time.time(), self.ready), name="bridge-worker", daemon=False
+        )
+        process.start()
+        return process
+
+    def _signal(self, signum: int, frame: Any) -> None:
+        if signum == getattr(signal, "SIGHUP", None):
+            for process in self.processes:
+                if process.is_alive():
+                    os.kill(process.pid, signum)
+            return
+        self.stopping = True
+
+    def run(self) -> int:
+        started = time.time()
+        for signum in (signal.SIGTERM, signal.SIGINT, getattr(signal, "SIGHUP", None)):
+            if signum is not None:
+                signal.signal(signum, self._signal)
+        self.processes = [self._spawn() for _ in range(self.workers)]
+        reported = 0
+        while not self.stopping:
+            while reported < self.workers and not self.ready.empty():
+                self.ready.get()
+                reported += 1
+                if reported == self.workers:
+                    _log("serve.ready", workers=self.workers, startup_ms=round((time.time() - started) * 1000, 1))
+            for index, process in enumerate(self.processes):
+                if not process.is_alive() and not self.stopping:
+                    _log("worker.restart", pid=process.pid, exitcode=process.exitcode)
+                    self.processes[index] = self._spawn()
+            time.sleep(0.1)
+        return self.drain()
+
+    def drain(self) -> int:
+        # Workers stop accepting at once and let in-flight streams finish within the graceful timeout.
+        _log("serve.draining", workers=len(self.processes))
+        for process in self.processes:
+            if process.is_alive():
+                os.kill(process.pid, signal.SIGTERM)
+        deadline = time.monotonic() + self.options["graceful_timeout"] + 5
+        for process in self.processes:
+            process.join(max(deadline - time.monotonic(), 0))
+            if process.is_alive():
+                process.kill()
+                process.join()
+        _log("serve.stopped")
+        return 0
+
+
+def serve(args: argparse.Namespace) -> int:
+    from .logging_setup import configure_logging
+
+    configure_logging(args.log_level or os.environ.get("LOG_LEVEL", "INFO"))
+    workers = max(1, args.workers)
+    reuse_port = workers > 1 and hasattr(socket, "SO_REUSEPORT")
+    if workers > 1 and not reuse_port:
+        _log("serve.single_worker", reason="SO_REUSEPORT is not available on this platform")
+        workers = 1
+    options = {
+        "host": args.host,
+        "port": args.port,
+        "backlog": args.backlog,
+        "log_level": args.log_level,
+        "graceful_timeout": args.graceful_timeout,
+        "reuse_port": reuse_port,
+    }
+    if workers == 1:
+        run_worker(options, time.time())
+        return 0
+    return Supervisor(options, workers).run()
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="openai-responses-bridge")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve_parser = commands.add_parser("serve", help="run the bridge HTTP server")
+    serve_parser.add_argument("--host", default=os.environ.get("HOST", "0.0.0.0"))
+    serve_parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", "8000")))
+    serve_parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.environ.get("WEB_CONCURRENCY", "1")),
+        help="worker processes sharing the port through SO_REUSEPORT",
+    )
+    serve_parser.add_argument("--backlog", type=int, default=2048)
+    serve_parser.add_argument("--log-level", help="overrides LOG_LEVEL from the environment or .env")
+    serve_parser.add_argument(
+        "--graceful-timeout",
+        type=float,
+        default=30.0,
+        help="seconds in-flight requests and streams may run after SIGTERM",
+    )
+    serve_parser.set_defaults(handler=serve)
+    return parser
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from .logging_setup import get_logger
+
+logger = get_logger()
+
+ROUTES = ("chat", "completions", "responses")
+
+
+def parse_routes(value: str) -> Tuple[str, ...]:
+    routes = [item.strip().lower() for item in value.split(",") if item.strip()]
+    if "all" in routes or "*" in routes:
+        return ROUTES
+    return tuple(route for route in routes if route in ROUTES)
+
+
+class Flight:
+    def __init__(self) -> None:
+        self.status = 0
+        self.body = b""
+        self.chunks: List[bytes] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.task: Optional["asyncio.Task[None]"] = None
+        self.opened: "asyncio.Future[None]" = asyncio.get_running_loop().create_future()
+        self._changed = asyncio.Event()
+
+    def publish(self, chunk: bytes) -> None:
+        self.chunks.append(chunk)
+        self._wake()
+
+    def finish(self) -> None:
+        self.done = True
+        self._wake()
+
+    def _wake(self) -> None:
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    def follow(self) -> "Follower":
+        return Follower(self)
+
+    def release(self) -> None:
+        self.subscribers -= 1
+        if self.subscribers <= 0 and not self.done and self.task is not None:
+            self.task.cancel()
+
+
+class Follower:
+    # Releases its subscription on exhaustion or ``aclose``, even if iteration never started.
+    __slots__ = ("flight", "index", "released")
+
+    def __init__(self, flight: Flight) -> None:
+        self.flight = flight
+        self.index = 0
+        self.released = False
+
+    def __aiter__(self) -> "Follower":
+        return self
+
+    async def __anext__(self) -> bytes:
+        flight = self.flight
+        while True:
+            if self.index < len(flight.chunks):
+                chunk = flight.chunks[self.index]
+                self.index += 1
+                return chunk
+            if flight.done:
+                await self.aclose()
+                if flight.error is not None:
+                    raise flight.error
+                raise StopAsyncIteration
+            try:
+                await flight._changed.wait()
+            except BaseException:
+                await self.aclose()
+                raise
+
+    async def aclose(self) -> None:
+        if not self.released:
+            self.released = True
+            self.flight.release()
+
+
+class Coalescer:
+    def __init__(self, routes: Tuple[str, ...]) -> None:
+        self.routes = routes
+        self._pending: Dict[str, "asyncio.Task[Any]"] = {}
+        self._flights: Dict[str, Flight] = {}
+        self.leaders = 0
+        self.saved = 0
+
+    def enabled_for(self, route: str) -> bool:
+        return route in self.routes
+
+    async def run(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._pending.get(key)
+        if task is None:
+            self.leaders += 1
+            task = asyncio.ensure_future(factory())
+            self._pending[key] = task
+            task.add_done_callback(lambda _: self._pending.pop(key, None))
+        else:
+            self.saved += 1
+            logger.info("coalesce.join", mode="json")
+        return await asyncio.shield(task)
+
+    async def stream(self, key: str, opener: Callable[[], Awaitable[httpx.Response]]) -> Flight:
+        flight = self._flights.get(key)
+        if flight is None:
+            self.leaders += 1
+            flight = Flight()
+            self._flights[key] = flight
+            flight.task = asyncio.ensure_future(self._pump(key, flight, opener))
+        else:
+            self.saved += 1
+            logger.info("coalesce.join", mode="stream", buffered=len(flight.chunks))
+        flight.subscribers += 1
+        try:
+            await asyncio.shield(flight.opened)
+        except BaseException:
+            flight.subscribers -= 1
+            raise
+        return flight
+
+    async def _pump(self, key: str, flight: Flight, opener: Callable[[], Awaitable[httpx.Response]]) -> None:
+        response: Optional[httpx.Response] = None
+        try:
+            response = await opener()
+            flight.status = response.status_code
+            if response.status_code >= 400:
+                flight.body = await response.aread()
+                flight.opened.set_result(None)
+                return
+            flight.opened.set_result(None)
+            async for chunk in response.aiter_bytes():
+                flight.publish(chunk)
+        except asyncio.CancelledError:
+            if not flight.opened.done():
+                flight.opened.cancel()
+            raise
+        except Exception as exc:
+            if not flight.opened.done():
+                flight.opened.set_exception(exc)
+            else:
+                # Followers re-raise it after the buffered chunks instead of ending silently.
+                flight.error = exc
+                logger.error("coalesce.stream_error", error=str(exc))
+        finally:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            flight.finish()
+            if response is not None:
+                await response.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "routes": list(self.routes),
+            "leaders": self.leaders,
+            "saved_upstream_calls": self.saved,
+            "in_flight": len(self._pending) + len(self._flights),
+        }
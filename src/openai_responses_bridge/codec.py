@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+from typing import Any, Union
+
+import orjson
+from fastapi.responses import Response
+
+JSONDecodeError = orjson.JSONDecodeError
+
+_DUMPS_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+def loads(data: Union[bytes, bytearray, memoryview, str]) -> Any:
+    return orjson.loads(data)
+
+
+def dumps(value: Any) -> bytes:
+    return orjson.dumps(value, option=_DUMPS_OPTIONS)
+
+
+def dumps_canonical(value: Any) -> bytes:
+    return orjson.dumps(value, option=_DUMPS_OPTIONS | orjson.OPT_SORT_KEYS)
+
+
+def sse_frame(value: Any) -> bytes:
+    return b"data: " + orjson.dumps(value, option=_DUMPS_OPTIONS) + b"\n\n"
+
+
+class JSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=_DUMPS_OPTIONS)
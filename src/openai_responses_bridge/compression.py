@@ -0,0 +1,250 @@
+from __future__ import annotations
+
+import asyncio
+import zlib
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .logging_setup import get_logger
+
+logger = get_logger()
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Server preference when the client weighs encodings equally.
+PREFERENCE = ("zstd", "br", "gzip")
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+EVENT_STREAM_TYPE = "text/event-stream"
+
+_GZIP_LEVEL = 5
+_BROTLI_QUALITY = 4
+_ZSTD_LEVEL = 3
+# Larger bodies are compressed on a worker thread so the event loop keeps serving.
+_THREAD_THRESHOLD = 256 * 1024
+
+
+def available_encodings() -> Tuple[str, ...]:
+    supported = {"gzip": True, "br": brotli is not None, "zstd": zstandard is not None}
+    return tuple(encoding for encoding in PREFERENCE if supported[encoding])
+
+
+def parse_encodings(value: str) -> Tuple[str, ...]:
+    requested = {item.strip().lower() for item in value.split(",") if item.strip()}
+    return tuple(encoding for encoding in available_encodings() if encoding in requested)
+
+
+def negotiate(accept_encoding: Optional[str], encodings: Sequence[str]) -> Optional[str]:
+    if not accept_encoding or not encodings:
+        return None
+    weights: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[name.strip().lower()] = weight
+    wildcard = weights.get("*", 0.0)
+    best: Optional[str] = None
+    best_weight = 0.0
+    for encoding in encodings:
+        weight = weights.get(encoding, wildcard)
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "gzip":
+        compressor = zlib.compressobj(_GZIP_LEVEL, zlib.DEFLATED, 31)
+        return compressor.compress(data) + compressor.flush()
+    if encoding == "br":
+        return brotli.compress(data, quality=_BROTLI_QUALITY)
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=_ZSTD_LEVEL).compress(data)
+    raise ValueError(f"unsupported encoding {encoding}")
+
+
+async def compress_async(data: bytes, encoding: str) -> bytes:
+    if len(data) >= _THREAD_THRESHOLD:
+        return await asyncio.to_thread(compress, data, encoding)
+    return compress(data, encoding)
+
+
+class StreamCompressor:
+    # Every chunk is flushed so each SSE frame reaches the client as soon as it is written,
+    # while the shared compression context still removes the repetition between frames.
+    def __init__(self, encoding: str) -> None:
+        self.encoding = encoding
+        self._process: Callable[[bytes], bytes]
+        self._flush: Callable[[], bytes]
+        self._finish: Callable[[], bytes]
+        if encoding == "gzip":
+            compressor: Any = zlib.compressobj(_GZIP_LEVEL, zlib.DEFLATED, 31)
+            self._process = compressor.compress
+            self._flush = lambda: compressor.flush(zlib.Z_SYNC_FLUSH)
+            self._finish = compressor.flush
+        elif encoding == "br":
+            compressor = brotli.Compressor(quality=_BROTLI_QUALITY)
+            self._process = compressor.process
+            self._flush = compressor.flush
+            self._finish = compressor.finish
+        elif encoding == "zstd":
+            compressor = zstandard.ZstdCompressor(level=_ZSTD_LEVEL).compressobj()
+            self._process = compressor.compress
+            self._flush = lambda: compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+            self._finish = compressor.flush
+        else:
+            raise ValueError(f"unsupported encoding {encoding}")
+
+    def chunk(self, data: bytes, final: bool = False) -> bytes:
+        out = self._process(data) if data else b""
+        return out + (self._finish() if final else self._flush())
+
+
+def _compressible(headers: Headers) -> bool:
+    if "content-encoding" in headers:
+        return False
+    content_type = headers.get("content-type", "")
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+class CompressionMiddleware:
+    def __init__(
+        self, app: ASGIApp, encodings: Sequence[str], minimum_size: int, event_streams: bool = False
+    ) -> None:
+        self.app = app
+        self.encodings = tuple(encodings)
+        self.minimum_size = minimum_size
+        self.event_streams = event_streams
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.encodings:
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding"), self.encodings)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        responder = _Responder(send, encoding, self.minimum_size, self.event_streams)
+        await self.app(scope, receive, responder.send)
+
+
+class _Responder:
+    __slots__ = ("downstream", "encoding", "minimum_size", "event_streams", "start", "stream", "passthrough")
+
+    def __init__(self, downstream: Send, encoding: str, minimum_size: int, event_streams: bool) -> None:
+        self.downstream = downstream
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.event_streams = event_streams
+        self.start: Optional[Message] = None
+        self.stream: Optional[StreamCompressor] = None
+        self.passthrough = False
+
+    async def send(self, message: Message) -> None:
+        kind = message["type"]
+        if kind == "http.response.start":
+            headers = MutableHeaders(raw=message["headers"])
+            if headers.get("content-type", "").startswith(EVENT_STREAM_TYPE):
+                # SSE headers go out at once: the first frame may be a long way off, and holding
+                # them back would hide the response from clients and proxies until it arrives.
+                if self.event_streams and _compressible(headers):
+                    self._stream_headers(headers)
+                else:
+                    self.passthrough = True
+                await self.downstream(message)
+                return
+            self.start = message
+            return
+        if kind != "http.response.body" or self.passthrough:
+            await self.downstream(message)
+            return
+        body = message.get("body", b"")
+        more = message.get("more_body", False)
+        if self.stream is not None:
+            await self.downstream({"type": kind, "body": self.stream.chunk(body, final=not more), "more_body": more})
+            return
+
+        start, self.start = self.start, None
+        if start is None:
+            await self.downstream(message)
+            return
+        headers = MutableHeaders(raw=start["headers"])
+        if not _compressible(headers) or (not more and len(body) < self.minimum_size):
+            self.passthrough = True
+            await self.downstream(start)
+            await self.downstream(message)
+            return
+
+        if more:
+            self._stream_headers(headers)
+            await self.downstream(start)
+            await self.downstream({"type": kind, "body": self.stream.chunk(body), "more_body": True})
+            return
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        compressed = await compress_async(body, self.encoding)
+        headers["Content-Length"] = str(len(compressed))
+        await self.downstream(start)
+        await self.downstream({"type": kind, "body": compressed, "more_body": False})
+
+    def _stream_headers(self, headers: MutableHeaders) -> None:
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        del headers["Content-Length"]
+        self.stream = StreamCompressor(self.encoding)
+
+
+class RequestEncoder:
+    def __init__(self, encoding: str, min_bytes: int) -> None:
+        encoding = encoding.strip().lower()
+        self.encoding = encoding if encoding in available_encodings() else ""
+        if encoding and not self.encoding:
+            logger.warning("upstream.request_encoding_unavailable", encoding=encoding)
+        self.min_bytes = min_bytes
+        self.compressed = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.encoding)
+
+    async def encode(self, content: bytes) -> Optional[Tuple[str, bytes]]:
+        # The encoding is read once, so a concurrent ``rejected()`` cannot relabel this body.
+        encoding = self.encoding
+        if not encoding or len(content) < self.min_bytes:
+            return None
+        encoded = await compress_async(content, encoding)
+        self.compressed += 1
+        self.bytes_in += len(content)
+        self.bytes_out += len(encoded)
+        return encoding, encoded
+
+    def rejected(self) -> None:
+        # The upstream answered 415 to a compressed body; stop compressing for this process.
+        logger.warning("upstream.request_encoding_rejected", encoding=self.encoding)
+        self.encoding = ""
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "encoding": self.encoding or None,
+            "min_bytes": self.min_bytes,
+            "compressed": self.compressed,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+        }
@@ -1,11 +1,24 @@
 from __future__ import annotations
 
-import json
-from typing import Dict
+from typing import Any, Dict, List, Optional
 
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+from . import codec
+
+
+def join_url(base_url: str, path: str) -> str:
+    base = base_url.rstrip("/")
+    cleaned = path.strip()
+    if not cleaned:
+        return base
+    if not cleaned.startswith("/"):
+        cleaned = "/" + cleaned
+    if base.endswith("/v1") and cleaned.startswith("/v1/"):
+        cleaned = cleaned[len("/v1"):]
+    return base + cleaned
+
 
 class Settings(BaseSettings):
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8")
@@ -16,15 +29,83 @@ class Settings(BaseSettings):
     upstream_api_key_header: str = Field(default="Authorization")
     pass_through_auth: bool = Field(default=True)
     request_timeout: float = Field(default=30.0)
+    upstream_connect_timeout: float = Field(default=5.0)
+    upstream_pool_timeout: float = Field(default=10.0)
+    upstream_ttfb_timeout: Optional[float] = Field(default=None)
+    stream_idle_timeout: Optional[float] = Field(default=None)
+    stream_max_duration: float = Field(default=0.0)
+    stream_heartbeat_interval: float = Field(default=15.0)
     log_level: str = Field(default="INFO")
     model_map: str = Field(default="{}")
+    upstream_max_connections: int = Field(default=100)
+    upstream_max_keepalive_connections: int = Field(default=20)
+    upstream_keepalive_expiry: float = Field(default=30.0)
+    upstream_http2: bool = Field(default=False)
+    upstream_warmup_connections: int = Field(default=0)
+    upstream_warmup_timeout: float = Field(default=5.0)
+    response_cache_enabled: bool = Field(default=False)
+    response_cache_ttl: float = Field(default=300.0)
+    response_cache_max_bytes: int = Field(default=64 * 1024 * 1024)
+    coalesce_routes: str = Field(default="")
+    models_cache_ttl: float = Field(default=300.0)
+    models_cache_stale_ttl: float = Field(default=3600.0)
+    models_cache_max_entries: int = Field(default=256)
+    upstreams: str = Field(default="")
+    upstream_balancing: str = Field(default="least_outstanding")
+    upstream_health_interval: float = Field(default=10.0)
+    upstream_health_path: str = Field(default="/")
+    upstream_failure_threshold: int = Field(default=5)
+    upstream_eject_seconds: float = Field(default=30.0)
+    retry_max_attempts: int = Field(default=1)
+    retry_backoff_base: float = Field(default=0.1)
+    retry_backoff_max: float = Field(default=2.0)
+    retry_budget_ratio: float = Field(default=0.1)
+    retry_budget_min_per_second: float = Field(default=1.0)
+    hedge_enabled: bool = Field(default=False)
+    hedge_percentile: float = Field(default=95.0)
+    hedge_min_delay: float = Field(default=0.05)
+    admission_global_limit: int = Field(default=0)
+    admission_per_key_limit: int = Field(default=0)
+    admission_queue_size: int = Field(default=100)
+    admission_queue_timeout: float = Field(default=10.0)
+    admission_retry_after: float = Field(default=1.0)
+    admission_default_lane: str = Field(default="interactive")
+    stream_coalesce_bytes: int = Field(default=0)
+    stream_coalesce_ms: float = Field(default=5.0)
+    conversation_reuse_enabled: bool = Field(default=False)
+    conversation_max_entries: int = Field(default=10000)
+    conversation_ttl: float = Field(default=3600.0)
+    image_offload_enabled: bool = Field(default=False)
+    image_offload_min_bytes: int = Field(default=64 * 1024)
+    image_store_max_entries: int = Field(default=1024)
+    upstream_files_path: str = Field(default="/v1/files")
+    image_file_purpose: str = Field(default="vision")
+    routing_file: str = Field(default="")
+    routing_reload_interval: float = Field(default=2.0)
+    response_compression: str = Field(default="zstd,br,gzip")
+    response_compression_min_bytes: int = Field(default=1024)
+    response_compression_sse: bool = Field(default=False)
+    upstream_request_encoding: str = Field(default="")
+    upstream_request_compress_min_bytes: int = Field(default=16 * 1024)
+    server_timing_enabled: bool = Field(default=True)
+    slow_request_log_size: int = Field(default=50)
+    slow_request_window: float = Field(default=600.0)
+    metrics_models: str = Field(default="")
+    log_queue_size: int = Field(default=10000)
+    log_sample_rates: str = Field(default="")
+    batch_concurrency: int = Field(default=8)
+    batch_max_concurrency: int = Field(default=64)
+    batch_max_attempts: int = Field(default=5)
+    batch_retry_max_wait: float = Field(default=30.0)
+    batch_max_line_bytes: int = Field(default=8 * 1024 * 1024)
+    fanout_max_choices: int = Field(default=8)
 
     def resolved_model_map(self) -> Dict[str, str]:
         try:
-            value = json.loads(self.model_map)
+            value = codec.loads(self.model_map)
             if isinstance(value, dict):
                 return {str(k): str(v) for k, v in value.items()}
-        except json.JSONDecodeError:
+        except codec.JSONDecodeError:
             return {}
         return {}
 
@@ -35,16 +116,33 @@ class Settings(BaseSettings):
             return {"Authorization": f"Bearer {self.upstream_api_key}"}
         return {self.upstream_api_key_header: self.upstream_api_key}
 
+    def resolved_upstreams(self) -> List[Dict[str, Any]]:
+        entries: List[Any] = []
+        if self.upstreams.strip():
+            try:
+                value = codec.loads(self.upstreams)
+                entries = value if isinstance(value, list) else []
+            except codec.JSONDecodeError:
+                entries = [item.strip() for item in self.upstreams.split(",") if item.strip()]
+        upstreams = []
+        for index, entry in enumerate(entries):
+            if isinstance(entry, str):
+                entry = {"url": entry}
+            if not isinstance(entry, dict) or not entry.get("url"):
+                continue
+            upstreams.append(
+                {
+                    "name": str(entry.get("name") or f"upstream-{index}"),
+                    "url": str(entry["url"]),
+                    "weight": max(float(entry.get("weight", 1.0)), 0.001),
+                }
+            )
+        if not upstreams:
+            upstreams.append({"name": "default", "url": self.upstream_base_url, "weight": 1.0})
+        return upstreams
+
     def upstream_url_for(self, path: str) -> str:
-        base = self.upstream_base_url.rstrip("/")
-        cleaned = path.strip()
-        if not cleaned:
-            return base
-        if not cleaned.startswith("/"):
-            cleaned = "/" + cleaned
-        if base.endswith("/v1") and cleaned.startswith("/v1/"):
-            cleaned = cleaned[len("/v1"):]
-        return base + cleaned
+        return join_url(self.upstream_base_url, path)
 
     def upstream_responses_url(self) -> str:
         return self.upstream_url_for(self.upstream_responses_path)
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from . import codec
+from .logging_setup import get_logger
+
+logger = get_logger()
+
+REJECTED_STATUS = frozenset({400, 404, 409, 422})
+
+
+class Reuse(NamedTuple):
+    key: bytes
+    start: int
+    response_id: str
+
+
+def _chain(digest: bytes, item: Any) -> bytes:
+    return hashlib.blake2b(digest + codec.dumps_canonical(item), digest_size=16).digest()
+
+
+def prefix_hashes(seed: str, items: List[Any]) -> List[bytes]:
+    digest = hashlib.blake2b(seed.encode("utf-8"), digest_size=16).digest()
+    hashes = []
+    for item in items:
+        digest = _chain(digest, item)
+        hashes.append(digest)
+    return hashes
+
+
+def assistant_item(text: str) -> Dict[str, Any]:
+    return {"role": "assistant", "content": [{"type": "input_text", "text": text}]}
+
+
+class ConversationIndex:
+    def __init__(self, max_entries: int, ttl: float, clock: Callable[[], float] = time.monotonic) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self._entries: "OrderedDict[bytes, Tuple[float, str]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.rejections = 0
+        self.evictions = 0
+        self.items_skipped = 0
+
+    def lookup(self, seed: str, items: List[Any]) -> Optional[Reuse]:
+        hashes = prefix_hashes(seed, items)
+        now = self.clock()
+        # The newest item is what this turn adds, so the longest reusable prefix ends before it.
+        for index in range(len(hashes) - 2, -1, -1):
+            key = hashes[index]
+            entry = self._entries.get(key)
+            if entry is None:
+                continue
+            expires, response_id = entry
+            if expires <= now:
+                del self._entries[key]
+                continue
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self.items_skipped += index + 1
+            return Reuse(key, index + 1, response_id)
+        self.misses += 1
+        return None
+
+    def record(self, seed: str, items: List[Any], reply: str, response_id: Optional[str]) -> None:
+        if not response_id:
+            return
+        hashes = prefix_hashes(seed, items)
+        key = _chain(hashes[-1], assistant_item(reply)) if hashes else prefix_hashes(seed, [assistant_item(reply)])[0]
+        self._entries[key] = (self.clock() + self.ttl, response_id)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def reject(self, reuse: Reuse) -> None:
+        self.rejections += 1
+        self._entries.pop(reuse.key, None)
+        logger.warning("conversation.reuse_rejected", response_id=reuse.response_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": True,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "rejections": self.rejections,
+            "evictions": self.evictions,
+            "items_skipped": self.items_skipped,
+        }
@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import asyncio
+import base64
+import binascii
+import hashlib
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+
+from .logging_setup import get_logger
+
+logger = get_logger()
+
+Upload = Callable[[str, str], Awaitable[str]]
+# (upstream name, credential scope, digest)
+FileKey = Tuple[str, str, str]
+
+_HASH_SLICE = 1 << 20
+_SIGNATURES = (
+    (b"\x89PNG", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF8", "image/gif"),
+    (b"BM", "image/bmp"),
+)
+
+
+def sniff_mime(text: str, offset: int = 0) -> Optional[str]:
+    # Only the first 16 base64 characters (12 bytes) are decoded, enough for every signature.
+    try:
+        head = base64.b64decode(text[offset:offset + 16])
+    except (binascii.Error, ValueError):
+        return None
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    for signature, mime in _SIGNATURES:
+        if head.startswith(signature):
+            return mime
+    return None
+
+
+def _declared_mime(part: Dict[str, Any]) -> Optional[str]:
+    mime = part.get("mime_type")
+    if isinstance(mime, str) and mime.startswith("image/"):
+        return mime
+    image_format = part.get("format")
+    if isinstance(image_format, str) and image_format:
+        image_format = image_format.lower()
+        return "image/jpeg" if image_format == "jpg" else f"image/{image_format}"
+    return None
+
+
+def inline_image(part: Dict[str, Any]) -> Optional[Tuple[str, str, int]]:
+    # Returns (mime, text, offset) with the base64 payload at text[offset:], avoiding a copy.
+    data = part.get("image_base64")
+    if isinstance(data, str) and data:
+        return _declared_mime(part) or sniff_mime(data) or "image/png", data, 0
+    url = part.get("image_url")
+    if isinstance(url, str) and url.startswith("data:"):
+        comma = url.find(",", 0, 256)
+        if comma > 0 and url.endswith(";base64", 0, comma):
+            return url[5:comma - 7] or "application/octet-stream", url, comma + 1
+    return None
+
+
+def content_digest(text: str, offset: int = 0) -> str:
+    # Hash in slices so a multi-megabyte base64 string is never copied whole.
+    digest = hashlib.sha256()
+    for start in range(offset, len(text), _HASH_SLICE):
+        digest.update(text[start:start + _HASH_SLICE].encode("ascii", "ignore"))
+    return digest.hexdigest()
+
+
+def _image_parts(payload: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    items = payload.get("input")
+    if not isinstance(items, list):
+        return
+    for item in items:
+        content = item.get("content") if isinstance(item, dict) else None
+        if not isinstance(content, list):
+            continue
+        for part in content:
+            if isinstance(part, dict) and part.get("type") == "input_image":
+                yield part
+
+
+class ImageStore:
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        # A file id is only valid on the upstream that stored it and for the key that uploaded it.
+        self._files: "OrderedDict[FileKey, str]" = OrderedDict()
+        self._uploads: Dict[FileKey, "asyncio.Future[str]"] = {}
+        self.hits = 0
+        self.uploads = 0
+        self.failures = 0
+        self.bytes_saved = 0
+
+    async def file_id(self, key: FileKey, upload: Callable[[], Awaitable[str]]) -> str:
+        file_id = self._files.get(key)
+        if file_id is not None:
+            self._files.move_to_end(key)
+            self.hits += 1
+            return file_id
+        pending = self._uploads.get(key)
+        if pending is not None:
+            self.hits += 1
+            return await asyncio.shield(pending)
+        future: "asyncio.Future[str]" = asyncio.get_running_loop().create_future()
+        self._uploads[key] = future
+        try:
+            file_id = await upload()
+        except Exception as exc:
+            self.failures += 1
+            future.set_exception(exc)
+            # Concurrent waiters see the failure; nobody else needs to retrieve it.
+            future.exception()
+            raise
+        except BaseException:
+            future.cancel()
+            raise
+        finally:
+            self._uploads.pop(key, None)
+        self.uploads += 1
+        future.set_result(file_id)
+        self._files[key] = file_id
+        while len(self._files) > self.max_entries:
+            self._files.popitem(last=False)
+        return file_id
+
+    def forget(self, key: FileKey) -> None:
+        self._files.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": True,
+            "entries": len(self._files),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "uploads": self.uploads,
+            "failures": self.failures,
+            "bytes_saved": self.bytes_saved,
+        }
+
+
+class Offloaded:
+    # Images replaced by file ids on ``upstream``; ``restore`` puts them back inline if it refuses them.
+    __slots__ = ("upstream", "restored", "_store", "_parts")
+
+    def __init__(self, store: ImageStore, upstream: str) -> None:
+        self.upstream = upstream
+        self.restored = False
+        self._store = store
+        self._parts: List[Tuple[Dict[str, Any], Dict[str, Any], FileKey]] = []
+
+    def __len__(self) -> int:
+        return len(self._parts)
+
+    def add(self, part: Dict[str, Any], key: FileKey, file_id: str) -> None:
+        original = {name: part.pop(name) for name in ("image_url", "image_base64") if name in part}
+        part["file_id"] = file_id
+        self._parts.append((part, original, key))
+
+    def restore(self) -> None:
+        if self.restored:
+            return
+        self.restored = True
+        for part, original, key in self._parts:
+            part.pop("file_id", None)
+            part.update(original)
+            # The upstream no longer knows this file; upload it again next time.
+            self._store.forget(key)
+
+
+async def offload_images(
+    payload: Dict[str, Any], store: ImageStore, upload: Upload, min_bytes: int, scope: str = "", upstream: str = ""
+) -> Offloaded:
+    offloaded = Offloaded(store, upstream)
+    parts: List[Dict[str, Any]] = list(_image_parts(payload))
+    for part in parts:
+        inline = inline_image(part)
+        if inline is None or len(inline[1]) - inline[2] < min_bytes:
+            continue
+        mime, text, offset = inline
+        key = (upstream, scope, content_digest(text, offset))
+        try:
+            file_id = await store.file_id(key, lambda: upload(mime, text[offset:]))
+        except Exception as exc:
+            logger.warning("images.upload_error", error=str(exc))
+            continue
+        store.bytes_saved += len(text) - offset
+        offloaded.add(part, key, file_id)
+    return offloaded
@@ -1,26 +1,114 @@
 from __future__ import annotations
 
+import atexit
 import logging
+import queue
+import random
 import sys
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, MutableMapping, Optional, TextIO
 
 import structlog
 
+_UNSAMPLED = frozenset({"warning", "error", "critical", "exception"})
 
-def configure_logging(level: str) -> None:
+
+def parse_sample_rates(value: str) -> Dict[str, float]:
+    rates: Dict[str, float] = {}
+    for item in value.split(","):
+        event, _, rate = item.partition("=")
+        try:
+            rates[event.strip()] = min(max(float(rate), 0.0), 1.0)
+        except ValueError:
+            continue
+    return rates
+
+
+class Sampler:
+    def __init__(self) -> None:
+        self.rates: Dict[str, float] = {}
+        self.sampled_out = 0
+
+    def __call__(self, logger: Any, method_name: str, event_dict: MutableMapping[str, Any]) -> Any:
+        if method_name in _UNSAMPLED:
+            return event_dict
+        rate = self.rates.get(event_dict.get("event", ""))
+        if rate is None or rate >= 1.0:
+            return event_dict
+        if random.random() >= rate:
+            self.sampled_out += 1
+            raise structlog.DropEvent
+        event_dict["sample_rate"] = rate
+        return event_dict
+
+
+class BoundedQueueHandler(QueueHandler):
+    def __init__(self, size: int) -> None:
+        super().__init__(queue.Queue(maxsize=size))
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Rendering happens on the listener thread; the caller only enqueues the record.
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class DrainingListener(QueueListener):
+    def enqueue_sentinel(self) -> None:
+        # Blocks until there is room so stopping always drains what was queued.
+        self.queue.put(self._sentinel)
+
+
+_SAMPLER = Sampler()
+_handler: Optional[BoundedQueueHandler] = None
+_listener: Optional[QueueListener] = None
+
+
+def _stop() -> None:
+    global _handler, _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+    if _handler is not None:
+        logging.getLogger().removeHandler(_handler)
+        _handler = None
+
+
+def configure_logging(
+    level: str, queue_size: int = 10000, sample_rates: str = "", stream: Optional[TextIO] = None
+) -> None:
+    global _handler, _listener
     level_name = level.upper()
     level_value = logging._nameToLevel.get(level_name, logging.INFO)
-    logging.basicConfig(
-        format="%(message)s",
-        stream=sys.stdout,
-        level=level_value,
+    _stop()
+    _SAMPLER.rates = parse_sample_rates(sample_rates)
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(
+        structlog.stdlib.ProcessorFormatter(
+            processor=structlog.processors.JSONRenderer(),
+            foreign_pre_chain=[structlog.processors.TimeStamper(fmt="iso"), structlog.processors.add_log_level],
+        )
     )
+    _handler = BoundedQueueHandler(max(1, queue_size))
+    _listener = DrainingListener(_handler.queue, output)
+    _listener.start()
+    root = logging.getLogger()
+    root.addHandler(_handler)
+    root.setLevel(level_value)
 
     structlog.configure(
         processors=[
-            structlog.processors.TimeStamper(fmt="iso"),
             structlog.processors.add_log_level,
+            _SAMPLER,
+            structlog.processors.TimeStamper(fmt="iso"),
             structlog.processors.dict_tracebacks,
-            structlog.processors.JSONRenderer(),
+            structlog.stdlib.ProcessorFormatter.wrap_for_formatter,
         ],
         logger_factory=structlog.stdlib.LoggerFactory(),
         wrapper_class=structlog.make_filtering_bound_logger(level_value),
@@ -28,5 +116,24 @@ def configure_logging(level: str) -> None:
     )
 
 
+def flush_logging() -> None:
+    # Drains the queue by restarting the listener thread.
+    if _listener is not None:
+        _listener.stop()
+        _listener.start()
+
+
+def logging_stats() -> Dict[str, Any]:
+    return {
+        "queued": _handler.queue.qsize() if _handler is not None else 0,
+        "dropped": _handler.dropped if _handler is not None else 0,
+        "sampled_out": _SAMPLER.sampled_out,
+        "sample_rates": dict(_SAMPLER.rates),
+    }
+
+
 def get_logger() -> structlog.stdlib.BoundLogger:
     return structlog.get_logger()
+
+
+atexit.register(_stop)
@@ -1,21 +1,151 @@
 from __future__ import annotations
 
+import asyncio
+import base64
 import time
-from typing import Any, Dict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Coroutine, Dict, List, Optional, Tuple, Union
 
 import httpx
 from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.responses import Response, StreamingResponse
+from starlette.background import BackgroundTask, BackgroundTasks
+
+from . import codec
+from .admission import PRIORITY_HEADER, AdmissionController, Rejected, parse_lane
+from .adapter import (
+    alias_models,
+    build_responses_request,
+    extract_text_from_response,
+    merge_choices,
+    to_chat_completions,
+    to_completions,
+)
+from .batch import BATCH_ROUTES, MEDIA_TYPE, BatchResponse, error_line, iter_lines, result_line, run_batch
+from .cache import (
+    CACHE_HEADER,
+    ModelsCache,
+    ResponseCache,
+    cache_directive,
+    credential_scope,
+    is_deterministic,
+    request_key,
+)
+from .coalesce import Coalescer, parse_routes
+from .codec import JSONResponse
+from .compression import CompressionMiddleware, RequestEncoder, parse_encodings
+from .config import Settings, settings
+from .conversation import REJECTED_STATUS, ConversationIndex, Reuse
+from .images import ImageStore, Offloaded, offload_images
+from .logging_setup import configure_logging, get_logger, logging_stats
+from .metrics import (
+    CONTENT_TYPE,
+    OTHER_MODEL,
+    REGISTRY,
+    STREAM_TIMEOUTS,
+    UPSTREAM_ABORTED,
+    RequestTimer,
+    SlowRequests,
+    update_log_counters,
+    update_pool_gauges,
+)
+from .retry import RetryPolicy
+from .routing import Route, Router
+from .streaming import (
+    CHAT_TEMPLATES,
+    COALESCE_HEADER,
+    COALESCE_PARAM,
+    COMPLETION_TEMPLATES,
+    DELTA_EVENT,
+    Coalesce,
+    SSEParser,
+    SSEResponse,
+    delta_literal,
+    event_type,
+    merge_streams,
+    parse_coalesce,
+    replay_frames,
+    stream_chat_completions,
+    stream_completions,
+)
+from .timeouts import PhaseTimeouts, StreamGuard, chat_error_frame, responses_error_frame, use_idle_timeout
+from .upstream import UpstreamPool
 
-from .adapter import build_responses_request, to_chat_completions, to_completions
-from .config import settings
-from .logging_setup import configure_logging, get_logger
-from .streaming import stream_chat_completions, stream_completions
-
-configure_logging(settings.log_level)
 logger = get_logger()
 
-app = FastAPI(title="OpenAI Responses Adapter", version="0.1.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    # Logging starts with the server rather than on import, so importing the app has no side effects.
+    configure_logging(settings.log_level, settings.log_queue_size, settings.log_sample_rates)
+    pool = UpstreamPool(settings)
+    app.state.upstream = pool
+    app.state.response_cache = None
+    if settings.response_cache_enabled:
+        app.state.response_cache = ResponseCache(settings.response_cache_max_bytes, settings.response_cache_ttl)
+    app.state.coalescer = Coalescer(parse_routes(settings.coalesce_routes))
+    app.state.retry = RetryPolicy(settings)
+    app.state.request_encoder = RequestEncoder(
+        settings.upstream_request_encoding, settings.upstream_request_compress_min_bytes
+    )
+    app.state.slow_requests = SlowRequests(settings.slow_request_log_size, settings.slow_request_window)
+    app.state.metric_models = frozenset(name.strip() for name in settings.metrics_models.split(",") if name.strip())
+    app.state.batch_retry = _batch_retry(settings)
+    app.state.conversations = None
+    if settings.conversation_reuse_enabled:
+        app.state.conversations = ConversationIndex(settings.conversation_max_entries, settings.conversation_ttl)
+    app.state.admission = AdmissionController(
+        settings.admission_global_limit,
+        settings.admission_per_key_limit,
+        settings.admission_queue_size,
+        settings.admission_queue_timeout,
+        settings.admission_retry_after,
+    )
+    app.state.models_cache = None
+    if settings.models_cache_ttl > 0:
+        app.state.models_cache = ModelsCache(
+            settings.models_cache_ttl, settings.models_cache_stale_ttl, settings.models_cache_max_entries
+        )
+    app.state.images = None
+    if settings.image_offload_enabled:
+        app.state.images = ImageStore(settings.image_store_max_entries)
+    router = Router(settings.resolved_model_map(), settings.routing_file, settings.routing_reload_interval)
+    app.state.router = router
+    await pool.start()
+    router.start()
+    try:
+        yield
+    finally:
+        router.stop()
+        await pool.close()
+
+
+def _batch_retry(config: Settings) -> RetryPolicy:
+    # Every batch item earns one retry token, and rate-limit waits may run up to the Retry-After.
+    return RetryPolicy(
+        config.model_copy(
+            update={
+                "retry_max_attempts": config.batch_max_attempts,
+                "retry_backoff_max": config.batch_retry_max_wait,
+                "retry_budget_ratio": 1.0,
+                "hedge_enabled": False,
+            }
+        )
+    )
+
+
+app = FastAPI(
+    title="OpenAI Responses Adapter",
+    version="0.1.0",
+    lifespan=lifespan,
+    default_response_class=JSONResponse,
+)
+app.add_middleware(
+    CompressionMiddleware,
+    encodings=parse_encodings(settings.response_compression),
+    minimum_size=settings.response_compression_min_bytes,
+    event_streams=settings.response_compression_sse,
+)
 
 
 @app.get("/healthz")
@@ -23,6 +153,201 @@ async def healthz() -> Dict[str, str]:
     return {"status": "ok"}
 
 
+@app.get("/metrics")
+async def metrics(request: Request) -> Response:
+    update_pool_gauges(_upstream(request).stats())
+    update_log_counters(logging_stats())
+    return Response(content=REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
+@app.get("/debug/pool")
+async def pool_stats(request: Request) -> Dict[str, Any]:
+    return _upstream(request).stats()
+
+
+@app.get("/debug/cache")
+async def cache_stats(request: Request) -> Dict[str, Any]:
+    cache = request.app.state.response_cache
+    models_cache = request.app.state.models_cache
+    return {
+        "responses": cache.stats() if cache is not None else {"enabled": False},
+        "models": models_cache.stats() if models_cache is not None else {"enabled": False},
+    }
+
+
+@app.get("/debug/coalesce")
+async def coalesce_stats(request: Request) -> Dict[str, Any]:
+    return request.app.state.coalescer.stats()
+
+
+@app.get("/debug/routing")
+async def routing_stats(request: Request) -> Dict[str, Any]:
+    return request.app.state.router.stats()
+
+
+@app.get("/debug/images")
+async def image_stats(request: Request) -> Dict[str, Any]:
+    images = request.app.state.images
+    return images.stats() if images is not None else {"enabled": False}
+
+
+@app.get("/debug/conversations")
+async def conversation_stats(request: Request) -> Dict[str, Any]:
+    conversations = request.app.state.conversations
+    return conversations.stats() if conversations is not None else {"enabled": False}
+
+
+@app.get("/debug/admission")
+async def admission_stats(request: Request) -> Dict[str, Any]:
+    return request.app.state.admission.stats()
+
+
+@app.get("/debug/compression")
+async def compression_stats(request: Request) -> Dict[str, Any]:
+    return {
+        "response_encodings": list(parse_encodings(settings.response_compression)),
+        "event_streams": settings.response_compression_sse,
+        "upstream_requests": request.app.state.request_encoder.stats(),
+    }
+
+
+@app.get("/debug/slow")
+async def slow_requests(request: Request) -> Dict[str, Any]:
+    slow: SlowRequests = request.app.state.slow_requests
+    return {"size": slow.size, "window_seconds": slow.window, "requests": slow.snapshot()}
+
+
+@app.get("/debug/logging")
+async def log_stats() -> Dict[str, Any]:
+    return logging_stats()
+
+
+@app.get("/debug/retry")
+async def retry_stats(request: Request) -> Dict[str, Any]:
+    return request.app.state.retry.stats()
+
+
+def _upstream(request: Request) -> UpstreamPool:
+    return request.app.state.upstream
+
+
+def _coalescer(request: Request, route: str) -> Optional[Coalescer]:
+    coalescer: Coalescer = request.app.state.coalescer
+    return coalescer if coalescer.enabled_for(route) else None
+
+
+def _timer(request: Request, route: str) -> RequestTimer:
+    timer = RequestTimer(route, request.app.state.slow_requests)
+    request.state.timer = timer
+    return timer
+
+
+def _after_body(response: Response, func: Callable[..., Any], *args: Any) -> None:
+    task = BackgroundTask(func, *args)
+    if response.background is None:
+        response.background = task
+    else:
+        tasks = BackgroundTasks()
+        tasks.add_task(response.background)
+        tasks.add_task(task)
+        response.background = tasks
+
+
+async def _observed(timer: RequestTimer, call: Awaitable[Any]) -> Any:
+    try:
+        response = await call
+    except BaseException:
+        timer.finish(500)
+        raise
+    if isinstance(response, StreamingResponse):
+        _after_body(response, timer.finish, response.status_code)
+    else:
+        timer.response_bytes = len(response.body)
+        if settings.server_timing_enabled:
+            response.headers["Server-Timing"] = timer.server_timing()
+        timer.finish(response.status_code)
+    return response
+
+
+async def _admitted(request: Request, call: Coroutine[Any, Any, Any]) -> Any:
+    admission: AdmissionController = request.app.state.admission
+    if not admission.enabled:
+        return await call
+    key = credential_scope(request.headers, settings.upstream_api_key_header)
+    lane = parse_lane(request.headers.get(PRIORITY_HEADER), settings.admission_default_lane)
+    try:
+        await admission.acquire(key, lane)
+    except Rejected as exc:
+        call.close()
+        return JSONResponse(
+            status_code=exc.status,
+            content={"error": exc.reason},
+            headers={"Retry-After": str(max(1, round(exc.retry_after)))},
+        )
+    except BaseException:
+        call.close()
+        raise
+    try:
+        response = await call
+    except BaseException:
+        admission.release(key)
+        raise
+    if isinstance(response, StreamingResponse):
+        _after_body(response, admission.release, key)
+    else:
+        admission.release(key)
+    return response
+
+
+def _aborted(timer: RequestTimer, streaming: bool) -> Callable[[], None]:
+    def on_abort() -> None:
+        UPSTREAM_ABORTED.labels(timer.route).inc()
+        logger.info("client.disconnected", route=timer.route, model=timer.model, streaming=streaming)
+
+    return on_abort
+
+
+async def _disconnected(request: Request) -> None:
+    # Once the body has been read, the next ASGI message is http.disconnect.
+    while True:
+        message = await request.receive()
+        if message["type"] == "http.disconnect":
+            return
+
+
+async def _cancellable(request: Request, call: Coroutine[Any, Any, Any]) -> Any:
+    work = asyncio.ensure_future(call)
+    watcher = asyncio.ensure_future(_disconnected(request))
+    try:
+        await asyncio.wait((work, watcher), return_when=asyncio.FIRST_COMPLETED)
+    except BaseException:
+        work.cancel()
+        raise
+    finally:
+        watcher.cancel()
+    if work.done():
+        return work.result()
+    # Cancelling the task aborts the in-flight upstream request and frees its pooled connection.
+    work.cancel()
+    try:
+        await work
+    except asyncio.CancelledError:
+        pass
+    timer: RequestTimer = request.state.timer
+    _aborted(timer, streaming=False)()
+    return Response(status_code=499)
+
+
+async def _read_json(request: Request) -> Any:
+    started = time.perf_counter()
+    body = await request.body()
+    data = codec.loads(body)
+    timer: RequestTimer = request.state.timer
+    timer.request_bytes = len(body)
+    timer.phase("parse", time.perf_counter() - started)
+    return data
+
+
 def _build_upstream_headers(request: Request) -> Dict[str, str]:
     headers = {"Content-Type": "application/json"}
     headers.update(settings.auth_headers())
@@ -35,177 +360,606 @@ def _build_upstream_headers(request: Request) -> Dict[str, str]:
     return headers
 
 
-async def _proxy(payload: Dict[str, Any], stream: bool, transform: str, request: Request) -> Any:
-    upstream_url = settings.upstream_responses_url()
-    headers = _build_upstream_headers(request)
-
-    timeout = httpx.Timeout(settings.request_timeout)
-
+def _cached_reply(body: bytes, stream: bool, transform: str) -> Any:
+    data = codec.loads(body)
+    headers = {CACHE_HEADER: "HIT"}
     if stream:
-        client = httpx.AsyncClient(timeout=timeout)
-        start = time.time()
-        try:
-            req = client.build_request("POST", upstream_url, json=payload, headers=headers)
-            response = await client.send(req, stream=True)
-        except httpx.RequestError as exc:
-            await client.aclose()
-            logger.error("upstream.request_error", error=str(exc))
-            return JSONResponse(status_code=502, content={"error": "upstream_unreachable"})
-
-        elapsed_ms = int((time.time() - start) * 1000)
-        logger.info(
-            "upstream.response",
-            status=response.status_code,
-            elapsed_ms=elapsed_ms,
+        templates = CHAT_TEMPLATES if transform == "chat" else COMPLETION_TEMPLATES
+        frames = replay_frames(extract_text_from_response(data.get("output", [])), templates)
+        return StreamingResponse(iter(frames), media_type="text/event-stream", headers=headers)
+    if transform == "chat":
+        return JSONResponse(content=to_chat_completions(data), headers=headers)
+    return JSONResponse(content=to_completions(data), headers=headers)
+
+
+def _unreachable(exc: Exception) -> JSONResponse:
+    logger.error("upstream.request_error", error=str(exc))
+    return JSONResponse(status_code=502, content={"error": "upstream_unreachable"})
+
+
+def _upstream_error(status: int, content: bytes) -> JSONResponse:
+    return JSONResponse(status_code=status, content={"error": content.decode("utf-8", "ignore")})
+
+
+async def _send(
+    request: Request,
+    method: str,
+    path: str,
+    headers: Dict[str, str],
+    payload: Any = None,
+    stream: bool = False,
+    timer: Optional[RequestTimer] = None,
+    **kwargs: Any,
+) -> httpx.Response:
+    pool = _upstream(request)
+    if timer is None:
+        timer = getattr(request.state, "timer", None)
+    route: Optional[Route] = getattr(request.state, "route", None)
+    if route is not None:
+        kwargs = {**_route_kwargs(pool, route), **kwargs}
+    offloaded = _pinned_images(request)
+    if offloaded is not None and path == settings.upstream_responses_path:
+        # Uploaded file ids only resolve on the upstream that stored them.
+        kwargs["upstream"] = pool.named(offloaded.upstream)
+    content: Optional[bytes] = None
+    encoded: Optional[Tuple[str, bytes]] = None
+    if payload is not None:
+        content = codec.dumps(payload)
+        encoder: RequestEncoder = request.app.state.request_encoder
+        encoded = await encoder.encode(content) if encoder.enabled else None
+        kwargs["content"] = content if encoded is None else encoded[1]
+    if timer is not None:
+        kwargs["extensions"] = {"trace": timer.trace}
+    start = time.time()
+    perf_start = time.perf_counter()
+    if encoded is not None:
+        sent_headers = {**headers, "Content-Encoding": encoded[0]}
+        response = await pool.request(method, path, stream=stream, headers=sent_headers, **kwargs)
+        if response.status_code == 415:
+            encoder.rejected()
+            await response.aclose()
+            kwargs["content"] = content
+            response = await pool.request(method, path, stream=stream, headers=headers, **kwargs)
+    else:
+        response = await pool.request(method, path, stream=stream, headers=headers, **kwargs)
+    if stream:
+        use_idle_timeout(response, _phase_timeouts(pool, route))
+    if timer is not None:
+        timer.upstream_headers(perf_start)
+    elapsed_ms = int((time.time() - start) * 1000)
+    # Upstream failures go out at warning so per-event sampling never drops them.
+    log = logger.warning if response.status_code >= 500 else logger.info
+    log(
+        "upstream.response",
+        status=response.status_code,
+        elapsed_ms=elapsed_ms,
+        upstream=response.extensions.get("upstream"),
+    )
+    return response
+
+
+def _route_kwargs(pool: UpstreamPool, route: Route) -> Dict[str, Any]:
+    kwargs: Dict[str, Any] = {}
+    if route.upstream:
+        kwargs["upstream"] = pool.named(route.upstream)
+    if route.timeout is not None or route.timeouts:
+        kwargs["timeout"] = _phase_timeouts(pool, route).for_httpx()
+    return kwargs
+
+
+def _phase_timeouts(pool: UpstreamPool, route: Optional[Route]) -> PhaseTimeouts:
+    if route is None:
+        return pool.timeouts
+    return pool.timeouts.override(route.timeout, route.timeouts)
+
+
+def _guard(request: Request, timer: RequestTimer, error_frame: Callable[[str], bytes]) -> StreamGuard:
+    timeouts = _phase_timeouts(_upstream(request), getattr(request.state, "route", None))
+
+    def on_expired(reason: str) -> None:
+        STREAM_TIMEOUTS.labels(timer.route, reason).inc()
+        logger.warning("stream.timeout", route=timer.route, model=timer.model, reason=reason)
+
+    def on_failed(error: BaseException) -> None:
+        logger.warning(
+            "stream.upstream_error",
+            route=timer.route,
+            model=timer.model,
+            error=str(error),
+            error_type=type(error).__name__,
         )
 
-        if response.status_code >= 400:
-            data = await response.aread()
-            await response.aclose()
-            await client.aclose()
-            return JSONResponse(status_code=response.status_code, content={"error": data.decode("utf-8", "ignore")})
-
-        async def stream_lines() -> Any:
-            try:
-                async for line in response.aiter_lines():
-                    yield line
-            finally:
-                await response.aclose()
-                await client.aclose()
-
-        if transform == "chat":
-            return StreamingResponse(stream_chat_completions(stream_lines()), media_type="text/event-stream")
-        return StreamingResponse(stream_completions(stream_lines()), media_type="text/event-stream")
-
-    async with httpx.AsyncClient(timeout=timeout) as client:
-        start = time.time()
+    return StreamGuard(timeouts, settings.stream_heartbeat_interval, error_frame, on_expired, on_failed)
+
+
+def _flight_key(route: str, stream: bool, payload: Dict[str, Any], headers: Dict[str, str]) -> str:
+    scope = credential_scope(headers, settings.upstream_api_key_header)
+    return f"{route}:{int(stream)}:{request_key(payload, scope)}"
+
+
+async def _fetch_json(
+    request: Request, route: str, payload: Dict[str, Any], headers: Dict[str, str], shared: bool = True
+) -> Union[Response, bytes]:
+    path = settings.upstream_responses_path
+
+    def attempt() -> Awaitable[httpx.Response]:
+        return _send(request, "POST", path, headers, payload)
+
+    retry: RetryPolicy = request.app.state.retry
+    offloaded = _pinned_images(request)
+
+    async def fetch() -> Tuple[int, bytes]:
+        if retry.enabled and route != "responses":
+            response = await retry.call(attempt)
+        else:
+            response = await attempt()
+        return response.status_code, response.content
+
+    coalescer = _coalescer(request, route) if shared else None
+    try:
+        if coalescer is not None:
+            status, content = await coalescer.run(_flight_key(route, False, payload, headers), fetch)
+        else:
+            status, content = await fetch()
+    except httpx.RequestError as exc:
+        return _unreachable(exc)
+
+    if offloaded is not None and status in REJECTED_STATUS:
+        _inline_images(offloaded, status)
+        return await _fetch_json(request, route, payload, headers, shared)
+    if status >= 400:
+        return _upstream_error(status, content)
+    return content
+
+
+async def _open_stream(
+    request: Request, route: str, payload: Dict[str, Any], headers: Dict[str, str], shared: bool = True
+) -> Union[Response, AsyncIterator[bytes]]:
+    path = settings.upstream_responses_path
+
+    def opener() -> Any:
+        return _send(request, "POST", path, headers, payload, stream=True)
+
+    offloaded = _pinned_images(request)
+    coalescer = _coalescer(request, route) if shared else None
+    try:
+        if coalescer is not None:
+            flight = await coalescer.stream(_flight_key(route, True, payload, headers), opener)
+            if offloaded is not None and flight.status in REJECTED_STATUS:
+                _inline_images(offloaded, flight.status)
+                return await _open_stream(request, route, payload, headers, shared)
+            if flight.status >= 400:
+                return _upstream_error(flight.status, flight.body)
+            return flight.follow()
+        response = await opener()
+    except httpx.RequestError as exc:
+        return _unreachable(exc)
+
+    if response.status_code >= 400:
+        data = await response.aread()
+        await response.aclose()
+        if offloaded is not None and response.status_code in REJECTED_STATUS:
+            _inline_images(offloaded, response.status_code)
+            return await _open_stream(request, route, payload, headers, shared)
+        return _upstream_error(response.status_code, data)
+
+    return _UpstreamChunks(response)
+
+
+class _UpstreamChunks:
+    # Unlike a generator, ``aclose`` releases the response even if iteration never started.
+    __slots__ = ("response", "_chunks")
+
+    def __init__(self, response: httpx.Response) -> None:
+        self.response = response
+        self._chunks = response.aiter_bytes()
+
+    def __aiter__(self) -> "_UpstreamChunks":
+        return self
+
+    async def __anext__(self) -> bytes:
         try:
-            response = await client.post(upstream_url, json=payload, headers=headers)
-        except httpx.RequestError as exc:
-            logger.error("upstream.request_error", error=str(exc))
-            return JSONResponse(status_code=502, content={"error": "upstream_unreachable"})
-
-        elapsed_ms = int((time.time() - start) * 1000)
-        logger.info(
-            "upstream.response",
-            status=response.status_code,
-            elapsed_ms=elapsed_ms,
+            return await self._chunks.__anext__()
+        except BaseException:
+            await self.response.aclose()
+            raise
+
+    async def aclose(self) -> None:
+        await self.response.aclose()
+
+
+async def _offload_images(request: Request, payload: Dict[str, Any], headers: Dict[str, str]) -> None:
+    images: Optional[ImageStore] = request.app.state.images
+    if images is None:
+        return
+    upload_headers = {key: value for key, value in headers.items() if key.lower() != "content-type"}
+    pool = _upstream(request)
+    route: Optional[Route] = getattr(request.state, "route", None)
+    target = (route is not None and route.upstream and pool.named(route.upstream)) or pool.choose()
+
+    async def upload(mime: str, data: str) -> str:
+        extension = mime.rpartition("/")[2] or "bin"
+        files = {"file": (f"image.{extension}", base64.b64decode(data), mime)}
+        response = await _send(
+            request,
+            "POST",
+            settings.upstream_files_path,
+            upload_headers,
+            files=files,
+            data={"purpose": settings.image_file_purpose},
+            upstream=target,
         )
-
         if response.status_code >= 400:
-            return JSONResponse(status_code=response.status_code, content={"error": response.text})
+            raise RuntimeError(f"file upload failed with status {response.status_code}")
+        return codec.loads(response.content)["id"]
 
-        body = response.json()
-        if transform == "chat":
-            return JSONResponse(content=to_chat_completions(body))
-        return JSONResponse(content=to_completions(body))
+    scope = credential_scope(headers, settings.upstream_api_key_header)
+    offloaded = await offload_images(payload, images, upload, settings.image_offload_min_bytes, scope, target.name)
+    if offloaded:
+        request.state.offloaded_images = offloaded
 
 
-async def _proxy_passthrough(payload: Dict[str, Any], stream: bool, request: Request) -> Any:
-    upstream_url = settings.upstream_responses_url()
-    headers = _build_upstream_headers(request)
+def _pinned_images(request: Request) -> Optional[Offloaded]:
+    offloaded: Optional[Offloaded] = getattr(request.state, "offloaded_images", None)
+    return offloaded if offloaded is not None and not offloaded.restored else None
 
-    timeout = httpx.Timeout(settings.request_timeout)
-
-    if stream:
-        client = httpx.AsyncClient(timeout=timeout)
-        start = time.time()
-        try:
-            req = client.build_request("POST", upstream_url, json=payload, headers=headers)
-            response = await client.send(req, stream=True)
-        except httpx.RequestError as exc:
-            await client.aclose()
-            logger.error("upstream.request_error", error=str(exc))
-            return JSONResponse(status_code=502, content={"error": "upstream_unreachable"})
-
-        elapsed_ms = int((time.time() - start) * 1000)
-        logger.info(
-            "upstream.response",
-            status=response.status_code,
-            elapsed_ms=elapsed_ms,
-        )
 
-        if response.status_code >= 400:
-            data = await response.aread()
-            await response.aclose()
-            await client.aclose()
-            return JSONResponse(status_code=response.status_code, content={"error": data.decode("utf-8", "ignore")})
+def _inline_images(offloaded: Offloaded, status: int) -> None:
+    # The upstream refused the file references (expired, deleted or never replicated): resend inline.
+    logger.warning("images.file_rejected", upstream=offloaded.upstream, status=status, images=len(offloaded))
+    offloaded.restore()
 
-        async def stream_bytes() -> Any:
-            try:
-                async for chunk in response.aiter_bytes():
-                    yield chunk
-            finally:
-                await response.aclose()
-                await client.aclose()
 
-        return StreamingResponse(stream_bytes(), media_type="text/event-stream")
+async def _proxy(payload: Dict[str, Any], stream: bool, transform: str, request: Request, n: Any = None) -> Any:
+    choices = _choice_count(n)
+    if choices is None:
+        limit = settings.fanout_max_choices
+        return JSONResponse(status_code=400, content={"error": f"n must be an integer between 1 and {limit}"})
+    headers = _build_upstream_headers(request)
+    await _offload_images(request, payload, headers)
+    if choices > 1:
+        return await _fan_out(payload, stream, transform, request, headers, choices)
+
+    cache: Optional[ResponseCache] = request.app.state.response_cache
+    cache_key: Optional[str] = None
+    cache_headers: Dict[str, str] = {}
+    if cache is not None and is_deterministic(payload):
+        directive = cache_directive(request.headers)
+        if directive == "bypass":
+            cache_headers[CACHE_HEADER] = "BYPASS"
+        else:
+            cache_key = request_key(payload, credential_scope(headers, settings.upstream_api_key_header))
+            cached = cache.get(cache_key) if directive == "use" else None
+            if cached is not None:
+                logger.info("cache.hit", transform=transform, stream=stream)
+                return _cached_reply(cached, stream, transform)
+            logger.info("cache.miss", transform=transform, stream=stream, directive=directive)
+            cache_headers[CACHE_HEADER] = "MISS"
+
+    conversations: Optional[ConversationIndex] = request.app.state.conversations
+    seed: Optional[str] = None
+    reuse: Optional[Reuse] = None
+    items = payload.get("input")
+    if conversations is not None and transform == "chat" and isinstance(items, list):
+        seed = f"{credential_scope(headers, settings.upstream_api_key_header)}:{payload.get('model')}"
+        reuse = conversations.lookup(seed, items)
 
-    async with httpx.AsyncClient(timeout=timeout) as client:
-        start = time.time()
-        try:
-            response = await client.post(upstream_url, json=payload, headers=headers)
-        except httpx.RequestError as exc:
-            logger.error("upstream.request_error", error=str(exc))
-            return JSONResponse(status_code=502, content={"error": "upstream_unreachable"})
-
-        elapsed_ms = int((time.time() - start) * 1000)
-        logger.info(
-            "upstream.response",
-            status=response.status_code,
-            elapsed_ms=elapsed_ms,
+    if stream:
+        chunks = await _open_stream(request, transform, _continued(payload, reuse), headers)
+        if reuse is not None and isinstance(chunks, Response) and chunks.status_code in REJECTED_STATUS:
+            conversations.reject(reuse)
+            chunks = await _open_stream(request, transform, payload, headers)
+        if isinstance(chunks, Response):
+            return chunks
+        translate = stream_chat_completions if transform == "chat" else stream_completions
+        timer = request.state.timer
+        coalesce = _coalesce_option(request)
+        on_complete = _recorder(conversations, seed, items) if seed is not None else None
+        guard = _guard(request, timer, chat_error_frame)
+        frames = translate(guard.watch(chunks), timer.token, coalesce, timer.frame, on_complete)
+        on_abort = _aborted(timer, streaming=True)
+        return SSEResponse(frames, on_abort=on_abort, guard=guard, sources=(chunks,), headers=cache_headers)
+
+    content = await _fetch_json(request, transform, _continued(payload, reuse), headers)
+    if reuse is not None and isinstance(content, Response) and content.status_code in REJECTED_STATUS:
+        conversations.reject(reuse)
+        content = await _fetch_json(request, transform, payload, headers)
+    if isinstance(content, Response):
+        return content
+
+    body = codec.loads(content)
+    if cache is not None and cache_key is not None:
+        cache.put(cache_key, content)
+    if seed is not None:
+        _remember(conversations, seed, items, body)
+    started = time.perf_counter()
+    result = to_chat_completions(body) if transform == "chat" else to_completions(body)
+    request.state.timer.transform(f"to_{transform}", started)
+    return JSONResponse(content=result, headers=cache_headers)
+
+
+def _choice_count(value: Any) -> Optional[int]:
+    if value is None:
+        return 1
+    if isinstance(value, bool) or not isinstance(value, int):
+        return None
+    return value if 1 <= value <= settings.fanout_max_choices else None
+
+
+def _coalesce_option(request: Request) -> Optional[Coalesce]:
+    return parse_coalesce(
+        request.headers.get(COALESCE_HEADER, request.query_params.get(COALESCE_PARAM)),
+        settings.stream_coalesce_bytes,
+        settings.stream_coalesce_ms,
+    )
+
+
+async def _fan_out(
+    payload: Dict[str, Any], stream: bool, transform: str, request: Request, headers: Dict[str, str], n: int
+) -> Any:
+    # The Responses API returns one candidate per call, so n choices are n concurrent upstream calls.
+    # They must stay distinct, which rules out request coalescing, the response cache and reuse.
+    if stream:
+        opened = await asyncio.gather(
+            *(_open_stream(request, transform, payload, headers, shared=False) for _ in range(n)),
+            return_exceptions=True,
         )
+        failed = next((item for item in opened if isinstance(item, (Response, BaseException))), None)
+        if failed is not None:
+            for item in opened:
+                if not isinstance(item, (Response, BaseException)):
+                    await item.aclose()
+            if isinstance(failed, BaseException):
+                raise failed
+            return failed
+        translate = stream_chat_completions if transform == "chat" else stream_completions
+        timer = request.state.timer
+        coalesce = _coalesce_option(request)
+        guard = _guard(request, timer, chat_error_frame)
+        streams = [
+            translate(guard.watch(chunks), timer.token, coalesce, timer.frame, index=index)
+            for index, chunks in enumerate(opened)
+        ]
+        on_abort = _aborted(timer, streaming=True)
+        return SSEResponse(merge_streams(streams), on_abort=on_abort, guard=guard, sources=opened)
+
+    replies = await asyncio.gather(
+        *(_fetch_json(request, transform, payload, headers, shared=False) for _ in range(n))
+    )
+    failed = next((item for item in replies if isinstance(item, Response)), None)
+    if failed is not None:
+        return failed
+    started = time.perf_counter()
+    convert = to_chat_completions if transform == "chat" else to_completions
+    result = merge_choices([convert(codec.loads(content)) for content in replies])
+    request.state.timer.transform(f"to_{transform}", started)
+    return JSONResponse(content=result)
+
+
+def _continued(payload: Dict[str, Any], reuse: Optional[Reuse]) -> Dict[str, Any]:
+    if reuse is None:
+        return payload
+    return {**payload, "input": payload["input"][reuse.start:], "previous_response_id": reuse.response_id}
+
+
+def _remember(conversations: ConversationIndex, seed: str, items: List[Any], response: Dict[str, Any]) -> None:
+    conversations.record(seed, items, extract_text_from_response(response.get("output", [])), response.get("id"))
+
+
+def _recorder(conversations: ConversationIndex, seed: str, items: List[Any]) -> Callable[[bytes], None]:
+    def on_complete(data: bytes) -> None:
+        _remember(conversations, seed, items, codec.loads(data).get("response") or {})
+
+    return on_complete
+
+
+async def _mark_chunks(chunks: AsyncIterator[bytes], on_token: Callable[[], None]) -> AsyncIterator[bytes]:
+    # Chunks pass through untouched; the parser only finds the text deltas worth timing.
+    parser = SSEParser()
+    try:
+        async for chunk in chunks:
+            for name, data in parser.feed(chunk):
+                if event_type(name, data) == DELTA_EVENT and delta_literal(data) is not None:
+                    on_token()
+            yield chunk
+    finally:
+        await chunks.aclose()
 
-        if response.status_code >= 400:
-            return JSONResponse(status_code=response.status_code, content={"error": response.text})
 
-        return JSONResponse(content=response.json())
+async def _proxy_passthrough(payload: Dict[str, Any], stream: bool, request: Request) -> Any:
+    headers = _build_upstream_headers(request)
+    await _offload_images(request, payload, headers)
+
+    if stream:
+        chunks = await _open_stream(request, "responses", payload, headers)
+        if isinstance(chunks, Response):
+            return chunks
+        timer = request.state.timer
+        guard = _guard(request, timer, responses_error_frame)
+        frames = _mark_chunks(guard.watch(chunks), timer.token)
+        return SSEResponse(frames, on_abort=_aborted(timer, streaming=True), guard=guard, sources=(chunks,))
+
+    content = await _fetch_json(request, "responses", payload, headers)
+    if isinstance(content, Response):
+        return content
+    return Response(content=content, media_type="application/json")
+
+
+def _routed(request: Request, payload: Dict[str, Any]) -> Tuple[Dict[str, Any], Route]:
+    route = request.app.state.router.table.resolve(payload.get("model"))
+    responses_payload = build_responses_request(payload, {})
+    if route.model:
+        responses_payload["model"] = route.model
+    for key, value in route.params.items():
+        responses_payload.setdefault(key, value)
+    return responses_payload, route
+
+
+def _model_label(request: Request, model: Any, route: Optional[Route] = None) -> str:
+    # Only configured names become series labels; client-chosen names would add series without bound.
+    if not model or not isinstance(model, str):
+        return ""
+    if route is None:
+        route = request.app.state.router.table.resolve(model)
+    if route.model:
+        return route.model
+    if model in request.app.state.metric_models or model in request.app.state.router.table.exact:
+        return model
+    return OTHER_MODEL
+
+
+def _build_request(request: Request, payload: Dict[str, Any], timer: RequestTimer) -> Dict[str, Any]:
+    started = time.perf_counter()
+    responses_payload, request.state.route = _routed(request, payload)
+    timer.begin(_model_label(request, payload.get("model"), request.state.route))
+    timer.transform("build_responses_request", started)
+    return responses_payload
 
 
 @app.post("/v1/chat/completions")
 async def chat_completions(request: Request) -> Any:
-    payload = await request.json()
-    model_map = settings.resolved_model_map()
-    responses_payload = build_responses_request(payload, model_map)
-    return await _proxy(responses_payload, bool(payload.get("stream")), "chat", request)
+    timer = _timer(request, "chat")
+    payload = await _read_json(request)
+    responses_payload = _build_request(request, payload, timer)
+    call = _proxy(responses_payload, bool(payload.get("stream")), "chat", request, payload.get("n"))
+    return await _observed(timer, _cancellable(request, _admitted(request, call)))
 
 
 @app.post("/v1/completions")
 async def completions(request: Request) -> Any:
-    payload = await request.json()
-    model_map = settings.resolved_model_map()
-    responses_payload = build_responses_request(payload, model_map)
-    return await _proxy(responses_payload, bool(payload.get("stream")), "completions", request)
+    timer = _timer(request, "completions")
+    payload = await _read_json(request)
+    responses_payload = _build_request(request, payload, timer)
+    call = _proxy(responses_payload, bool(payload.get("stream")), "completions", request, payload.get("n"))
+    return await _observed(timer, _cancellable(request, _admitted(request, call)))
 
 
 @app.post("/v1/responses")
 async def responses(request: Request) -> Any:
-    payload = await request.json()
-    return await _proxy_passthrough(payload, bool(payload.get("stream")), request)
+    timer = _timer(request, "responses")
+    payload = await _read_json(request)
+    timer.begin(_model_label(request, payload.get("model")))
+    call = _proxy_passthrough(payload, bool(payload.get("stream")), request)
+    return await _observed(timer, _cancellable(request, _admitted(request, call)))
+
+
+@app.post("/v1/batch")
+async def batch(request: Request) -> Any:
+    timer = _timer(request, "batch")
+    timer.begin(None)
+    return await _observed(timer, _batch(request))
+
+
+async def _batch(request: Request) -> Any:
+    headers = _build_upstream_headers(request)
+    try:
+        concurrency = int(request.query_params.get("concurrency", settings.batch_concurrency))
+    except ValueError:
+        concurrency = settings.batch_concurrency
+    concurrency = min(max(concurrency, 1), settings.batch_max_concurrency)
+    admission: AdmissionController = request.app.state.admission
+    if admission.per_key_limit > 0:
+        # Items beyond the key's own limit would only fill its queue and be turned away.
+        concurrency = min(concurrency, admission.per_key_limit)
+    retry: RetryPolicy = request.app.state.batch_retry
+
+    async def handle(number: int, line: Optional[bytes]) -> bytes:
+        return await _batch_item(request, headers, retry, number, line)
+
+    results = run_batch(iter_lines(request.stream(), settings.batch_max_line_bytes), handle, concurrency)
+    return BatchResponse(results, media_type=MEDIA_TYPE)
+
+
+async def _batch_item(
+    request: Request, headers: Dict[str, str], retry: RetryPolicy, number: int, line: Optional[bytes]
+) -> bytes:
+    if line is None:
+        return error_line(None, "line_too_long", f"line {number} exceeds {settings.batch_max_line_bytes} bytes")
+    try:
+        entry = codec.loads(line)
+    except codec.JSONDecodeError:
+        return error_line(None, "invalid_json", f"line {number} is not valid JSON")
+    if not isinstance(entry, dict):
+        return error_line(None, "invalid_request", f"line {number} must be a JSON object")
+    custom_id = entry.get("custom_id")
+    transform = BATCH_ROUTES.get(entry.get("url") or "/v1/chat/completions")
+    body = entry.get("body")
+    if transform is None or not isinstance(body, dict):
+        return error_line(custom_id, "invalid_request", "url must be a chat or completions path and body an object")
+
+    responses_payload, route = _routed(request, {**body, "stream": False})
+    timer = RequestTimer(f"batch_{transform}", request.app.state.slow_requests)
+    timer.begin(_model_label(request, body.get("model"), route))
+    # Every item takes its own admission slot in the batch lane, so a batch cannot bypass the limits.
+    admission: AdmissionController = request.app.state.admission
+    key = credential_scope(request.headers, settings.upstream_api_key_header)
+    status = 500
+    if admission.enabled:
+        await _admit_batch_item(admission, key)
+    try:
+        response = await retry.call(
+            lambda: _send(
+                request,
+                "POST",
+                settings.upstream_responses_path,
+                headers,
+                responses_payload,
+                timer=timer,
+                **_route_kwargs(_upstream(request), route),
+            )
+        )
+        status = response.status_code
+        if status >= 400:
+            return result_line(custom_id, status, error={"code": "upstream_error", "message": response.text})
+        data = codec.loads(response.content)
+        result = to_chat_completions(data) if transform == "chat" else to_completions(data)
+        return result_line(custom_id, status, result)
+    except httpx.RequestError as exc:
+        status = 502
+        logger.error("upstream.request_error", error=str(exc), custom_id=custom_id)
+        return error_line(custom_id, "upstream_unreachable", str(exc), 502)
+    finally:
+        if admission.enabled:
+            admission.release(key)
+        timer.finish(status)
+
+
+async def _admit_batch_item(admission: AdmissionController, key: str) -> None:
+    # Rejections are backpressure, not a verdict on the item: wait them out instead of failing the line.
+    while True:
+        try:
+            await admission.acquire(key, "batch")
+            return
+        except Rejected as exc:
+            await asyncio.sleep(exc.retry_after)
 
 
 @app.get("/v1/models")
 async def models(request: Request) -> Any:
-    upstream_url = settings.upstream_models_url()
-    headers = _build_upstream_headers(request)
-    timeout = httpx.Timeout(settings.request_timeout)
+    timer = _timer(request, "models")
+    timer.begin(None)
+    return await _observed(timer, _models(request))
 
-    async with httpx.AsyncClient(timeout=timeout) as client:
-        start = time.time()
-        try:
-            response = await client.get(upstream_url, headers=headers, params=request.query_params)
-        except httpx.RequestError as exc:
-            logger.error("upstream.request_error", error=str(exc))
-            return JSONResponse(status_code=502, content={"error": "upstream_unreachable"})
-
-        elapsed_ms = int((time.time() - start) * 1000)
-        logger.info(
-            "upstream.response",
-            status=response.status_code,
-            elapsed_ms=elapsed_ms,
-        )
 
-        if response.status_code >= 400:
-            return JSONResponse(status_code=response.status_code, content={"error": response.text})
+async def _models(request: Request) -> Any:
+    headers = _build_upstream_headers(request)
 
-        return JSONResponse(content=response.json())
+    async def fetch() -> Tuple[int, bytes]:
+        response = await _send(request, "GET", "/v1/models", headers, params=request.query_params)
+        return response.status_code, response.content
+
+    models_cache: Optional[ModelsCache] = request.app.state.models_cache
+    try:
+        if models_cache is not None:
+            scope = credential_scope(headers, settings.upstream_api_key_header)
+            key = f"{scope}:{sorted(request.query_params.multi_items())}"
+            status, content = await models_cache.get(key, fetch)
+        else:
+            status, content = await fetch()
+    except httpx.RequestError as exc:
+        return _unreachable(exc)
+
+    if status >= 400:
+        return _upstream_error(status, content)
+
+    return JSONResponse(content=alias_models(codec.loads(content), request.app.state.router.table.aliases()))
@@ -0,0 +1,394 @@
+from __future__ import annotations
+
+import heapq
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+GAP_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+CPU_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], Any] = {}
+
+    def labels(self, *values: Any) -> Any:
+        key = tuple("" if value is None else str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            child = self._children[key] = self._new_child()
+        return child
+
+    def _new_child(self) -> Any:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in list(self._children.items()):
+            lines.extend(self._render_child(key, child))
+        return lines
+
+    def _render_child(self, key: Tuple[str, ...], child: Any) -> List[str]:
+        labels = _format_labels(self.labelnames, key)
+        return [f"{self.name}{labels} {_format_value(child.value)}"]
+
+
+class _Value:
+    __slots__ = ("value",)
+
+    def __init__(self) -> None:
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+
+class _HistogramValue:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> _HistogramValue:
+        return _HistogramValue(self.buckets)
+
+    def _render_child(self, key: Tuple[str, ...], child: Any) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), child.counts):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else _format_value(bound)
+            labels = _format_labels(self.labelnames, key, f'le="{le}"')
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.labelnames, key)
+        lines.append(f"{self.name}_sum{labels} {_format_value(child.sum)}")
+        lines.append(f"{self.name}_count{labels} {child.count}")
+        return lines
+
+
+class Registry:
+    def __init__(self) -> None:
+        self.metrics: List[_Metric] = []
+
+    def register(self, metric: Any) -> Any:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> bytes:
+        lines: List[str] = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+REGISTRY = Registry()
+LABELS = ("route", "model")
+# Series label for models that are neither routed nor listed in METRICS_MODELS.
+OTHER_MODEL = "other"
+
+REQUEST_SECONDS = REGISTRY.register(
+    Histogram("bridge_request_duration_seconds", "Total request latency including streamed body.", LABELS)
+)
+REQUESTS_TOTAL = REGISTRY.register(
+    Counter("bridge_requests_total", "Requests by response status code.", LABELS + ("status",))
+)
+IN_FLIGHT = REGISTRY.register(Gauge("bridge_requests_in_flight", "Requests currently being served.", LABELS))
+UPSTREAM_CONNECT_SECONDS = REGISTRY.register(
+    Histogram("bridge_upstream_connect_seconds", "Time to open a new upstream connection (TCP and TLS).", LABELS)
+)
+UPSTREAM_TTFB_SECONDS = REGISTRY.register(
+    Histogram("bridge_upstream_ttfb_seconds", "Time from dispatch to upstream response headers.", LABELS)
+)
+TTFT_SECONDS = REGISTRY.register(
+    Histogram("bridge_time_to_first_token_seconds", "Time from request start to the first streamed token.", LABELS)
+)
+TOKEN_GAP_SECONDS = REGISTRY.register(
+    Histogram("bridge_inter_token_seconds", "Gap between consecutive streamed tokens.", LABELS, GAP_BUCKETS)
+)
+TRANSFORM_SECONDS = REGISTRY.register(
+    Histogram("bridge_transform_seconds", "Adapter transform time per call.", LABELS + ("stage",), CPU_BUCKETS)
+)
+COALESCED_DELTAS = REGISTRY.register(
+    Counter("bridge_stream_coalesced_deltas_total", "Upstream deltas folded into coalesced SSE frames.", LABELS)
+)
+COALESCED_FRAMES = REGISTRY.register(
+    Counter("bridge_stream_coalesced_frames_total", "SSE frames written by coalescing streams.", LABELS)
+)
+UPSTREAM_ABORTED = REGISTRY.register(
+    Counter("bridge_upstream_aborted_total", "Upstream calls cancelled because the client disconnected.", ("route",))
+)
+STREAM_TIMEOUTS = REGISTRY.register(
+    Counter("bridge_stream_timeouts_total", "Streams ended early by the idle or total timeout.", ("route", "reason"))
+)
+POOL_CONNECTIONS = REGISTRY.register(
+    Gauge("bridge_upstream_pool_connections", "Upstream pool connections by state.", ("state",))
+)
+POOL_WAITING = REGISTRY.register(Gauge("bridge_upstream_pool_waiting", "Requests waiting for a pool connection."))
+UPSTREAM_OUTSTANDING = REGISTRY.register(
+    Gauge("bridge_upstream_outstanding", "Outstanding requests per upstream endpoint.", ("upstream",))
+)
+UPSTREAM_LATENCY = REGISTRY.register(
+    Gauge("bridge_upstream_latency_seconds", "Smoothed time to headers per upstream endpoint.", ("upstream",))
+)
+UPSTREAM_ERRORS = REGISTRY.register(
+    Counter("bridge_upstream_errors_total", "Transport errors and 5xx replies per upstream endpoint.", ("upstream",))
+)
+UPSTREAM_EJECTED = REGISTRY.register(
+    Gauge("bridge_upstream_ejected", "1 while the circuit breaker has ejected the endpoint.", ("upstream",))
+)
+
+ADMISSION_QUEUE_DEPTH = REGISTRY.register(
+    Gauge("bridge_admission_queue_depth", "Requests waiting for an admission slot.", ("lane",))
+)
+ADMISSION_WAIT_SECONDS = REGISTRY.register(
+    Histogram("bridge_admission_wait_seconds", "Time spent waiting for an admission slot.", ("lane",))
+)
+ADMISSION_REJECTED = REGISTRY.register(
+    Counter("bridge_admission_rejected_total", "Requests shed by admission control.", ("lane", "reason"))
+)
+
+LOG_DROPPED = REGISTRY.register(
+    Counter("bridge_log_dropped_total", "Log records dropped because the log queue was full.")
+)
+LOG_SAMPLED_OUT = REGISTRY.register(
+    Counter("bridge_log_sampled_out_total", "Log events skipped by per-event sampling.")
+)
+
+
+def update_log_counters(stats: Dict[str, Any]) -> None:
+    LOG_DROPPED.labels().set(stats["dropped"])
+    LOG_SAMPLED_OUT.labels().set(stats["sampled_out"])
+
+
+def update_pool_gauges(stats: Dict[str, Any]) -> None:
+    POOL_CONNECTIONS.labels("active").set(stats["active_connections"])
+    POOL_CONNECTIONS.labels("idle").set(stats["idle_connections"])
+    POOL_CONNECTIONS.labels("max").set(stats["max_connections"])
+    POOL_WAITING.labels().set(stats["waiting_requests"])
+    for upstream in stats.get("upstreams", []):
+        name = upstream["name"]
+        UPSTREAM_OUTSTANDING.labels(name).set(upstream["outstanding"])
+        UPSTREAM_LATENCY.labels(name).set(upstream["latency_ms"] / 1000)
+        UPSTREAM_ERRORS.labels(name).set(upstream["errors"])
+        UPSTREAM_EJECTED.labels(name).set(1 if upstream["ejected"] else 0)
+
+
+class SlowRequests:
+    def __init__(self, size: int, window: float, clock: Callable[[], float] = time.time) -> None:
+        self.size = size
+        self.window = window
+        self.clock = clock
+        self._heap: List[Tuple[float, int, Dict[str, Any]]] = []
+        self._seq = 0
+        self._purged = 0.0
+
+    def _purge(self, now: float) -> None:
+        self._purged = now
+        if self.window > 0:
+            cutoff = now - self.window
+            self._heap = [item for item in self._heap if item[2]["at"] >= cutoff]
+            heapq.heapify(self._heap)
+
+    def record(self, timer: "RequestTimer", status: int, total: float) -> None:
+        if self.size <= 0:
+            return
+        now = self.clock()
+        if now - self._purged >= 1.0:
+            self._purge(now)
+        heap = self._heap
+        # Only requests slower than the current minimum pay for building an entry.
+        if len(heap) >= self.size and total <= heap[0][0]:
+            return
+        entry = {
+            "at": now,
+            "route": timer.route,
+            "model": timer.model,
+            "status": status,
+            "total_ms": round(total * 1000, 2),
+            "phases_ms": timer.phases_ms(),
+            "request_bytes": timer.request_bytes,
+            "response_bytes": timer.response_bytes,
+            "deltas": timer.deltas,
+        }
+        self._seq += 1
+        if len(heap) >= self.size:
+            heapq.heapreplace(heap, (total, self._seq, entry))
+        else:
+            heapq.heappush(heap, (total, self._seq, entry))
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        self._purge(self.clock())
+        return [entry for _, _, entry in sorted(self._heap, key=lambda item: item[0], reverse=True)]
+
+
+class RequestTimer:
+    __slots__ = (
+        "route",
+        "model",
+        "start",
+        "last_token",
+        "active",
+        "finished",
+        "phases",
+        "request_bytes",
+        "response_bytes",
+        "deltas",
+        "slow",
+        "_gap",
+        "_connect_started",
+        "_headers_sent",
+        "_connect_elapsed",
+    )
+
+    def __init__(self, route: str, slow: Optional[SlowRequests] = None) -> None:
+        self.route = route
+        self.model = ""
+        self.start = time.perf_counter()
+        self.last_token = 0.0
+        self.active = False
+        self.finished = False
+        self.phases: Dict[str, float] = {}
+        self.request_bytes = 0
+        self.response_bytes: Optional[int] = None
+        self.deltas = 0
+        self.slow = slow
+        self._gap: Any = None
+        self._connect_started = 0.0
+        self._headers_sent = 0.0
+        self._connect_elapsed = 0.0
+
+    def begin(self, model: Optional[str]) -> None:
+        self.model = model or ""
+        self.active = True
+        IN_FLIGHT.labels(self.route, self.model).inc()
+
+    def phase(self, name: str, seconds: float) -> None:
+        phases = self.phases
+        phases[name] = phases.get(name, 0.0) + seconds
+
+    def transform(self, stage: str, started: float) -> None:
+        elapsed = time.perf_counter() - started
+        TRANSFORM_SECONDS.labels(self.route, self.model, stage).observe(elapsed)
+        self.phase(stage, elapsed)
+
+    def upstream_headers(self, started: float) -> None:
+        now = time.perf_counter()
+        UPSTREAM_TTFB_SECONDS.labels(self.route, self.model).observe(now - started)
+        # Split dispatch-to-headers where the request headers went out: before is connection
+        # acquisition (a new connect is its own phase), after is upstream time to first byte.
+        sent = self._headers_sent if self._headers_sent >= started else started
+        self.phase("acquire", max(sent - started - self._connect_elapsed, 0.0))
+        self.phase("ttfb", now - sent)
+        self._headers_sent = 0.0
+        self._connect_elapsed = 0.0
+
+    async def trace(self, event: str, info: Dict[str, Any]) -> None:
+        if event == "connection.connect_tcp.started":
+            self._connect_started = time.perf_counter()
+        elif event.endswith("send_request_headers.started"):
+            now = time.perf_counter()
+            self._headers_sent = now
+            if self._connect_started:
+                elapsed = now - self._connect_started
+                UPSTREAM_CONNECT_SECONDS.labels(self.route, self.model).observe(elapsed)
+                self.phase("connect", elapsed)
+                self._connect_elapsed = elapsed
+                self._connect_started = 0.0
+
+    def phases_ms(self) -> Dict[str, float]:
+        return {name: round(value * 1000, 3) for name, value in self.phases.items()}
+
+    def server_timing(self) -> str:
+        parts = [f"{name};dur={value * 1000:.2f}" for name, value in self.phases.items()]
+        parts.append(f"total;dur={(time.perf_counter() - self.start) * 1000:.2f}")
+        return ", ".join(parts)
+
+    def token(self) -> None:
+        self.deltas += 1
+        now = time.perf_counter()
+        if self._gap is None:
+            TTFT_SECONDS.labels(self.route, self.model).observe(now - self.start)
+            self._gap = TOKEN_GAP_SECONDS.labels(self.route, self.model)
+        else:
+            self._gap.observe(now - self.last_token)
+        self.last_token = now
+
+    def frame(self, deltas: int) -> None:
+        COALESCED_DELTAS.labels(self.route, self.model).inc(deltas)
+        COALESCED_FRAMES.labels(self.route, self.model).inc()
+
+    def finish(self, status: int) -> None:
+        if self.finished:
+            return
+        self.finished = True
+        if self.active:
+            IN_FLIGHT.labels(self.route, self.model).dec()
+        total = time.perf_counter() - self.start
+        REQUEST_SECONDS.labels(self.route, self.model).observe(total)
+        REQUESTS_TOTAL.labels(self.route, self.model, status).inc()
+        if self.slow is not None:
+            self.slow.record(self, status, total)
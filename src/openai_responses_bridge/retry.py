@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Set
+
+import httpx
+from tenacity import AsyncRetrying, RetryCallState, stop_after_attempt, wait_random_exponential
+
+from .config import Settings
+from .logging_setup import get_logger
+
+logger = get_logger()
+
+RETRYABLE_STATUS = frozenset({429, 500, 502, 503, 504})
+RETRYABLE_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+Attempt = Callable[[], Awaitable[httpx.Response]]
+
+
+def retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryBudget:
+    def __init__(self, ratio: float, min_per_second: float, clock: Callable[[], float] = time.monotonic) -> None:
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.clock = clock
+        self.capacity = max(10.0, min_per_second * 10)
+        self.balance = self.capacity
+        self._updated = clock()
+        self.spent = 0
+        self.denied = 0
+
+    def deposit(self) -> None:
+        self._refill()
+        self.balance = min(self.capacity, self.balance + self.ratio)
+
+    def withdraw(self) -> bool:
+        self._refill()
+        if self.balance < 1.0:
+            self.denied += 1
+            return False
+        self.balance -= 1.0
+        self.spent += 1
+        return True
+
+    def _refill(self) -> None:
+        now = self.clock()
+        self.balance = min(self.capacity, self.balance + (now - self._updated) * self.min_per_second)
+        self._updated = now
+
+
+class LatencyWindow:
+    def __init__(self, size: int = 256, min_samples: int = 20) -> None:
+        self.samples: Deque[float] = deque(maxlen=size)
+        self.min_samples = min_samples
+
+    def add(self, value: float) -> None:
+        self.samples.append(value)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if len(self.samples) < self.min_samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def _failed(task: "asyncio.Future[httpx.Response]") -> bool:
+    return task.exception() is not None or task.result().status_code >= 500
+
+
+class RetryPolicy:
+    def __init__(self, settings: Settings) -> None:
+        self.attempts = max(1, settings.retry_max_attempts)
+        self.backoff_max = settings.retry_backoff_max
+        self.hedge_enabled = settings.hedge_enabled
+        self.hedge_percentile = settings.hedge_percentile
+        self.hedge_min_delay = settings.hedge_min_delay
+        self.budget = RetryBudget(settings.retry_budget_ratio, settings.retry_budget_min_per_second)
+        self.latencies = LatencyWindow()
+        self._jitter = wait_random_exponential(multiplier=settings.retry_backoff_base, max=settings.retry_backoff_max)
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.attempts > 1 or self.hedge_enabled
+
+    def _should_retry(self, state: RetryCallState) -> bool:
+        outcome = state.outcome
+        if outcome is None:
+            return False
+        if outcome.failed:
+            retryable = isinstance(outcome.exception(), RETRYABLE_ERRORS)
+        else:
+            retryable = outcome.result().status_code in RETRYABLE_STATUS
+        if not retryable or state.attempt_number >= self.attempts:
+            return False
+        if not outcome.failed:
+            delay = retry_after_seconds(outcome.result().headers.get("retry-after"))
+            if delay is not None and delay > self.backoff_max:
+                # Retrying sooner than the upstream asked would only be rejected again.
+                logger.info("retry.after_too_long", attempt=state.attempt_number, retry_after=delay)
+                return False
+        if not self.budget.withdraw():
+            logger.warning("retry.budget_exhausted", attempt=state.attempt_number)
+            return False
+        self.retries += 1
+        logger.info("retry.scheduled", attempt=state.attempt_number)
+        return True
+
+    def _wait(self, state: RetryCallState) -> float:
+        outcome = state.outcome
+        if outcome is not None and not outcome.failed:
+            delay = retry_after_seconds(outcome.result().headers.get("retry-after"))
+            if delay is not None:
+                return delay
+        return self._jitter(state)
+
+    async def call(self, attempt: Attempt) -> httpx.Response:
+        self.budget.deposit()
+        retrying = AsyncRetrying(
+            stop=stop_after_attempt(self.attempts),
+            wait=self._wait,
+            retry=self._should_retry,
+            retry_error_callback=lambda state: state.outcome.result(),
+        )
+        return await retrying(self._hedged, attempt)
+
+    async def _timed(self, attempt: Attempt) -> httpx.Response:
+        start = time.perf_counter()
+        response = await attempt()
+        if response.status_code < 500:
+            self.latencies.add(time.perf_counter() - start)
+        return response
+
+    async def _hedged(self, attempt: Attempt) -> httpx.Response:
+        deadline = self.latencies.percentile(self.hedge_percentile) if self.hedge_enabled else None
+        if deadline is None:
+            return await self._timed(attempt)
+
+        primary = asyncio.ensure_future(self._timed(attempt))
+        pending: Set["asyncio.Future[httpx.Response]"] = {primary}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=max(deadline, self.hedge_min_delay))
+            if done or not self.budget.withdraw():
+                return await primary
+            self.hedges += 1
+            hedge = asyncio.ensure_future(self._timed(attempt))
+            pending = {primary, hedge}
+            while True:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                # Successful legs first: both legs can land in the same ``done`` set.
+                for task in sorted(done, key=_failed):
+                    # A failed or 5xx leg only wins once the other leg has also finished.
+                    if pending and _failed(task):
+                        continue
+                    if task is hedge:
+                        self.hedge_wins += 1
+                    return task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        deadline = self.latencies.percentile(self.hedge_percentile) if self.hedge_enabled else None
+        return {
+            "max_attempts": self.attempts,
+            "retries": self.retries,
+            "hedge_enabled": self.hedge_enabled,
+            "hedge_deadline_ms": round(deadline * 1000, 2) if deadline is not None else None,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "budget_balance": round(self.budget.balance, 2),
+            "budget_spent": self.budget.spent,
+            "budget_denied": self.budget.denied,
+        }
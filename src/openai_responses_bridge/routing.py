@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import re
+import signal
+from fnmatch import translate
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from . import codec
+from .logging_setup import get_logger
+from .timeouts import parse_phases
+
+logger = get_logger()
+
+_MEMO_SIZE = 4096
+
+
+class Route(NamedTuple):
+    model: Optional[str] = None
+    upstream: Optional[str] = None
+    timeout: Optional[float] = None
+    params: Dict[str, Any] = {}
+    timeouts: Dict[str, float] = {}
+
+
+DEFAULT_ROUTE = Route()
+
+
+def _route(rule: Dict[str, Any]) -> Route:
+    timeout = rule.get("timeout")
+    params = rule.get("params")
+    return Route(
+        model=str(rule["model"]) if rule.get("model") else None,
+        upstream=str(rule["upstream"]) if rule.get("upstream") else None,
+        timeout=float(timeout) if timeout is not None else None,
+        params=dict(params) if isinstance(params, dict) else {},
+        timeouts=parse_phases(rule.get("timeouts")),
+    )
+
+
+def _is_pattern(value: str) -> bool:
+    return any(char in value for char in "*?[")
+
+
+class RoutingTable:
+    def __init__(self, rules: List[Dict[str, Any]]) -> None:
+        self.exact: Dict[str, Route] = {}
+        # Trailing-star rules are indexed by prefix; other globs are scanned in rule order.
+        self.prefixes: Dict[str, Tuple[int, Route]] = {}
+        self.globs: List[Tuple[int, Callable[[str], Any], Route]] = []
+        for order, rule in enumerate(rules):
+            pattern = str(rule.get("match") or "")
+            if not pattern:
+                continue
+            route = _route(rule)
+            if not _is_pattern(pattern):
+                self.exact.setdefault(pattern, route)
+            elif pattern.endswith("*") and not _is_pattern(pattern[:-1]):
+                self.prefixes.setdefault(pattern[:-1], (order, route))
+            else:
+                self.globs.append((order, re.compile(translate(pattern)).match, route))
+        self._memo: Dict[str, Route] = {}
+
+    @classmethod
+    def from_sources(cls, model_map: Dict[str, str], document: Any = None) -> "RoutingTable":
+        rules: List[Dict[str, Any]] = []
+        if isinstance(document, dict):
+            document = document.get("routes", [])
+        if isinstance(document, list):
+            rules.extend(rule for rule in document if isinstance(rule, dict))
+        # File rules take precedence; MODEL_MAP keeps working as exact renames.
+        rules.extend({"match": alias, "model": target} for alias, target in model_map.items())
+        return cls(rules)
+
+    def resolve(self, model: Optional[str]) -> Route:
+        if not model:
+            return DEFAULT_ROUTE
+        route = self.exact.get(model)
+        if route is not None:
+            return route
+        route = self._memo.get(model)
+        if route is not None:
+            return route
+        route = DEFAULT_ROUTE
+        best = -1
+        prefixes = self.prefixes
+        for end in range(len(model) + 1):
+            hit = prefixes.get(model[:end])
+            if hit is not None and (best < 0 or hit[0] < best):
+                best, route = hit
+        for order, match, candidate in self.globs:
+            if best >= 0 and order > best:
+                break
+            if match(model):
+                route = candidate
+                break
+        if len(self._memo) >= _MEMO_SIZE:
+            self._memo.clear()
+        self._memo[model] = route
+        return route
+
+    def aliases(self) -> Dict[str, str]:
+        return {alias: route.model for alias, route in self.exact.items() if route.model and route.model != alias}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "exact_rules": len(self.exact),
+            "prefix_rules": len(self.prefixes),
+            "glob_rules": len(self.globs),
+            "memoized": len(self._memo),
+        }
+
+
+class Router:
+    def __init__(self, model_map: Dict[str, str], path: str = "", interval: float = 0.0) -> None:
+        self.model_map = model_map
+        self.path = path
+        self.interval = interval
+        self.table = RoutingTable.from_sources(model_map)
+        self.reloads = 0
+        self.errors = 0
+        self._mtime = 0.0
+        self._task: Optional["asyncio.Task[None]"] = None
+        self._signal = False
+        if path:
+            self.reload()
+
+    def reload(self) -> bool:
+        if not self.path:
+            return False
+        try:
+            mtime = os.stat(self.path).st_mtime
+            with open(self.path, "rb") as handle:
+                document = codec.loads(handle.read())
+            table = RoutingTable.from_sources(self.model_map, document)
+        except (OSError, ValueError, TypeError, KeyError) as exc:
+            self.errors += 1
+            logger.error("routing.reload_error", path=self.path, error=str(exc))
+            return False
+        # Requests read ``self.table`` once, so swapping the reference is atomic for them.
+        self.table = table
+        self._mtime = mtime
+        self.reloads += 1
+        logger.info("routing.reloaded", path=self.path, **table.stats())
+        return True
+
+    def start(self) -> None:
+        if not self.path:
+            return
+        loop = asyncio.get_running_loop()
+        try:
+            loop.add_signal_handler(signal.SIGHUP, self.reload)
+            self._signal = True
+        except (AttributeError, NotImplementedError, RuntimeError, ValueError):
+            logger.info("routing.sighup_unavailable")
+        if self.interval > 0:
+            self._task = asyncio.ensure_future(self._watch())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._signal:
+            asyncio.get_running_loop().remove_signal_handler(signal.SIGHUP)
+            self._signal = False
+
+    async def _watch(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                mtime = os.stat(self.path).st_mtime
+            except OSError:
+                continue
+            if mtime != self._mtime:
+                self.reload()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"path": self.path or None, "reloads": self.reloads, "errors": self.errors, **self.table.stats()}
@@ -1,102 +1,512 @@
 from __future__ import annotations
 
-import json
-from typing import AsyncIterator, Dict
+import asyncio
+import time
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
 
+import anyio
+import httpx
+from fastapi.responses import StreamingResponse
+from starlette.types import Message, Receive, Scope, Send
 
-def _sse(data: Dict) -> bytes:
-    return f"data: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8")
+from . import codec
+from .timeouts import HEARTBEAT_FRAME, StreamGuard
 
+DONE_FRAME = b"data: [DONE]\n\n"
+DELTA_EVENT = b"response.output_text.delta"
+COMPLETED_EVENT = b"response.completed"
 
-async def stream_chat_completions(lines: AsyncIterator[str]) -> AsyncIterator[bytes]:
-    for_line_id = "chatcmpl-adapter"
-    async for line in lines:
-        if not line.startswith("data: "):
-            continue
-        payload = line[6:].strip()
-        if payload == "[DONE]":
-            yield b"data: [DONE]\n\n"
-            continue
+_DELTA_TYPE = b'"type":"response.output_text.delta"'
+_COMPLETED_TYPE = b'"type":"response.completed"'
+_DELTA_KEY = b'"delta":'
+_PLACEHOLDER = "__bridge_delta__"
+
+Event = Tuple[bytes, bytes]
+Templates = Tuple[bytes, bytes, bytes]
+Coalesce = Tuple[int, float]
+
+COALESCE_HEADER = "X-Bridge-Coalesce"
+COALESCE_PARAM = "coalesce"
+_DEFAULT_COALESCE_BYTES = 256
+
+
+class SSEResponse(StreamingResponse):
+    media_type = "text/event-stream"
+
+    def __init__(
+        self,
+        content: Any,
+        on_abort: Optional[Callable[[], None]] = None,
+        guard: Optional[StreamGuard] = None,
+        sources: Sequence[AsyncIterator[bytes]] = (),
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(content, **kwargs)
+        self.on_abort = on_abort
+        self.guard = guard
+        self.sources = sources
+        self.completed = False
 
+    async def stream_response(self, send: Send) -> None:
+        if self.guard is None:
+            await super().stream_response(send)
+        else:
+            await self._guarded(send, self.guard)
+        self.completed = True
+
+    async def _guarded(self, send: Send, guard: StreamGuard) -> None:
+        # Frames are written by a pump task; this loop only wakes for heartbeats and deadlines,
+        # so the per-frame path stays a plain ``async for`` plus an uncontended lock.
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        lock = asyncio.Lock()
+        # The pump is stopped through a cancel scope rather than ``Task.cancel`` so httpcore's
+        # shielded cleanup still returns the upstream connection to the pool.
+        scope = anyio.CancelScope()
+        pump = asyncio.ensure_future(self._pump(send, lock, guard, scope))
+        reason: Optional[str] = None
+        error: Optional[Exception] = None
         try:
-            event = json.loads(payload)
-        except json.JSONDecodeError:
-            continue
+            while not pump.done():
+                await asyncio.wait((pump,), timeout=guard.wake_in())
+                if pump.done():
+                    break
+                verdict = guard.check()
+                if verdict == "heartbeat":
+                    async with lock:
+                        await send({"type": "http.response.body", "body": HEARTBEAT_FRAME, "more_body": True})
+                    guard.sent = time.monotonic()
+                elif verdict is not None:
+                    reason = verdict
+                    scope.cancel()
+                    await asyncio.wait((pump,))
+                    await self.body_iterator.aclose()
+                    break
+        finally:
+            if not pump.done():
+                scope.cancel()
+                with anyio.CancelScope(shield=True):
+                    await asyncio.wait((pump,))
+        if reason is None and not pump.cancelled():
+            outcome = pump.result()
+            if isinstance(outcome, Exception):
+                error = outcome
+            else:
+                reason = outcome
+        if error is not None:
+            # Any other upstream failure still ends with an error frame, so the client sees a complete stream.
+            await send({"type": "http.response.body", "body": guard.failed(error), "more_body": True})
+        elif reason is not None:
+            await send({"type": "http.response.body", "body": guard.expired(reason), "more_body": True})
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
 
-        event_type = event.get("type")
-        if event_type == "response.output_text.delta":
-            delta = event.get("delta") or event.get("text") or ""
-            chunk = {
-                "id": for_line_id,
-                "object": "chat.completion.chunk",
-                "choices": [
-                    {
-                        "index": 0,
-                        "delta": {"content": delta},
-                        "finish_reason": None,
-                    }
-                ],
-            }
-            yield _sse(chunk)
-        elif event_type == "response.completed":
-            chunk = {
-                "id": for_line_id,
-                "object": "chat.completion.chunk",
-                "choices": [
-                    {
-                        "index": 0,
-                        "delta": {},
-                        "finish_reason": "stop",
-                    }
-                ],
-            }
-            yield _sse(chunk)
-            yield b"data: [DONE]\n\n"
-
-
-async def stream_completions(lines: AsyncIterator[str]) -> AsyncIterator[bytes]:
-    for_line_id = "cmpl-adapter"
-    async for line in lines:
-        if not line.startswith("data: "):
-            continue
-        payload = line[6:].strip()
-        if payload == "[DONE]":
-            yield b"data: [DONE]\n\n"
-            continue
+    async def _pump(
+        self, send: Send, lock: asyncio.Lock, guard: StreamGuard, scope: anyio.CancelScope
+    ) -> Union[str, Exception, None]:
+        try:
+            with scope:
+                async for chunk in self.body_iterator:
+                    if not isinstance(chunk, bytes):
+                        chunk = chunk.encode(self.charset)
+                    async with lock:
+                        await send({"type": "http.response.body", "body": chunk, "more_body": True})
+                    guard.sent = time.monotonic()
+        except httpx.TimeoutException:
+            # The transport's own read timeout is set to the idle timeout once headers arrive.
+            return "idle"
+        except Exception as exc:
+            return exc
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        disconnected = False
+
+        async def watched() -> Message:
+            nonlocal disconnected
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                disconnected = True
+            return message
 
         try:
-            event = json.loads(payload)
-        except json.JSONDecodeError:
+            await super().__call__(scope, watched, send)
+        finally:
+            if not self.completed:
+                # Close the generator chain now so the upstream response is released instead of
+                # waiting for garbage collection. Only a real disconnect counts as an abort.
+                if disconnected and self.on_abort is not None:
+                    self.on_abort()
+                await self.body_iterator.aclose()
+                # A chain that never started iterating does not reach its upstream sources.
+                for source in self.sources:
+                    await _close(source)
+
+
+def _sse(data: Dict) -> bytes:
+    return codec.sse_frame(data)
+
+
+class SSEParser:
+    __slots__ = ("_buffer",)
+
+    def __init__(self) -> None:
+        self._buffer = b""
+
+    def feed(self, chunk: bytes) -> List[Event]:
+        buffer = self._buffer + chunk if self._buffer else chunk
+        if b"\r" in buffer:
+            held = b""
+            if buffer.endswith(b"\r"):
+                buffer, held = buffer[:-1], b"\r"
+            buffer = buffer.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+        else:
+            held = b""
+        blocks = buffer.split(b"\n\n")
+        self._buffer = blocks.pop() + held
+        events = []
+        for block in blocks:
+            event = _parse_block(block)
+            if event is not None:
+                events.append(event)
+        return events
+
+    def close(self) -> List[Event]:
+        buffer, self._buffer = self._buffer, b""
+        if not buffer.strip():
+            return []
+        event = _parse_block(buffer.replace(b"\r\n", b"\n").rstrip(b"\r\n"))
+        return [event] if event is not None else []
+
+
+def _parse_block(block: bytes) -> Optional[Event]:
+    if block.startswith(b"data: ") and b"\n" not in block:
+        return b"", block[6:]
+    name = b""
+    data_lines = []
+    for line in block.split(b"\n"):
+        if line.startswith(b"data:"):
+            value = line[5:]
+            if value[:1] == b" ":
+                value = value[1:]
+            data_lines.append(value)
+        elif line.startswith(b"event:"):
+            name = line[6:].strip()
+    if not data_lines:
+        return None
+    return name, b"\n".join(data_lines)
+
+
+def _string_literal(data: bytes, key: bytes) -> Optional[bytes]:
+    start = data.find(key)
+    if start < 0:
+        return None
+    pos = start + len(key)
+    size = len(data)
+    while pos < size and data[pos] in (32, 9):
+        pos += 1
+    if pos >= size or data[pos] != 34:
+        return None
+    end = pos + 1
+    while True:
+        end = data.find(b'"', end)
+        if end < 0:
+            return None
+        back = end - 1
+        while data[back] == 92:
+            back -= 1
+        if (end - back) % 2 == 1:
+            return data[pos:end + 1]
+        end += 1
+
+
+def event_type(name: bytes, data: bytes) -> Optional[bytes]:
+    if name:
+        return name
+    if _DELTA_TYPE in data:
+        return DELTA_EVENT
+    if _COMPLETED_TYPE in data:
+        return COMPLETED_EVENT
+    try:
+        event = codec.loads(data)
+    except codec.JSONDecodeError:
+        return None
+    value = event.get("type") if isinstance(event, dict) else None
+    return value.encode("utf-8") if isinstance(value, str) else None
+
+
+def delta_literal(data: bytes) -> Optional[bytes]:
+    literal = _string_literal(data, _DELTA_KEY)
+    if literal is not None and literal != b'""':
+        return literal
+    try:
+        event = codec.loads(data)
+    except codec.JSONDecodeError:
+        return None
+    return codec.dumps(event.get("delta") or event.get("text") or "")
+
+
+def _split_template(chunk: Dict[str, Any]) -> Tuple[bytes, bytes]:
+    prefix, suffix = _sse(chunk).split(codec.dumps(_PLACEHOLDER))
+    return prefix, suffix
+
+
+def chat_templates(chunk_id: str = "chatcmpl-adapter", index: int = 0) -> Templates:
+    prefix, suffix = _split_template(
+        {
+            "id": chunk_id,
+            "object": "chat.completion.chunk",
+            "choices": [{"index": index, "delta": {"content": _PLACEHOLDER}, "finish_reason": None}],
+        }
+    )
+    stop = _sse(
+        {
+            "id": chunk_id,
+            "object": "chat.completion.chunk",
+            "choices": [{"index": index, "delta": {}, "finish_reason": "stop"}],
+        }
+    )
+    return prefix, suffix, stop
+
+
+def completion_templates(chunk_id: str = "cmpl-adapter", index: int = 0) -> Templates:
+    prefix, suffix = _split_template(
+        {
+            "id": chunk_id,
+            "object": "text_completion",
+            "choices": [{"index": index, "text": _PLACEHOLDER, "logprobs": None, "finish_reason": None}],
+        }
+    )
+    stop = _sse(
+        {
+            "id": chunk_id,
+            "object": "text_completion",
+            "choices": [{"index": index, "text": "", "logprobs": None, "finish_reason": "stop"}],
+        }
+    )
+    return prefix, suffix, stop
+
+
+CHAT_TEMPLATES = chat_templates()
+COMPLETION_TEMPLATES = completion_templates()
+
+
+def _translate_events(
+    events: Iterable[Event],
+    templates: Templates,
+    on_token: Optional[Callable[[], None]] = None,
+    on_complete: Optional[Callable[[bytes], None]] = None,
+) -> Iterator[bytes]:
+    prefix, suffix, stop_frame = templates
+    for name, data in events:
+        if data.startswith(b"[DONE]"):
+            yield DONE_FRAME
             continue
+        kind = event_type(name, data)
+        if kind == DELTA_EVENT:
+            literal = delta_literal(data)
+            if literal is not None:
+                if on_token is not None:
+                    on_token()
+                yield prefix + literal + suffix
+        elif kind == COMPLETED_EVENT:
+            if on_complete is not None:
+                on_complete(data)
+            yield stop_frame
+            yield DONE_FRAME
+
+
+def replay_frames(text: str, templates: Templates) -> List[bytes]:
+    prefix, suffix, stop_frame = templates
+    return [prefix + codec.dumps(text) + suffix, stop_frame, DONE_FRAME]
+
+
+async def _translate(
+    chunks: AsyncIterator[bytes],
+    templates: Templates,
+    on_token: Optional[Callable[[], None]] = None,
+    on_complete: Optional[Callable[[bytes], None]] = None,
+) -> AsyncIterator[bytes]:
+    parser = SSEParser()
+    try:
+        async for chunk in chunks:
+            for frame in _translate_events(parser.feed(chunk), templates, on_token, on_complete):
+                yield frame
+    finally:
+        await _close(chunks)
+    for frame in _translate_events(parser.close(), templates, on_token, on_complete):
+        yield frame
+
+
+async def _close(chunks: AsyncIterator[bytes]) -> None:
+    aclose = getattr(chunks, "aclose", None)
+    if aclose is not None:
+        await aclose()
+
+
+async def _coalesce(
+    chunks: AsyncIterator[bytes],
+    templates: Templates,
+    coalesce: Coalesce,
+    on_token: Optional[Callable[[], None]] = None,
+    on_frame: Optional[Callable[[int], None]] = None,
+    on_complete: Optional[Callable[[bytes], None]] = None,
+) -> AsyncIterator[bytes]:
+    prefix, suffix, stop_frame = templates
+    max_bytes, max_delay = coalesce
+    parser = SSEParser()
+    pending: List[bytes] = []
+    size = 0
+    deadline = 0.0
+
+    def flush() -> bytes:
+        nonlocal size
+        frame = prefix + b'"' + b"".join(pending) + b'"' + suffix
+        if on_frame is not None:
+            on_frame(len(pending))
+        pending.clear()
+        size = 0
+        return frame
+
+    def handle(events: List[Event]) -> Iterator[bytes]:
+        nonlocal size, deadline
+        for name, data in events:
+            kind = None if data.startswith(b"[DONE]") else event_type(name, data)
+            if kind == DELTA_EVENT:
+                literal = delta_literal(data)
+                if literal is None:
+                    continue
+                if on_token is not None:
+                    on_token()
+                if not pending:
+                    deadline = time.monotonic() + max_delay
+                # JSON string literals concatenate safely once their quotes are dropped.
+                pending.append(literal[1:-1])
+                size += len(literal) - 2
+                if size >= max_bytes:
+                    yield flush()
+                continue
+            if pending:
+                yield flush()
+            if data.startswith(b"[DONE]"):
+                yield DONE_FRAME
+            elif kind == COMPLETED_EVENT:
+                if on_complete is not None:
+                    on_complete(data)
+                yield stop_frame
+                yield DONE_FRAME
+
+    iterator = chunks.__aiter__()
+    step: Optional["asyncio.Future[bytes]"] = None
+    try:
+        while True:
+            if step is None:
+                step = asyncio.ensure_future(iterator.__anext__())
+            if pending:
+                done, _ = await asyncio.wait({step}, timeout=max(deadline - time.monotonic(), 0))
+                if not done:
+                    yield flush()
+                    continue
+            try:
+                chunk = await step
+            except StopAsyncIteration:
+                step = None
+                break
+            step = None
+            for frame in handle(parser.feed(chunk)):
+                yield frame
+        for frame in handle(parser.close()):
+            yield frame
+    except Exception:
+        if pending:
+            yield flush()
+        raise
+    finally:
+        try:
+            if step is not None:
+                step.cancel()
+                # Let the read unwind before closing, so the upstream response is released now.
+                await asyncio.wait((step,))
+                if not step.cancelled():
+                    step.exception()
+        finally:
+            await _close(chunks)
+    if pending:
+        yield flush()
+
+
+def parse_coalesce(value: Optional[str], default_bytes: int, default_ms: float) -> Optional[Coalesce]:
+    default = (default_bytes, default_ms / 1000) if default_bytes > 0 else None
+    if value is None:
+        return default
+    text = value.strip().lower()
+    if text in ("", "0", "off", "false", "no"):
+        return None
+    size_text, _, ms_text = text.partition(":")
+    try:
+        size = (default_bytes or _DEFAULT_COALESCE_BYTES) if size_text in ("", "on", "true", "yes") else int(size_text)
+        delay = float(ms_text) if ms_text else default_ms
+    except ValueError:
+        return default
+    return (size, delay / 1000) if size > 0 else None
+
+
+def stream_chat_completions(
+    chunks: AsyncIterator[bytes],
+    on_token: Optional[Callable[[], None]] = None,
+    coalesce: Optional[Coalesce] = None,
+    on_frame: Optional[Callable[[int], None]] = None,
+    on_complete: Optional[Callable[[bytes], None]] = None,
+    index: int = 0,
+) -> AsyncIterator[bytes]:
+    templates = CHAT_TEMPLATES if index == 0 else chat_templates(index=index)
+    if coalesce is not None:
+        return _coalesce(chunks, templates, coalesce, on_token, on_frame, on_complete)
+    return _translate(chunks, templates, on_token, on_complete)
+
+
+def stream_completions(
+    chunks: AsyncIterator[bytes],
+    on_token: Optional[Callable[[], None]] = None,
+    coalesce: Optional[Coalesce] = None,
+    on_frame: Optional[Callable[[int], None]] = None,
+    on_complete: Optional[Callable[[bytes], None]] = None,
+    index: int = 0,
+) -> AsyncIterator[bytes]:
+    templates = COMPLETION_TEMPLATES if index == 0 else completion_templates(index=index)
+    if coalesce is not None:
+        return _coalesce(chunks, templates, coalesce, on_token, on_frame, on_complete)
+    return _translate(chunks, templates, on_token, on_complete)
+
+
+async def merge_streams(streams: List[AsyncIterator[bytes]]) -> AsyncIterator[bytes]:
+    # Frames from every choice are forwarded as they arrive; each stream's own [DONE] is
+    # dropped and a single one closes the merged stream once all of them have finished.
+    queue: "asyncio.Queue[Any]" = asyncio.Queue()
+    scopes = [anyio.CancelScope() for _ in streams]
+
+    async def pump(stream: AsyncIterator[bytes], scope: anyio.CancelScope) -> None:
+        with scope:
+            async for frame in stream:
+                if frame != DONE_FRAME:
+                    queue.put_nowait(frame)
 
-        event_type = event.get("type")
-        if event_type == "response.output_text.delta":
-            delta = event.get("delta") or event.get("text") or ""
-            chunk = {
-                "id": for_line_id,
-                "object": "text_completion",
-                "choices": [
-                    {
-                        "index": 0,
-                        "text": delta,
-                        "logprobs": None,
-                        "finish_reason": None,
-                    }
-                ],
-            }
-            yield _sse(chunk)
-        elif event_type == "response.completed":
-            chunk = {
-                "id": for_line_id,
-                "object": "text_completion",
-                "choices": [
-                    {
-                        "index": 0,
-                        "text": "",
-                        "logprobs": None,
-                        "finish_reason": "stop",
-                    }
-                ],
-            }
-            yield _sse(chunk)
-            yield b"data: [DONE]\n\n"
+    tasks = [asyncio.ensure_future(pump(stream, scope)) for stream, scope in zip(streams, scopes)]
+    for task in tasks:
+        task.add_done_callback(queue.put_nowait)
+    try:
+        remaining = len(tasks)
+        while remaining:
+            item = await queue.get()
+            if isinstance(item, bytes):
+                yield item
+                continue
+            remaining -= 1
+            if not item.cancelled() and item.exception() is not None:
+                raise item.exception()
+        yield DONE_FRAME
+    finally:
+        for scope in scopes:
+            scope.cancel()
+        with anyio.CancelScope(shield=True):
+            await asyncio.wait(tasks)
+            for stream in streams:
+                await _close(stream)
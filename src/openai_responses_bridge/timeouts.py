@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import time
+from typing import Any, AsyncIterator, Callable, Dict, NamedTuple, Optional, Tuple
+
+import httpx
+
+from . import codec
+from .config import Settings
+
+PHASES = ("connect", "pool", "ttfb", "idle", "total")
+HEARTBEAT_FRAME = b": keep-alive\n\n"
+# Reason used when the upstream stream fails for anything other than a deadline.
+UPSTREAM_ERROR = "upstream_error"
+
+
+def _seconds(value: Any) -> Optional[float]:
+    # Zero or a negative value disables the phase.
+    if value is None:
+        return None
+    value = float(value)
+    return value if value > 0 else None
+
+
+class PhaseTimeouts(NamedTuple):
+    connect: Optional[float] = None
+    pool: Optional[float] = None
+    ttfb: Optional[float] = None
+    idle: Optional[float] = None
+    total: Optional[float] = None
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> "PhaseTimeouts":
+        fallback = settings.request_timeout
+        ttfb = settings.upstream_ttfb_timeout
+        idle = settings.stream_idle_timeout
+        return cls(
+            connect=_seconds(settings.upstream_connect_timeout),
+            pool=_seconds(settings.upstream_pool_timeout),
+            ttfb=_seconds(fallback if ttfb is None else ttfb),
+            idle=_seconds(fallback if idle is None else idle),
+            total=_seconds(settings.stream_max_duration),
+        )
+
+    def override(self, timeout: Optional[float], phases: Dict[str, float]) -> "PhaseTimeouts":
+        # A bare route ``timeout`` keeps its old meaning: how long the upstream may stay silent.
+        updates: Dict[str, Optional[float]] = {}
+        if timeout is not None:
+            updates["ttfb"] = updates["idle"] = _seconds(timeout)
+        for phase, value in phases.items():
+            updates[phase] = _seconds(value)
+        return self._replace(**updates) if updates else self
+
+    def for_httpx(self) -> httpx.Timeout:
+        # ``read`` covers the wait for response headers; streamed bodies switch it to ``idle``.
+        return httpx.Timeout(connect=self.connect, read=self.ttfb, write=self.ttfb, pool=self.pool)
+
+
+def parse_phases(value: Any) -> Dict[str, float]:
+    if not isinstance(value, dict):
+        return {}
+    return {phase: float(value[phase]) for phase in PHASES if value.get(phase) is not None}
+
+
+def use_idle_timeout(response: httpx.Response, timeouts: PhaseTimeouts) -> None:
+    # httpcore reads the timeout dict again before the body, so this applies to every body read.
+    timeout = response.request.extensions.get("timeout")
+    if isinstance(timeout, dict):
+        timeout["read"] = timeouts.idle
+
+
+def _describe(reason: str) -> Tuple[str, str]:
+    if reason == UPSTREAM_ERROR:
+        return "upstream_error", "upstream stream ended unexpectedly"
+    return "timeout", f"upstream stream exceeded its {reason} timeout"
+
+
+def chat_error_frame(reason: str) -> bytes:
+    kind, message = _describe(reason)
+    error = {"message": message, "type": kind, "code": f"stream_{reason}"}
+    return codec.sse_frame({"error": error}) + b"data: [DONE]\n\n"
+
+
+def responses_error_frame(reason: str) -> bytes:
+    _, message = _describe(reason)
+    error = {"type": "error", "code": f"stream_{reason}", "message": message}
+    return b"event: error\n" + codec.sse_frame(error)
+
+
+class StreamGuard:
+    __slots__ = (
+        "idle",
+        "total",
+        "heartbeat",
+        "error_frame",
+        "on_expired",
+        "on_failed",
+        "started",
+        "active",
+        "sent",
+    )
+
+    def __init__(
+        self,
+        timeouts: PhaseTimeouts,
+        heartbeat: float,
+        error_frame: Callable[[str], bytes],
+        on_expired: Optional[Callable[[str], None]] = None,
+        on_failed: Optional[Callable[[BaseException], None]] = None,
+    ) -> None:
+        self.idle = timeouts.idle
+        self.total = timeouts.total
+        self.heartbeat = heartbeat if heartbeat > 0 else None
+        self.error_frame = error_frame
+        self.on_expired = on_expired
+        self.on_failed = on_failed
+        now = time.monotonic()
+        self.started = now
+        self.active = now
+        self.sent = now
+
+    async def watch(self, chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+        # Idle time is measured on upstream bytes, so events that produce no client frame still count.
+        try:
+            async for chunk in chunks:
+                self.active = time.monotonic()
+                yield chunk
+        finally:
+            await chunks.aclose()
+
+    def wake_in(self) -> Optional[float]:
+        deadlines = []
+        if self.heartbeat is not None:
+            deadlines.append(self.sent + self.heartbeat)
+        if self.idle is not None:
+            deadlines.append(self.active + self.idle)
+        if self.total is not None:
+            deadlines.append(self.started + self.total)
+        if not deadlines:
+            return None
+        return max(min(deadlines) - time.monotonic(), 0.0)
+
+    def check(self) -> Optional[str]:
+        now = time.monotonic()
+        if self.idle is not None and now - self.active >= self.idle:
+            return "idle"
+        if self.total is not None and now - self.started >= self.total:
+            return "total"
+        if self.heartbeat is not None and now - self.sent >= self.heartbeat:
+            return "heartbeat"
+        return None
+
+    def expired(self, reason: str) -> bytes:
+        if self.on_expired is not None:
+            self.on_expired(reason)
+        return self.error_frame(reason)
+
+    def failed(self, error: BaseException) -> bytes:
+        if self.on_failed is not None:
+            self.on_failed(error)
+        return self.error_frame(UPSTREAM_ERROR)
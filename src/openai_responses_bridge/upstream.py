@@ -0,0 +1,250 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+
+import httpx
+
+from .config import Settings, join_url
+from .logging_setup import get_logger
+from .timeouts import PhaseTimeouts
+
+logger = get_logger()
+
+_EWMA_ALPHA = 0.2
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class Upstream:
+    def __init__(self, name: str, url: str, weight: float = 1.0) -> None:
+        self.name = name
+        self.url = url
+        self.weight = weight
+        self.outstanding = 0
+        self.latency = 0.0
+        self.requests = 0
+        self.errors = 0
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+        self.ejections = 0
+
+    def url_for(self, path: str) -> str:
+        return join_url(self.url, path)
+
+    def available(self, now: float) -> bool:
+        return self.ejected_until <= now
+
+    def record_success(self, latency: Optional[float] = None) -> None:
+        if self.ejected_until:
+            logger.info("upstream.restored", upstream=self.name)
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+        if latency is not None:
+            self.latency = latency if not self.latency else self.latency + _EWMA_ALPHA * (latency - self.latency)
+
+    def record_failure(self, threshold: int, eject_seconds: float) -> None:
+        self.errors += 1
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= threshold:
+            now = time.monotonic()
+            if self.ejected_until <= now:
+                self.ejections += 1
+                logger.warning("upstream.ejected", upstream=self.name, failures=self.consecutive_failures)
+            self.ejected_until = now + eject_seconds
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "url": self.url,
+            "weight": self.weight,
+            "outstanding": self.outstanding,
+            "latency_ms": round(self.latency * 1000, 2),
+            "requests": self.requests,
+            "errors": self.errors,
+            "consecutive_failures": self.consecutive_failures,
+            "ejected": not self.available(time.monotonic()),
+            "ejections": self.ejections,
+        }
+
+
+class _TrackedStream(httpx.AsyncByteStream):
+    def __init__(self, stream: Any, on_close: Callable[[], None]) -> None:
+        self._stream = stream
+        self._on_close: Optional[Callable[[], None]] = on_close
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            if self._on_close is not None:
+                self._on_close()
+                self._on_close = None
+
+
+class UpstreamPool:
+    def __init__(self, settings: Settings, transport: Optional[httpx.AsyncBaseTransport] = None) -> None:
+        self.settings = settings
+        self.transport = transport
+        self.http2 = settings.upstream_http2 and _http2_available()
+        if settings.upstream_http2 and not self.http2:
+            logger.warning("upstream.http2_unavailable", reason="h2 package is not installed")
+        self.limits = httpx.Limits(
+            max_connections=settings.upstream_max_connections,
+            max_keepalive_connections=settings.upstream_max_keepalive_connections,
+            keepalive_expiry=settings.upstream_keepalive_expiry,
+        )
+        self.upstreams = [Upstream(**entry) for entry in settings.resolved_upstreams()]
+        self.balancing = settings.upstream_balancing
+        self.timeouts = PhaseTimeouts.from_settings(settings)
+        self._client: Optional[httpx.AsyncClient] = None
+        self._health_task: Optional["asyncio.Task[None]"] = None
+        self.pending = 0
+        self.requests_total = 0
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeouts.for_httpx(),
+                limits=self.limits,
+                http2=self.http2,
+                transport=self.transport,
+            )
+        return self._client
+
+    async def start(self) -> None:
+        client = self.client
+        if self.settings.upstream_health_interval > 0 and len(self.upstreams) > 1:
+            self._health_task = asyncio.ensure_future(self._health_loop())
+        count = min(self.settings.upstream_warmup_connections, self.settings.upstream_max_connections)
+        if count <= 0:
+            return
+        timeout = httpx.Timeout(self.settings.upstream_warmup_timeout)
+
+        async def warm(upstream: Upstream) -> bool:
+            try:
+                await client.head(upstream.url_for("/"), timeout=timeout)
+            except httpx.HTTPError as exc:
+                logger.warning("upstream.warmup_error", upstream=upstream.name, error=str(exc))
+                return False
+            return True
+
+        results = await asyncio.gather(*(warm(upstream) for upstream in self.upstreams for _ in range(count)))
+        logger.info("upstream.warmup", requested=len(results), opened=sum(results), http2=self.http2)
+
+    async def close(self) -> None:
+        if self._health_task is not None:
+            self._health_task.cancel()
+            self._health_task = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def named(self, name: str) -> Optional[Upstream]:
+        for upstream in self.upstreams:
+            if upstream.name == name:
+                return upstream
+        return None
+
+    def choose(self) -> Upstream:
+        if len(self.upstreams) == 1:
+            return self.upstreams[0]
+        now = time.monotonic()
+        candidates = [upstream for upstream in self.upstreams if upstream.available(now)]
+        if not candidates:
+            return min(self.upstreams, key=lambda upstream: upstream.ejected_until)
+        if self.balancing == "latency":
+            return min(candidates, key=lambda upstream: upstream.latency * (upstream.outstanding + 1) / upstream.weight)
+        return min(candidates, key=lambda upstream: (upstream.outstanding + 1) / upstream.weight)
+
+    async def request(
+        self, method: str, path: str, stream: bool = False, upstream: Optional[Upstream] = None, **kwargs: Any
+    ) -> httpx.Response:
+        target = upstream or self.choose()
+        request = self.client.build_request(method, target.url_for(path), **kwargs)
+        threshold = self.settings.upstream_failure_threshold
+        eject_seconds = self.settings.upstream_eject_seconds
+
+        def release() -> None:
+            target.outstanding -= 1
+
+        target.outstanding += 1
+        target.requests += 1
+        self.pending += 1
+        self.requests_total += 1
+        start = time.perf_counter()
+        try:
+            response = await self.client.send(request, stream=stream)
+        except BaseException as exc:
+            release()
+            if isinstance(exc, httpx.RequestError):
+                target.record_failure(threshold, eject_seconds)
+            raise
+        finally:
+            self.pending -= 1
+        if response.status_code >= 500:
+            target.record_failure(threshold, eject_seconds)
+        else:
+            target.record_success(time.perf_counter() - start)
+        if stream and not response.is_closed:
+            response.stream = _TrackedStream(response.stream, release)
+        else:
+            release()
+        response.extensions["upstream"] = target.name
+        return response
+
+    async def _health_loop(self) -> None:
+        interval = self.settings.upstream_health_interval
+        timeout = httpx.Timeout(self.settings.upstream_warmup_timeout)
+        while True:
+            await asyncio.sleep(interval)
+            await asyncio.gather(*(self._probe(upstream, timeout) for upstream in self.upstreams))
+
+    async def _probe(self, upstream: Upstream, timeout: httpx.Timeout) -> None:
+        threshold = self.settings.upstream_failure_threshold
+        eject_seconds = self.settings.upstream_eject_seconds
+        try:
+            response = await self.client.head(upstream.url_for(self.settings.upstream_health_path), timeout=timeout)
+        except httpx.HTTPError as exc:
+            logger.warning("upstream.health_error", upstream=upstream.name, error=str(exc))
+            upstream.record_failure(threshold, eject_seconds)
+            return
+        if response.status_code >= 500:
+            upstream.record_failure(threshold, eject_seconds)
+        else:
+            upstream.record_success()
+
+    def stats(self) -> Dict[str, Any]:
+        connections = []
+        waiting = 0
+        if self._client is not None:
+            pool = getattr(self._client._transport, "_pool", None)
+            connections = list(getattr(pool, "connections", []))
+            waiting = len(getattr(pool, "_requests", []))
+        idle = sum(1 for conn in connections if conn.is_idle())
+        return {
+            "http2": self.http2,
+            "max_connections": self.limits.max_connections,
+            "max_keepalive_connections": self.limits.max_keepalive_connections,
+            "keepalive_expiry": self.limits.keepalive_expiry,
+            "connections": len(connections),
+            "active_connections": len(connections) - idle,
+            "idle_connections": idle,
+            "waiting_requests": waiting,
+            "pending_requests": self.pending,
+            "requests_total": self.requests_total,
+            "balancing": self.balancing,
+            "upstreams": [upstream.stats() for upstream in self.upstreams],
+        }
@@ -1,5 +1,60 @@
+import socket
 import sys
+import time
 from pathlib import Path
 
+import httpx
+import pytest
+
 ROOT = Path(__file__).resolve().parents[1]
 sys.path.insert(0, str(ROOT / "src"))
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from openai_responses_bridge.config import Settings  # noqa: E402
+from openai_responses_bridge.main import app  # noqa: E402
+from openai_responses_bridge.upstream import UpstreamPool  # noqa: E402
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_ready(url, timeout=20.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    raise AssertionError(f"{url} did not come up")
+
+
+@pytest.fixture(scope="session")
+def free_port():
+    return _free_port
+
+
+@pytest.fixture(scope="session")
+def wait_ready():
+    return _wait_ready
+
+
+@pytest.fixture
+def client():
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def mock_upstream(client):
+    # Replaces the lifespan's pool with one that answers through ``handler``.
+    def install(handler, settings=None):
+        pool = UpstreamPool(settings or Settings(), transport=httpx.MockTransport(handler))
+        app.state.upstream = pool
+        return pool
+
+    return install
@@ -1,4 +1,4 @@
-from openai_responses_bridge.adapter import build_responses_request, to_chat_completions
+from openai_responses_bridge.adapter import alias_models, build_responses_request, to_chat_completions
 
 
 def test_build_responses_request_maps_tokens_and_model():
@@ -32,3 +32,11 @@ def test_to_chat_completions_extracts_text():
     result = to_chat_completions(response)
     assert result["choices"][0]["message"]["content"] == "hello world"
     assert result["usage"]["total_tokens"] == 3
+
+
+def test_alias_models_advertises_client_facing_names():
+    data = {"object": "list", "data": [{"id": "gpt-4.1-mini", "owned_by": "openai"}]}
+    result = alias_models(data, {"gpt-3.5-turbo": "gpt-4.1-mini", "missing": "unknown"})
+
+    assert [entry["id"] for entry in result["data"]] == ["gpt-4.1-mini", "gpt-3.5-turbo"]
+    assert result["data"][1]["owned_by"] == "openai"
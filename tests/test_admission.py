@@ -0,0 +1,91 @@
+import asyncio
+
+import httpx
+import pytest
+
+from openai_responses_bridge.admission import AdmissionController, Rejected
+from openai_responses_bridge.main import app
+
+
+def test_waiters_are_served_by_lane_then_round_robin_across_keys():
+    async def run():
+        controller = AdmissionController(global_limit=1, per_key_limit=0, queue_size=10, queue_timeout=5)
+        await controller.acquire("holder", "interactive")
+        order = []
+
+        async def wait(key, lane):
+            await controller.acquire(key, lane)
+            order.append((key, lane))
+
+        arrivals = [("noisy", "batch")] * 3 + [("quiet", "batch"), ("user", "interactive")]
+        tasks = [asyncio.ensure_future(wait(key, lane)) for key, lane in arrivals]
+        await asyncio.sleep(0)
+        assert controller.stats()["queued"] == {"interactive": 1, "batch": 4}
+        for key in ["holder", "user", "noisy", "quiet", "noisy"]:
+            controller.release(key)
+            await asyncio.sleep(0)
+        await asyncio.gather(*tasks)
+        return order
+
+    order = asyncio.run(run())
+    assert order == [
+        ("user", "interactive"),
+        ("noisy", "batch"),
+        ("quiet", "batch"),
+        ("noisy", "batch"),
+        ("noisy", "batch"),
+    ]
+
+
+def test_sheds_load_when_queues_are_full():
+    async def run():
+        controller = AdmissionController(global_limit=2, per_key_limit=1, queue_size=2, queue_timeout=5)
+        await controller.acquire("a", "interactive")
+        await controller.acquire("b", "interactive")
+        waiting = asyncio.ensure_future(controller.acquire("a", "interactive"))
+        await asyncio.sleep(0)
+        with pytest.raises(Rejected) as per_key:
+            await controller.acquire("a", "interactive")
+        asyncio.ensure_future(controller.acquire("c", "batch"))
+        await asyncio.sleep(0)
+        with pytest.raises(Rejected) as overall:
+            await controller.acquire("d", "batch")
+        waiting.cancel()
+        return per_key.value, overall.value, controller
+
+    per_key, overall, controller = asyncio.run(run())
+    assert (per_key.status, per_key.reason) == (429, "key_queue_full")
+    assert (overall.status, overall.reason) == (503, "queue_full")
+    assert controller.rejected == 2
+
+
+def test_queue_timeout_rejects_with_503():
+    async def run():
+        controller = AdmissionController(global_limit=1, per_key_limit=0, queue_size=5, queue_timeout=0.01)
+        await controller.acquire("a", "interactive")
+        with pytest.raises(Rejected) as exc:
+            await controller.acquire("b", "interactive")
+        return exc.value, controller
+
+    rejected, controller = asyncio.run(run())
+    assert rejected.reason == "queue_timeout"
+    assert controller.queued == 0
+
+
+def test_rejected_request_gets_retry_after_and_slot_is_released(client, mock_upstream):
+    def handler(request):
+        return httpx.Response(200, json={"output": [], "usage": {}})
+
+    mock_upstream(handler)
+    admission = AdmissionController(global_limit=1, per_key_limit=0, queue_size=0, queue_timeout=1, retry_after=3)
+    app.state.admission = admission
+    ok = client.post("/v1/responses", json={"model": "m", "input": "x"})
+    asyncio.run(admission.acquire("other", "interactive"))
+    shed = client.post("/v1/responses", json={"model": "m", "input": "x"})
+    stats = client.get("/debug/admission").json()
+
+    assert ok.status_code == 200
+    assert shed.status_code == 503
+    assert shed.headers["Retry-After"] == "3"
+    assert stats["active"] == 1
+    assert stats["admitted"] == 2
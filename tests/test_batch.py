@@ -0,0 +1,158 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from openai_responses_bridge.admission import AdmissionController
+from openai_responses_bridge.batch import iter_lines, run_batch
+from openai_responses_bridge.config import Settings
+from openai_responses_bridge.main import _batch_retry, app
+from openai_responses_bridge.metrics import SlowRequests
+
+
+def _response_body(text):
+    return {
+        "id": "resp-1",
+        "output": [{"content": [{"type": "output_text", "text": text}]}],
+        "usage": {"input_tokens": 1, "output_tokens": 1},
+    }
+
+
+def _jsonl(entries):
+    return "".join(json.dumps(entry) + "\n" for entry in entries) + "not json\n"
+
+
+def test_batch_streams_results_and_retries_rate_limited_items(client, mock_upstream):
+    attempts = {}
+
+    def handler(request):
+        body = json.loads(request.content)
+        text = body["input"]
+        prompt = text if isinstance(text, str) else text[0]["content"][0]["text"]
+        attempts[prompt] = attempts.get(prompt, 0) + 1
+        assert body["stream"] is False
+        if prompt == "limited" and attempts[prompt] == 1:
+            return httpx.Response(429, headers={"Retry-After": "0"}, text="slow down")
+        if prompt == "broken":
+            return httpx.Response(400, text="bad request")
+        return httpx.Response(200, json=_response_body(f"re:{prompt}"))
+
+    entries = [
+        {"custom_id": "a", "url": "/v1/chat/completions", "body": {"model": "m", "messages": [
+            {"role": "user", "content": "hello"}]}},
+        {"custom_id": "b", "url": "/v1/completions", "body": {"model": "m", "prompt": "limited"}},
+        {"custom_id": "c", "body": {"model": "m", "messages": [{"role": "user", "content": "broken"}]}},
+        {"custom_id": "d", "url": "/v1/embeddings", "body": {}},
+    ]
+    mock_upstream(handler)
+    app.state.batch_retry = _batch_retry(Settings(retry_backoff_base=0.0))
+    response = client.post("/v1/batch?concurrency=2", content=_jsonl(entries))
+
+    assert response.headers["content-type"] == "application/x-ndjson"
+    results = {}
+    for line in response.text.splitlines():
+        result = json.loads(line)
+        results[result["custom_id"]] = result
+    assert results["a"]["response"]["body"]["choices"][0]["message"]["content"] == "re:hello"
+    assert results["b"]["response"]["status_code"] == 200
+    assert results["b"]["response"]["body"]["choices"][0]["text"] == "re:limited"
+    assert attempts["limited"] == 2
+    assert results["c"]["response"]["status_code"] == 400
+    assert results["c"]["error"]["code"] == "upstream_error"
+    assert results["d"]["error"]["code"] == "invalid_request"
+    assert results[None]["error"]["code"] == "invalid_json"
+
+
+def test_lines_are_split_across_chunks_and_oversized_lines_skipped():
+    async def chunks():
+        for chunk in (b'{"a"', b':1}\n\n{"b":2}\n' + b"x" * 40, b"y" * 40 + b"\n", b'{"c":3}'):
+            yield chunk
+
+    async def collect():
+        return [item async for item in iter_lines(chunks(), max_bytes=32)]
+
+    assert asyncio.run(collect()) == [(1, b'{"a":1}'), (2, b'{"b":2}'), (3, None), (4, b'{"c":3}')]
+
+
+def test_fan_out_is_bounded_and_yields_in_completion_order():
+    read = []
+    active = 0
+    peak = 0
+
+    async def lines():
+        for number in range(1, 7):
+            read.append(number)
+            yield number, str(number).encode()
+
+    async def handle(number, line):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.03 if number == 1 else 0.001)
+        active -= 1
+        return line
+
+    async def collect():
+        output = []
+        async for result in run_batch(lines(), handle, concurrency=2):
+            output.append(result)
+            # Input is consumed no further ahead than the free slots allow.
+            assert len(read) <= len(output) + 3
+        return output
+
+    output = asyncio.run(collect())
+    assert peak == 2
+    assert sorted(output) == [b"1", b"2", b"3", b"4", b"5", b"6"]
+    assert output[0] != b"1"
+
+
+def test_batch_items_respect_admission_and_time_their_own_calls(client, mock_upstream):
+    active = 0
+    peak = 0
+
+    async def handler(request):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.05)
+        active -= 1
+        return httpx.Response(200, json=_response_body("ok"))
+
+    entries = [{"custom_id": str(index), "body": {"model": "m", "prompt": "x"}} for index in range(6)]
+    mock_upstream(handler)
+    app.state.admission = AdmissionController(global_limit=2, per_key_limit=0, queue_size=10, queue_timeout=5)
+    app.state.slow_requests = SlowRequests(50, 600)
+    response = client.post("/v1/batch?concurrency=6", content=_jsonl(entries))
+    slow = client.get("/debug/slow").json()["requests"]
+
+    statuses = [json.loads(line)["response"] for line in response.text.splitlines()]
+    assert sum(1 for item in statuses if item and item["status_code"] == 200) == 6
+    assert peak == 2
+    assert app.state.admission.active == 0
+    phases = {entry["route"]: entry["phases_ms"] for entry in slow}
+    assert "ttfb" in phases["batch_chat"]
+    assert "ttfb" not in phases["batch"]
+
+
+@pytest.mark.parametrize(
+    "limits",
+    [
+        {"global_limit": 0, "per_key_limit": 2, "queue_size": 1},
+        {"global_limit": 1, "per_key_limit": 0, "queue_size": 0},
+    ],
+)
+def test_batch_items_wait_out_admission_rejections(client, mock_upstream, limits):
+    async def handler(request):
+        await asyncio.sleep(0.01)
+        return httpx.Response(200, json=_response_body("ok"))
+
+    entries = [{"custom_id": str(index), "body": {"model": "m", "prompt": "x"}} for index in range(8)]
+    mock_upstream(handler)
+    app.state.admission = AdmissionController(queue_timeout=5, retry_after=0.01, **limits)
+    response = client.post("/v1/batch?concurrency=8", content=_jsonl(entries))
+
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert sum(1 for item in lines if item["response"] and item["response"]["status_code"] == 200) == 8
+    assert not any(item["error"] and item["error"]["code"] == "admission_rejected" for item in lines)
+    assert app.state.admission.active == 0
@@ -0,0 +1,27 @@
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "benchmarks"))
+
+import bench_hotpaths  # noqa: E402
+
+
+def test_hot_paths_stay_within_allocation_baseline(capsys):
+    assert bench_hotpaths.main(["--no-timing", "--check"]) == 0, capsys.readouterr().out
+
+
+def _results(peak_kb, alloc_blocks, ops_per_sec):
+    case = {"peak_kb": peak_kb, "alloc_blocks": alloc_blocks, "ops_per_sec": ops_per_sec}
+    return {"python": "3.x", "machine": "m", "cases": {"case": case}}
+
+
+def test_regressions_past_tolerance_are_reported():
+    baseline = _results(10.0, 10, 100.0)
+
+    assert bench_hotpaths.compare(baseline, _results(14.0, 18, 80.0), 0.1, 0.25) == []
+    failures = bench_hotpaths.compare(baseline, _results(20.0, 30, 50.0), 0.1, 0.25)
+    assert len(failures) == 3
+    assert "peak_kb" in failures[0]
+    assert "alloc_blocks" in failures[1]
+    assert "ops/s" in failures[2]
@@ -0,0 +1,100 @@
+import asyncio
+
+import httpx
+
+from openai_responses_bridge.cache import ModelsCache, ResponseCache, cache_directive, request_key
+from openai_responses_bridge.main import app
+
+
+def test_cache_enforces_ttl_and_byte_budget():
+    now = [0.0]
+    cache = ResponseCache(max_bytes=2 * (10 + 1 + 128), ttl=5, clock=lambda: now[0])
+    cache.put("a", b"x" * 10)
+    cache.put("b", b"y" * 10)
+    assert cache.get("a") == b"x" * 10
+
+    cache.put("c", b"z" * 10)
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.evictions == 1
+
+    now[0] = 6.0
+    assert cache.get("c") is None
+    assert cache.stats()["entries"] == 1
+
+
+def test_request_key_ignores_stream_and_key_order():
+    first = request_key({"model": "m", "input": "x", "stream": True, "temperature": 0}, "scope")
+    second = request_key({"temperature": 0, "input": "x", "model": "m", "stream": False}, "scope")
+
+    assert first == second
+    assert request_key({"model": "m"}, "other") != request_key({"model": "m"}, "scope")
+    assert cache_directive({"Cache-Control": "no-store"}) == "bypass"
+    assert cache_directive({"Cache-Control": "no-cache"}) == "refresh"
+
+
+def test_cached_reply_is_served_and_replayed_as_sse(client, mock_upstream):
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        body = {"id": "resp-1", "output": [{"content": [{"type": "output_text", "text": "cached"}]}], "usage": {}}
+        return httpx.Response(200, json=body)
+
+    payload = {"model": "m", "messages": [{"role": "user", "content": "x"}], "temperature": 0}
+    mock_upstream(handler)
+    app.state.response_cache = ResponseCache(max_bytes=1 << 20, ttl=60)
+
+    first = client.post("/v1/chat/completions", json=payload)
+    second = client.post("/v1/chat/completions", json=payload)
+    streamed = client.post("/v1/chat/completions", json=dict(payload, stream=True))
+    bypassed = client.post("/v1/chat/completions", json=payload, headers={"X-Bridge-Cache": "bypass"})
+
+    assert first.headers["X-Bridge-Cache"] == "MISS"
+    assert second.headers["X-Bridge-Cache"] == "HIT"
+    assert second.json()["choices"][0]["message"]["content"] == "cached"
+    assert streamed.headers["X-Bridge-Cache"] == "HIT"
+    assert '"content":"cached"' in streamed.text
+    assert streamed.text.endswith("data: [DONE]\n\n")
+    assert bypassed.headers["X-Bridge-Cache"] == "BYPASS"
+    assert len(calls) == 2
+
+
+def test_models_cache_serves_stale_while_refreshing_once():
+    now = [0.0]
+    calls = []
+
+    async def fetch():
+        calls.append(now[0])
+        await asyncio.sleep(0)
+        return 200, b'{"data":[%d]}' % len(calls)
+
+    async def run():
+        cache = ModelsCache(ttl=10, stale_ttl=100, clock=lambda: now[0])
+        first = await cache.get("k", fetch)
+        now[0] = 20.0
+        stale = await asyncio.gather(cache.get("k", fetch), cache.get("k", fetch))
+        await asyncio.sleep(0.01)
+        fresh = await cache.get("k", fetch)
+        return first, stale, fresh
+
+    first, stale, fresh = asyncio.run(run())
+    assert first == (200, b'{"data":[1]}')
+    assert stale == [first, first]
+    assert fresh == (200, b'{"data":[2]}')
+    assert len(calls) == 2
+
+
+def test_models_cache_evicts_least_recently_used_keys():
+    async def fetch():
+        return 200, b'{"data":[]}'
+
+    async def run():
+        cache = ModelsCache(ttl=10, stale_ttl=100, max_entries=2)
+        for key in ("a", "b", "a", "c"):
+            await cache.get(key, fetch)
+        return cache
+
+    cache = asyncio.run(run())
+    assert list(cache._entries) == ["a", "c"]
+    assert cache.stats()["evictions"] == 1
@@ -0,0 +1,61 @@
+import os
+import signal
+import subprocess
+import sys
+from pathlib import Path
+
+import httpx
+
+from openai_responses_bridge.cli import bind_socket, build_parser
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def test_serve_arguments_and_shared_port(free_port):
+    args = build_parser().parse_args(["serve", "--port", "9000", "--workers", "4", "--graceful-timeout", "5"])
+    assert (args.port, args.workers, args.graceful_timeout, args.log_level) == (9000, 4, 5.0, None)
+
+    port = free_port()
+    first = bind_socket("127.0.0.1", port, 16, reuse_port=True)
+    second = bind_socket("127.0.0.1", port, 16, reuse_port=True)
+    first.close()
+    second.close()
+
+
+def test_sigterm_drains_in_flight_stream_across_workers(free_port, wait_ready):
+    mock_port, bridge_port = free_port(), free_port()
+    env = {**os.environ, "PYTHONPATH": str(ROOT / "src")}
+    mock = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "--app-dir", "benchmarks", "mock_upstream:app", "--port", str(mock_port)],
+        cwd=str(ROOT),
+        env={**env, "MOCK_TOKENS": "20", "MOCK_TOKEN_INTERVAL_MS": "50"},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    bridge = subprocess.Popen(
+        [sys.executable, "-m", "openai_responses_bridge", "serve", "--host", "127.0.0.1", "--port", str(bridge_port)]
+        + ["--workers", "2", "--graceful-timeout", "10", "--log-level", "INFO"],
+        cwd=str(ROOT),
+        env={**env, "UPSTREAM_BASE_URL": f"http://127.0.0.1:{mock_port}"},
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+    )
+    try:
+        wait_ready(f"http://127.0.0.1:{mock_port}/")
+        wait_ready(f"http://127.0.0.1:{bridge_port}/healthz")
+        body = {"model": "m", "stream": True, "messages": [{"role": "user", "content": "x"}]}
+        with httpx.stream("POST", f"http://127.0.0.1:{bridge_port}/v1/chat/completions", json=body) as response:
+            chunks = response.iter_bytes()
+            received = next(chunks)
+            bridge.send_signal(signal.SIGTERM)
+            received += b"".join(chunks)
+        assert received.endswith(b"data: [DONE]\n\n")
+        assert bridge.wait(timeout=20) == 0
+        output = bridge.stdout.read().decode()
+        assert output.count('"worker.ready"') == 2
+        assert '"serve.ready"' in output
+    finally:
+        for proc in (bridge, mock):
+            if proc.poll() is None:
+                proc.kill()
+                proc.wait()
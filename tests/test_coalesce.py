@@ -0,0 +1,109 @@
+import asyncio
+
+import httpx
+
+from openai_responses_bridge.coalesce import Coalescer, parse_routes
+
+
+def test_identical_json_requests_share_one_upstream_call():
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return 200, b"{}"
+
+    async def run():
+        coalescer = Coalescer(("chat",))
+        results = await asyncio.gather(*(coalescer.run("k", fetch) for _ in range(5)))
+        return coalescer, results
+
+    coalescer, results = asyncio.run(run())
+    assert len(calls) == 1
+    assert results == [(200, b"{}")] * 5
+    assert coalescer.stats()["saved_upstream_calls"] == 4
+    assert coalescer.stats()["in_flight"] == 0
+
+
+def test_late_stream_joiner_replays_prefix_then_follows_live():
+    release = None
+
+    async def body():
+        yield b"a"
+        yield b"b"
+        await release.wait()
+        yield b"c"
+
+    async def opener():
+        return httpx.Response(200, content=body())
+
+    async def collect(flight):
+        return b"".join([chunk async for chunk in flight.follow()])
+
+    async def run():
+        nonlocal release
+        release = asyncio.Event()
+        coalescer = Coalescer(("chat",))
+        leader = await coalescer.stream("k", opener)
+        first = asyncio.ensure_future(collect(leader))
+        await asyncio.sleep(0.01)
+        joiner = await coalescer.stream("k", opener)
+        second = asyncio.ensure_future(collect(joiner))
+        release.set()
+        return coalescer, await first, await second
+
+    coalescer, first, second = asyncio.run(run())
+    assert first == second == b"abc"
+    assert coalescer.saved == 1
+
+
+def test_mid_stream_error_reaches_every_follower():
+    async def body():
+        yield b"a"
+        raise httpx.ReadTimeout("stalled")
+
+    async def opener():
+        return httpx.Response(200, content=body())
+
+    async def collect(flight):
+        chunks = []
+        try:
+            async for chunk in flight.follow():
+                chunks.append(chunk)
+        except httpx.ReadTimeout:
+            chunks.append(b"!")
+        return b"".join(chunks)
+
+    async def run():
+        coalescer = Coalescer(("chat",))
+        flights = [await coalescer.stream("k", opener) for _ in range(2)]
+        return await asyncio.gather(*(collect(flight) for flight in flights))
+
+    assert asyncio.run(run()) == [b"a!", b"a!"]
+
+
+def test_unstarted_follower_is_released_on_close():
+    async def body():
+        yield b"a"
+        await asyncio.sleep(10)
+
+    async def opener():
+        return httpx.Response(200, content=body())
+
+    async def run():
+        coalescer = Coalescer(("chat",))
+        flight = await coalescer.stream("k", opener)
+        await flight.follow().aclose()
+        await asyncio.sleep(0.01)
+        return coalescer, flight
+
+    coalescer, flight = asyncio.run(run())
+    assert flight.subscribers == 0
+    assert flight.task.cancelled()
+    assert coalescer.stats()["in_flight"] == 0
+
+
+def test_parse_routes():
+    assert parse_routes("chat, responses,bogus") == ("chat", "responses")
+    assert parse_routes("all") == ("chat", "completions", "responses")
+    assert parse_routes("") == ()
@@ -0,0 +1,16 @@
+from openai_responses_bridge import codec
+from openai_responses_bridge.streaming import _sse
+
+
+def test_sse_frame_keeps_unicode_unescaped():
+    frame = _sse({"delta": "你好"})
+
+    assert frame == 'data: {"delta":"你好"}\n\n'.encode("utf-8")
+    assert codec.loads(frame[6:]) == {"delta": "你好"}
+
+
+def test_json_response_renders_bytes():
+    response = codec.JSONResponse(content={"ok": True, 1: "x"})
+
+    assert response.body == b'{"ok":true,"1":"x"}'
+    assert response.media_type == "application/json"
@@ -0,0 +1,170 @@
+import asyncio
+import gzip
+import json
+import zlib
+
+import httpx
+import pytest
+
+from openai_responses_bridge.compression import (
+    CompressionMiddleware,
+    RequestEncoder,
+    StreamCompressor,
+    compress,
+    negotiate,
+)
+from openai_responses_bridge.main import app
+
+
+def _response_body(text):
+    return {"output": [{"content": [{"type": "output_text", "text": text}]}], "usage": {}}
+
+
+def test_negotiate_honours_q_values_and_server_preference():
+    encodings = ("zstd", "br", "gzip")
+    assert negotiate("gzip, deflate, br", encodings) == "br"
+    assert negotiate("gzip;q=1.0, br;q=0.5", encodings) == "gzip"
+    assert negotiate("*;q=0.1, zstd;q=0", encodings) == "br"
+    assert negotiate("identity", encodings) is None
+    assert negotiate(None, encodings) is None
+
+
+def test_json_replies_compress_above_threshold_only(client, mock_upstream):
+    texts = iter(["word " * 2000, "short"])
+
+    def handler(request):
+        return httpx.Response(200, json=_response_body(next(texts)))
+
+    payload = {"model": "m", "messages": [{"role": "user", "content": "x"}]}
+    mock_upstream(handler)
+    large = client.post("/v1/chat/completions", json=payload, headers={"Accept-Encoding": "gzip"})
+    small = client.post("/v1/chat/completions", json=payload, headers={"Accept-Encoding": "gzip"})
+    plain = client.get("/debug/pool", headers={"Accept-Encoding": "identity"})
+
+    assert large.headers["content-encoding"] == "gzip"
+    assert large.headers["vary"] == "Accept-Encoding"
+    assert int(large.headers["content-length"]) < len(large.content) / 10
+    assert large.json()["choices"][0]["message"]["content"].startswith("word word")
+    assert "content-encoding" not in small.headers
+    assert "content-encoding" not in plain.headers
+
+
+def test_sse_frames_are_flushed_individually(client, mock_upstream):
+    frames = [b'data: {"choices":[{"delta":{"content":"%d"}}]}\n\n' % index for index in range(5)]
+    compressor = StreamCompressor("gzip")
+    decoder = zlib.decompressobj(31)
+
+    for frame in frames:
+        assert decoder.decompress(compressor.chunk(frame)) == frame
+    assert decoder.decompress(compressor.chunk(b"", final=True)) == b""
+    assert decoder.eof
+
+    events = b"".join(
+        b'data: {"type":"response.output_text.delta","delta":"%d"}\n\n' % index for index in range(3)
+    ) + b'data: {"type":"response.completed"}\n\n'
+
+    def handler(request):
+        return httpx.Response(200, content=events, headers={"Content-Type": "text/event-stream"})
+
+    mock_upstream(handler)
+    payload = {"model": "m", "stream": True, "messages": [{"role": "user", "content": "x"}]}
+    response = client.post("/v1/chat/completions", json=payload, headers={"Accept-Encoding": "gzip"})
+
+    # SSE compression is opt-in, so the default app leaves event streams alone.
+    assert "content-encoding" not in response.headers
+    assert response.text.endswith("data: [DONE]\n\n")
+
+
+@pytest.mark.parametrize("event_streams", [False, True])
+def test_sse_headers_are_sent_before_the_first_frame(event_streams):
+    first_frame = asyncio.Event()
+    sent = []
+
+    async def sse_app(scope, receive, send):
+        headers = [(b"content-type", b"text/event-stream")]
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        await first_frame.wait()
+        await send({"type": "http.response.body", "body": b"data: one\n\n", "more_body": True})
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+    async def send(message):
+        sent.append(message)
+
+    async def run():
+        middleware = CompressionMiddleware(sse_app, ("gzip",), 1024, event_streams=event_streams)
+        scope = {"type": "http", "headers": [(b"accept-encoding", b"gzip")]}
+        task = asyncio.ensure_future(middleware(scope, None, send))
+        await asyncio.sleep(0.01)
+        assert [message["type"] for message in sent] == ["http.response.start"]
+        first_frame.set()
+        await task
+
+    asyncio.run(run())
+    headers = dict(sent[0]["headers"])
+    body = b"".join(message["body"] for message in sent[1:])
+    if event_streams:
+        assert headers[b"content-encoding"] == b"gzip"
+        assert zlib.decompress(body, 31) == b"data: one\n\n"
+    else:
+        assert b"content-encoding" not in headers
+        assert body == b"data: one\n\n"
+
+
+def test_large_upstream_bodies_are_compressed_and_415_falls_back(client, mock_upstream):
+    seen = []
+
+    def handler(request):
+        encoding = request.headers.get("content-encoding")
+        seen.append(encoding)
+        if encoding == "gzip" and len(seen) > 1:
+            return httpx.Response(415, text="unsupported")
+        body = json.loads(gzip.decompress(request.content) if encoding else request.content)
+        return httpx.Response(200, json=_response_body(str(len(body["input"]))))
+
+    history = [{"role": "user", "content": "hello " * 50} for _ in range(20)]
+    mock_upstream(handler)
+    app.state.request_encoder = RequestEncoder("gzip", 1024)
+    first = client.post("/v1/chat/completions", json={"model": "m", "messages": history})
+    second = client.post("/v1/chat/completions", json={"model": "m", "messages": history})
+    third = client.post("/v1/chat/completions", json={"model": "m", "messages": history})
+    stats = client.get("/debug/compression").json()["upstream_requests"]
+
+    assert [reply.status_code for reply in (first, second, third)] == [200, 200, 200]
+    assert seen == ["gzip", "gzip", None, None]
+    assert stats["encoding"] is None
+    assert stats["bytes_out"] < stats["bytes_in"] / 5
+
+
+def test_request_encoding_is_captured_with_the_body():
+    encoder = RequestEncoder("gzip", 1024)
+    content = b'{"input": "' + b"x" * (512 * 1024) + b'"}'
+
+    async def run():
+        task = asyncio.ensure_future(encoder.encode(content))
+        await asyncio.sleep(0)
+        encoder.rejected()
+        return await task
+
+    encoding, body = asyncio.run(run())
+    assert encoding == "gzip"
+    assert gzip.decompress(body) == content
+    assert encoder.stats()["encoding"] is None
+
+
+@pytest.mark.parametrize("encoding, module", [("br", "brotli"), ("zstd", "zstandard")])
+def test_optional_encodings_round_trip(encoding, module):
+    library = pytest.importorskip(module)
+    data = b"data: frame\n\n" * 100
+    packed = compress(data, encoding)
+    if encoding == "br":
+        assert library.decompress(packed) == data
+        decoder = library.Decompressor()
+        feed = decoder.process
+    else:
+        assert library.ZstdDecompressor().decompress(packed) == data
+        decoder = library.ZstdDecompressor().decompressobj()
+        feed = decoder.decompress
+
+    compressor = StreamCompressor(encoding)
+    for frame in (b"data: one\n\n", b"data: two\n\n"):
+        assert feed(compressor.chunk(frame)) == frame
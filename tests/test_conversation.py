@@ -0,0 +1,97 @@
+import json
+
+import httpx
+
+from openai_responses_bridge.conversation import ConversationIndex, assistant_item
+from openai_responses_bridge.main import app
+
+
+def _user(text):
+    return {"role": "user", "content": [{"type": "input_text", "text": text}]}
+
+
+def test_lookup_returns_longest_known_prefix():
+    index = ConversationIndex(max_entries=10, ttl=60)
+    index.record("s", [_user("a")], "b", "resp-1")
+    index.record("s", [_user("a"), assistant_item("b"), _user("c")], "d", "resp-2")
+
+    turn3 = [_user("a"), assistant_item("b"), _user("c"), assistant_item("d"), _user("e")]
+    reuse = index.lookup("s", turn3)
+
+    assert (reuse.start, reuse.response_id) == (4, "resp-2")
+    assert index.lookup("other-key", turn3) is None
+    assert index.lookup("s", [_user("a"), assistant_item("edited"), _user("c")]) is None
+
+
+def test_entries_expire_and_stay_bounded():
+    now = [0.0]
+    index = ConversationIndex(max_entries=2, ttl=10, clock=lambda: now[0])
+    for n in range(3):
+        index.record("s", [_user(str(n))], "ok", f"resp-{n}")
+
+    assert index.stats()["entries"] == 2
+    assert index.lookup("s", [_user("0"), assistant_item("ok"), _user("x")]) is None
+    assert index.lookup("s", [_user("2"), assistant_item("ok"), _user("x")]).response_id == "resp-2"
+    now[0] = 11
+    assert index.lookup("s", [_user("2"), assistant_item("ok"), _user("x")]) is None
+
+
+def _reply(response_id, text):
+    return {"id": response_id, "output": [{"content": [{"type": "output_text", "text": text}]}], "usage": {}}
+
+
+def test_chat_sends_only_new_messages_and_falls_back_when_rejected(client, mock_upstream):
+    sent = []
+
+    def handler(request):
+        body = json.loads(request.content)
+        sent.append(body)
+        if body.get("previous_response_id") == "resp-gone":
+            return httpx.Response(404, json={"error": "previous response not found"})
+        return httpx.Response(200, json=_reply(f"resp-{len(sent)}", f"answer {len(sent)}"))
+
+    mock_upstream(handler)
+    app.state.conversations = ConversationIndex(max_entries=100, ttl=60)
+    history = [{"role": "user", "content": "hi"}]
+    first = client.post("/v1/chat/completions", json={"model": "m", "messages": history})
+    history += [first.json()["choices"][0]["message"], {"role": "user", "content": "more"}]
+    second = client.post("/v1/chat/completions", json={"model": "m", "messages": history})
+
+    entries = app.state.conversations._entries
+    for key, (expires, _) in entries.items():
+        entries[key] = (expires, "resp-gone")
+    history += [second.json()["choices"][0]["message"], {"role": "user", "content": "again"}]
+    third = client.post("/v1/chat/completions", json={"model": "m", "messages": history})
+    stats = client.get("/debug/conversations").json()
+
+    assert "previous_response_id" not in sent[0]
+    assert sent[1]["previous_response_id"] == "resp-1"
+    assert sent[1]["input"] == [_user("more")]
+    assert sent[2]["previous_response_id"] == "resp-gone"
+    assert "previous_response_id" not in sent[3] and len(sent[3]["input"]) == 5
+    assert third.status_code == 200
+    assert stats["hits"] == 2
+    assert stats["rejections"] == 1
+
+
+def test_streamed_reply_is_indexed_from_completed_event(client, mock_upstream):
+    sent = []
+    completed = {"type": "response.completed", "response": _reply("resp-stream", "yo")}
+    stream = (
+        b'data: {"type":"response.output_text.delta","delta":"yo"}\n\n'
+        b"data: " + json.dumps(completed).encode() + b"\n\n"
+    )
+
+    def handler(request):
+        sent.append(json.loads(request.content))
+        return httpx.Response(200, content=stream, headers={"Content-Type": "text/event-stream"})
+
+    mock_upstream(handler)
+    app.state.conversations = ConversationIndex(max_entries=100, ttl=60)
+    history = [{"role": "user", "content": "hi"}]
+    client.post("/v1/chat/completions", json={"model": "m", "stream": True, "messages": history})
+    history += [{"role": "assistant", "content": "yo"}, {"role": "user", "content": "next"}]
+    client.post("/v1/chat/completions", json={"model": "m", "stream": True, "messages": history})
+
+    assert sent[1]["previous_response_id"] == "resp-stream"
+    assert sent[1]["input"] == [_user("next")]
@@ -0,0 +1,137 @@
+import asyncio
+import os
+import re
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+import pytest
+
+from openai_responses_bridge.streaming import SSEResponse
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def _wait_for(check, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if check():
+            return time.monotonic()
+        time.sleep(0.02)
+    raise AssertionError("condition not met in time")
+
+
+@pytest.fixture(scope="module")
+def servers(free_port, wait_ready):
+    mock_port, bridge_port = free_port(), free_port()
+    env = {**os.environ, "PYTHONPATH": str(ROOT / "src")}
+    mock = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "--app-dir", "benchmarks", "mock_upstream:app", "--port", str(mock_port)],
+        cwd=str(ROOT),
+        env={**env, "MOCK_TOKENS": "100", "MOCK_TOKEN_INTERVAL_MS": "50", "MOCK_GENERATION_MS": "5000"},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    bridge = subprocess.Popen(
+        [sys.executable, "-m", "openai_responses_bridge", "serve", "--host", "127.0.0.1", "--port", str(bridge_port)],
+        cwd=str(ROOT),
+        env={**env, "UPSTREAM_BASE_URL": f"http://127.0.0.1:{mock_port}", "LOG_LEVEL": "WARNING"},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_ready(f"http://127.0.0.1:{mock_port}/")
+        wait_ready(f"http://127.0.0.1:{bridge_port}/healthz")
+        yield f"http://127.0.0.1:{mock_port}", f"http://127.0.0.1:{bridge_port}"
+    finally:
+        for proc in (bridge, mock):
+            proc.kill()
+            proc.wait()
+
+
+def _aborted(bridge, route):
+    body = httpx.get(f"{bridge}/metrics").text
+    match = re.search(rf'bridge_upstream_aborted_total{{route="{route}"}} (\S+)', body)
+    return float(match.group(1)) if match else 0.0
+
+
+def _released(mock, bridge, aborted):
+    stats = httpx.get(f"{mock}/mock/stats").json()
+    pool = httpx.get(f"{bridge}/debug/pool").json()
+    return stats["active"] == 0 and stats["aborted"] == aborted and pool["active_connections"] == 0
+
+
+def test_client_timeout_cancels_non_streaming_upstream_call(servers):
+    mock, bridge = servers
+    body = {"model": "m", "messages": [{"role": "user", "content": "x"}]}
+    before = _aborted(bridge, "chat")
+
+    with pytest.raises(httpx.ReadTimeout):
+        httpx.post(f"{bridge}/v1/chat/completions", json=body, timeout=0.3)
+    gone = time.monotonic()
+
+    released = _wait_for(lambda: _released(mock, bridge, 1))
+    assert released - gone < 1.0
+    assert _aborted(bridge, "chat") == before + 1
+
+
+def test_stop_generating_closes_upstream_stream(servers):
+    mock, bridge = servers
+    body = {"model": "m", "prompt": "x", "stream": True}
+    before = _aborted(bridge, "completions")
+
+    with httpx.stream("POST", f"{bridge}/v1/completions", json=body) as response:
+        chunks = response.iter_bytes()
+        assert b"data:" in next(chunks)
+    gone = time.monotonic()
+
+    released = _wait_for(lambda: _released(mock, bridge, 2))
+    assert released - gone < 1.0
+    assert _aborted(bridge, "completions") == before + 1
+
+
+def _sse_call(body, receive):
+    aborted = []
+    response = SSEResponse(body, on_abort=lambda: aborted.append(True))
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    async def run():
+        try:
+            await response({"type": "http"}, receive, send)
+        except Exception:
+            # The failing body surfaces wrapped in a task-group error.
+            pass
+
+    asyncio.run(run())
+    return aborted, sent
+
+
+def test_failed_body_is_not_counted_as_client_abort():
+    async def body():
+        yield b"data: a\n\n"
+        raise RuntimeError("upstream broke")
+
+    async def receive():
+        await asyncio.sleep(10)
+
+    aborted, sent = _sse_call(body(), receive)
+    assert sent[1]["body"] == b"data: a\n\n"
+    assert aborted == []
+
+
+def test_disconnect_mid_stream_is_counted_as_client_abort():
+    async def body():
+        yield b"data: a\n\n"
+        await asyncio.sleep(10)
+
+    async def receive():
+        await asyncio.sleep(0.05)
+        return {"type": "http.disconnect"}
+
+    aborted, _ = _sse_call(body(), receive)
+    assert aborted == [True]
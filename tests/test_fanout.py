@@ -0,0 +1,114 @@
+import asyncio
+import json
+import time
+
+import httpx
+
+from openai_responses_bridge.coalesce import Coalescer, parse_routes
+from openai_responses_bridge.main import app
+
+
+def _events(text):
+    return [json.loads(block[6:]) for block in text.split("\n\n") if block.startswith("data: {")]
+
+
+def test_non_streaming_choices_run_concurrently_and_sum_usage(client, mock_upstream):
+    calls = []
+
+    async def handler(request):
+        calls.append(json.loads(request.content))
+        index = len(calls)
+        await asyncio.sleep(0.3)
+        body = {
+            "id": "resp_1",
+            "output": [{"content": [{"type": "output_text", "text": f"candidate {index}"}]}],
+            "usage": {"input_tokens": 10, "output_tokens": index, "total_tokens": 10 + index},
+        }
+        return httpx.Response(200, json=body)
+
+    payload = {"model": "m", "n": 3, "messages": [{"role": "user", "content": "x"}]}
+    mock_upstream(handler)
+    app.state.coalescer = Coalescer(parse_routes("chat"))
+    started = time.perf_counter()
+    response = client.post("/v1/chat/completions", json=payload)
+    elapsed = time.perf_counter() - started
+
+    body = response.json()
+    assert len(calls) == 3
+    assert all("n" not in call for call in calls)
+    assert elapsed < 0.8
+    assert [choice["index"] for choice in body["choices"]] == [0, 1, 2]
+    assert sorted(choice["message"]["content"] for choice in body["choices"]) == [
+        "candidate 1",
+        "candidate 2",
+        "candidate 3",
+    ]
+    assert body["usage"] == {"prompt_tokens": 30, "completion_tokens": 6, "total_tokens": 36}
+
+
+def test_streaming_choices_interleave_with_their_index(client, mock_upstream):
+    def handler(request):
+        async def body():
+            for token in ("a", "b", "c"):
+                event = {"type": "response.output_text.delta", "delta": token}
+                yield f"event: response.output_text.delta\ndata: {json.dumps(event)}\n\n".encode()
+                await asyncio.sleep(0.05)
+            yield b'event: response.completed\ndata: {"type":"response.completed","response":{}}\n\n'
+
+        return httpx.Response(200, content=body(), headers={"Content-Type": "text/event-stream"})
+
+    payload = {"model": "m", "n": 2, "stream": True, "prompt": "x"}
+    mock_upstream(handler)
+    response = client.post("/v1/completions", json=payload)
+
+    events = _events(response.text)
+    indexes = [event["choices"][0]["index"] for event in events]
+    assert response.text.count("data: [DONE]") == 1
+    assert response.text.endswith("data: [DONE]\n\n")
+    assert indexes[:2] == [0, 1] or indexes[:2] == [1, 0]
+    for index in (0, 1):
+        choices = [event["choices"][0] for event in events if event["choices"][0]["index"] == index]
+        assert "".join(choice["text"] for choice in choices) == "abc"
+        assert choices[-1]["finish_reason"] == "stop"
+
+
+def test_fan_out_is_capped(client, mock_upstream):
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(200, json={"output": [], "usage": {}})
+
+    mock_upstream(handler)
+    too_many = client.post("/v1/chat/completions", json={"model": "m", "n": 9, "messages": []})
+    invalid = client.post("/v1/chat/completions", json={"model": "m", "n": "2", "messages": []})
+    single = client.post("/v1/chat/completions", json={"model": "m", "n": 1, "messages": []})
+
+    assert too_many.status_code == 400
+    assert "between 1 and 8" in too_many.json()["error"]
+    assert invalid.status_code == 400
+    assert single.status_code == 200
+    assert len(calls) == 1
+
+
+def test_failed_streaming_leg_releases_the_others(client, mock_upstream):
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) == 2:
+            return httpx.Response(429, text="slow down")
+
+        async def body():
+            yield b'event: response.output_text.delta\ndata: {"type":"response.output_text.delta","delta":"a"}\n\n'
+            await asyncio.sleep(10)
+
+        return httpx.Response(200, content=body(), headers={"Content-Type": "text/event-stream"})
+
+    payload = {"model": "m", "n": 3, "stream": True, "messages": [{"role": "user", "content": "x"}]}
+    pool = mock_upstream(handler)
+    response = client.post("/v1/chat/completions", json=payload)
+
+    assert response.status_code == 429
+    assert len(calls) == 3
+    assert [upstream.outstanding for upstream in pool.upstreams] == [0]
@@ -0,0 +1,159 @@
+import base64
+import json
+
+import httpx
+
+from openai_responses_bridge.config import Settings
+from openai_responses_bridge.images import ImageStore, inline_image
+from openai_responses_bridge.main import app
+
+BIG = base64.b64encode(b"\x89PNG" + b"\x00" * 200_000).decode("ascii")
+
+
+def _message(*urls):
+    content = [{"type": "text", "text": "look"}]
+    content += [{"type": "image_url", "image_url": {"url": url, "detail": "low"}} for url in urls]
+    return {"model": "m", "messages": [{"role": "user", "content": content}]}
+
+
+def test_inline_image_points_into_data_url_without_copying():
+    url = "data:image/jpeg;base64,QUJD"
+    assert inline_image({"image_url": url}) == ("image/jpeg", url, 23)
+    assert inline_image({"image_base64": "QUJD"}) == ("image/png", "QUJD", 0)
+    assert inline_image({"image_url": "https://example.com/cat.png"}) is None
+
+
+def test_base64_images_are_labelled_by_declared_type_or_magic_bytes():
+    def encoded(data):
+        return base64.b64encode(data + b"\x00" * 32).decode("ascii")
+
+    assert inline_image({"image_base64": encoded(b"\xff\xd8\xff\xe0")})[0] == "image/jpeg"
+    assert inline_image({"image_base64": encoded(b"GIF89a")})[0] == "image/gif"
+    assert inline_image({"image_base64": encoded(b"RIFF\x00\x00\x00\x00WEBPVP8 ")})[0] == "image/webp"
+    assert inline_image({"image_base64": encoded(b"\x89PNG\r\n")})[0] == "image/png"
+    assert inline_image({"image_base64": encoded(b"GIF89a"), "mime_type": "image/webp"})[0] == "image/webp"
+    assert inline_image({"image_base64": encoded(b"\x00"), "format": "jpg"})[0] == "image/jpeg"
+    assert inline_image({"image_base64": "!!not base64!!"})[0] == "image/png"
+
+
+def test_large_images_are_uploaded_once_and_referenced_by_file_id(client, mock_upstream):
+    uploads = []
+    sent = []
+
+    def handler(request):
+        if request.url.path == "/v1/files":
+            assert b'name="purpose"' in request.content and b"vision" in request.content
+            assert request.headers["content-type"].startswith("multipart/form-data")
+            uploads.append(len(request.content))
+            return httpx.Response(200, json={"id": f"file-{len(uploads)}"})
+        sent.append(json.loads(request.content))
+        return httpx.Response(200, json={"output": [], "usage": {}})
+
+    small = "data:image/png;base64," + base64.b64encode(b"tiny").decode()
+    big = "data:image/png;base64," + BIG
+    mock_upstream(handler)
+    app.state.images = ImageStore(max_entries=8)
+    client.post("/v1/chat/completions", json=_message(big, small))
+    client.post("/v1/chat/completions", json=_message(big))
+    stats = client.get("/debug/images").json()
+
+    assert len(uploads) == 1
+    first_parts = sent[0]["input"][0]["content"]
+    assert first_parts[1] == {"type": "input_image", "detail": "low", "file_id": "file-1"}
+    assert first_parts[2]["image_url"] == small
+    assert sent[1]["input"][0]["content"][1]["file_id"] == "file-1"
+    assert stats["uploads"] == 1
+    assert stats["hits"] == 1
+    assert stats["bytes_saved"] == 2 * len(BIG)
+
+
+def test_failed_upload_keeps_image_inline(client, mock_upstream):
+    sent = []
+
+    def handler(request):
+        if request.url.path == "/v1/files":
+            return httpx.Response(403, json={"error": "files disabled"})
+        sent.append(json.loads(request.content))
+        return httpx.Response(200, json={"output": [], "usage": {}})
+
+    mock_upstream(handler)
+    app.state.images = ImageStore(max_entries=8)
+    response = client.post("/v1/chat/completions", json=_message("data:image/png;base64," + BIG))
+
+    assert response.status_code == 200
+    assert sent[0]["input"][0]["content"][1]["image_url"].endswith(BIG[-16:])
+    assert app.state.images.stats()["failures"] == 1
+
+
+def test_file_ids_are_not_shared_across_credentials(client, mock_upstream):
+    uploads = []
+    sent = []
+
+    def handler(request):
+        if request.url.path == "/v1/files":
+            uploads.append(request.headers["authorization"])
+            return httpx.Response(200, json={"id": f"file-{len(uploads)}"})
+        sent.append((request.headers["authorization"], json.loads(request.content)))
+        return httpx.Response(200, json={"output": [], "usage": {}})
+
+    body = _message("data:image/png;base64," + BIG)
+    mock_upstream(handler)
+    app.state.images = ImageStore(max_entries=8)
+    for key in ("Bearer tenant-a", "Bearer tenant-b", "Bearer tenant-a"):
+        client.post("/v1/chat/completions", json=body, headers={"Authorization": key})
+
+    assert uploads == ["Bearer tenant-a", "Bearer tenant-b"]
+    file_ids = [(key, payload["input"][0]["content"][1]["file_id"]) for key, payload in sent]
+    assert file_ids == [("Bearer tenant-a", "file-1"), ("Bearer tenant-b", "file-2"), ("Bearer tenant-a", "file-1")]
+
+
+def _two_upstreams():
+    return Settings(upstreams='[{"name": "a", "url": "http://a.test"}, {"name": "b", "url": "http://b.test"}]')
+
+
+def test_request_goes_to_the_upstream_that_holds_its_files(client, mock_upstream):
+    sent = []
+
+    def handler(request):
+        if request.url.path == "/v1/files":
+            # Steer the balancer away from the upload target; the reply must still follow the file.
+            pool.named(request.url.host.split(".")[0]).weight = 0.001
+            return httpx.Response(200, json={"id": f"file-{request.url.host}"})
+        sent.append((request.url.host, json.loads(request.content)))
+        return httpx.Response(200, json={"output": [], "usage": {}})
+
+    pool = mock_upstream(handler, _two_upstreams())
+    app.state.images = ImageStore(max_entries=8)
+    response = client.post("/v1/chat/completions", json=_message("data:image/png;base64," + BIG))
+
+    assert response.status_code == 200
+    host, payload = sent[0]
+    assert payload["input"][0]["content"][1]["file_id"] == f"file-{host}"
+
+
+def test_rejected_file_reference_is_resent_inline(client, mock_upstream):
+    uploads = []
+    sent = []
+
+    def handler(request):
+        if request.url.path == "/v1/files":
+            uploads.append(request.url.host)
+            return httpx.Response(200, json={"id": f"file-{len(uploads)}"})
+        payload = json.loads(request.content)
+        sent.append(payload)
+        if "file_id" in payload["input"][0]["content"][1] and len(sent) == 1:
+            return httpx.Response(404, json={"error": {"message": "No such File object"}})
+        return httpx.Response(200, json={"output": [], "usage": {}})
+
+    body = _message("data:image/png;base64," + BIG)
+    mock_upstream(handler, _two_upstreams())
+    app.state.images = ImageStore(max_entries=8)
+    first = client.post("/v1/chat/completions", json=body)
+    second = client.post("/v1/chat/completions", json=body)
+
+    assert [first.status_code, second.status_code] == [200, 200]
+    assert sent[0]["input"][0]["content"][1]["file_id"] == "file-1"
+    assert sent[1]["input"][0]["content"][1]["image_url"].endswith(BIG[-16:])
+    # The refused file id was forgotten, so the next request uploads afresh.
+    assert len(uploads) == 2
+    assert sent[2]["input"][0]["content"][1]["file_id"] == "file-2"
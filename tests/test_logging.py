@@ -0,0 +1,118 @@
+import io
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import httpx
+import structlog
+
+from openai_responses_bridge.config import settings
+from openai_responses_bridge.logging_setup import (
+    configure_logging,
+    flush_logging,
+    logging_stats,
+    parse_sample_rates,
+)
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+class SlowStream(io.StringIO):
+    def __init__(self, delay):
+        super().__init__()
+        self.delay = delay
+        self.writers = set()
+
+    def write(self, text):
+        self.writers.add(threading.get_ident())
+        time.sleep(self.delay)
+        return super().write(text)
+
+
+def _restore():
+    configure_logging(settings.log_level, settings.log_queue_size, settings.log_sample_rates)
+
+
+def test_slow_sink_does_not_block_callers_and_counts_drops():
+    stream = SlowStream(0.05)
+    configure_logging("INFO", queue_size=5, stream=stream)
+    try:
+        logger = structlog.get_logger("sink-test")
+        started = time.perf_counter()
+        for index in range(50):
+            logger.info("sink.test", index=index)
+        elapsed = time.perf_counter() - started
+        dropped = logging_stats()["dropped"]
+        flush_logging()
+    finally:
+        _restore()
+
+    assert elapsed < 0.5
+    assert dropped > 0
+    assert threading.get_ident() not in stream.writers
+    records = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert records[0]["event"] == "sink.test"
+    assert records[0]["level"] == "info"
+    assert "timestamp" in records[0]
+
+
+def test_sampling_skips_info_events_but_never_errors():
+    stream = io.StringIO()
+    configure_logging("INFO", sample_rates="noisy.event=0, sampled.event=1.0", stream=stream)
+    try:
+        logger = structlog.get_logger("sample-test")
+        before = logging_stats()["sampled_out"]
+        for _ in range(10):
+            logger.info("noisy.event")
+            logger.error("noisy.event", status=500)
+            logger.info("sampled.event")
+        skipped = logging_stats()["sampled_out"] - before
+        flush_logging()
+    finally:
+        _restore()
+
+    records = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert skipped == 10
+    assert sum(record["event"] == "noisy.event" and record["level"] == "error" for record in records) == 10
+    assert sum(record["event"] == "sampled.event" for record in records) == 10
+    assert not any(record["event"] == "noisy.event" and record["level"] == "info" for record in records)
+
+
+def test_parse_sample_rates_clamps_and_skips_bad_entries():
+    assert parse_sample_rates("a=0.1, b=5, c=x, ") == {"a": 0.1, "b": 1.0}
+
+
+def test_sampled_upstream_response_keeps_server_errors(client, mock_upstream):
+    statuses = iter([200, 502])
+
+    def handler(request):
+        return httpx.Response(next(statuses), json={"output": [], "usage": {}})
+
+    stream = io.StringIO()
+    payload = {"model": "m", "prompt": "x"}
+    mock_upstream(handler)
+    configure_logging("INFO", sample_rates="upstream.response=0", stream=stream)
+    try:
+        client.post("/v1/completions", json=payload)
+        client.post("/v1/completions", json=payload)
+        flush_logging()
+    finally:
+        _restore()
+
+    records = [json.loads(line) for line in stream.getvalue().splitlines()]
+    upstream = [record for record in records if record["event"] == "upstream.response"]
+    assert [(record["status"], record["level"]) for record in upstream] == [(502, "warning")]
+
+
+def test_importing_the_app_leaves_logging_alone():
+    code = (
+        "import logging, threading; import openai_responses_bridge.main; "
+        "print(len(logging.getLogger().handlers), threading.active_count())"
+    )
+    env = {**os.environ, "PYTHONPATH": str(ROOT / "src")}
+    result = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True)
+    assert result.stdout.split() == ["0", "1"]
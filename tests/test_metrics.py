@@ -0,0 +1,116 @@
+import httpx
+
+from openai_responses_bridge import metrics
+from openai_responses_bridge.main import app
+from openai_responses_bridge.metrics import Histogram, RequestTimer, SlowRequests
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("demo_seconds", "Demo.", ("route",), buckets=(0.1, 1.0))
+    child = histogram.labels("chat")
+    for value in (0.05, 0.5, 5.0):
+        child.observe(value)
+
+    lines = histogram.render()
+    assert 'demo_seconds_bucket{route="chat",le="0.1"} 1' in lines
+    assert 'demo_seconds_bucket{route="chat",le="1"} 2' in lines
+    assert 'demo_seconds_bucket{route="chat",le="+Inf"} 3' in lines
+    assert 'demo_seconds_count{route="chat"} 3' in lines
+
+
+def test_request_timer_records_first_token_then_gaps():
+    timer = RequestTimer("unit")
+    timer.begin("m")
+    timer.token()
+    timer.token()
+    timer.finish(200)
+    timer.finish(200)
+
+    assert metrics.TTFT_SECONDS.labels("unit", "m").count == 1
+    assert metrics.TOKEN_GAP_SECONDS.labels("unit", "m").count == 1
+    assert metrics.REQUESTS_TOTAL.labels("unit", "m", 200).value == 1
+    assert metrics.IN_FLIGHT.labels("unit", "m").value == 0
+
+
+def test_metrics_endpoint_reports_stream_by_route_and_model(client, mock_upstream):
+    events = (
+        b'data: {"type":"response.output_text.delta","delta":"a"}\n\n'
+        b'data: {"type":"response.output_text.delta","delta":"b"}\n\n'
+        b'data: {"type":"response.completed"}\n\n'
+    )
+
+    def handler(request):
+        return httpx.Response(200, content=events, headers={"Content-Type": "text/event-stream"})
+
+    mock_upstream(handler)
+    app.state.metric_models = frozenset({"metrics-model"})
+    payload = {"model": "metrics-model", "stream": True, "messages": [{"role": "user", "content": "x"}]}
+    client.post("/v1/chat/completions", json=payload)
+    client.post("/v1/chat/completions", json={**payload, "model": "unlisted-model-123"})
+    body = client.get("/metrics").text
+
+    assert "unlisted-model-123" not in body
+    assert 'bridge_requests_total{route="chat",model="other",status="200"}' in body
+    labels = 'route="chat",model="metrics-model"'
+    assert f"bridge_time_to_first_token_seconds_count{{{labels}}} 1" in body
+    assert f"bridge_inter_token_seconds_count{{{labels}}} 1" in body
+    assert f'bridge_requests_total{{{labels},status="200"}} 1' in body
+    assert f"bridge_requests_in_flight{{{labels}}} 0" in body
+    assert 'stage="build_responses_request"' in body
+
+
+def test_responses_stream_times_only_text_deltas(client, mock_upstream):
+    events = (
+        b'data: {"type":"response.created"}\n\n'
+        b'data: {"type":"response.output_text.delta","delta":"a"}\n\n'
+        b'data: {"type":"response.output_item.added"}\n\n'
+        b'data: {"type":"response.output_text.delta","delta":"b"}\n\n'
+        b'data: {"type":"response.completed"}\n\n'
+    )
+
+    def handler(request):
+        return httpx.Response(200, content=events, headers={"Content-Type": "text/event-stream"})
+
+    mock_upstream(handler)
+    app.state.metric_models = frozenset({"delta-model"})
+    payload = {"model": "delta-model", "stream": True, "input": "x"}
+    response = client.post("/v1/responses", json=payload)
+    body = client.get("/metrics").text
+
+    assert response.content == events
+    labels = 'route="responses",model="delta-model"'
+    assert f"bridge_time_to_first_token_seconds_count{{{labels}}} 1" in body
+    assert f"bridge_inter_token_seconds_count{{{labels}}} 1" in body
+
+
+def test_server_timing_header_and_slow_request_log(client, mock_upstream):
+    def handler(request):
+        body = {"output": [{"content": [{"type": "output_text", "text": "ok"}]}], "usage": {}}
+        return httpx.Response(200, json=body)
+
+    mock_upstream(handler)
+    app.state.metric_models = frozenset({"timing-model"})
+    payload = {"model": "timing-model", "messages": [{"role": "user", "content": "x"}]}
+    response = client.post("/v1/chat/completions", json=payload)
+    slow = client.get("/debug/slow").json()
+
+    names = [part.split(";")[0] for part in response.headers["Server-Timing"].split(", ")]
+    assert names == ["parse", "build_responses_request", "acquire", "ttfb", "to_chat", "total"]
+    entry = next(item for item in slow["requests"] if item["model"] == "timing-model")
+    assert entry["route"] == "chat"
+    assert entry["status"] == 200
+    assert entry["request_bytes"] > 0
+    assert entry["response_bytes"] == len(response.content)
+    assert set(entry["phases_ms"]) == set(names) - {"total"}
+
+
+def test_slow_requests_keeps_slowest_within_window():
+    now = [1000.0]
+    slow = SlowRequests(size=2, window=60, clock=lambda: now[0])
+    for total in (0.1, 0.5, 0.3, 0.05):
+        timer = RequestTimer("unit")
+        slow.record(timer, 200, total)
+
+    assert [entry["total_ms"] for entry in slow.snapshot()] == [500.0, 300.0]
+    now[0] += 61
+    assert slow.snapshot() == []
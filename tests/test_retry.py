@@ -0,0 +1,140 @@
+import asyncio
+
+import httpx
+
+from openai_responses_bridge.config import Settings
+from openai_responses_bridge.main import app
+from openai_responses_bridge.retry import RetryBudget, RetryPolicy, retry_after_seconds
+
+
+def _response_body(text):
+    return {
+        "id": "resp-1",
+        "output": [{"content": [{"type": "output_text", "text": text}]}],
+        "usage": {"input_tokens": 1, "output_tokens": 1},
+    }
+
+
+def test_chat_retries_retryable_status_and_honours_retry_after(client, mock_upstream):
+    statuses = iter([429, 503, 200])
+    seen = []
+
+    def handler(request):
+        status = next(statuses)
+        seen.append(status)
+        if status != 200:
+            return httpx.Response(status, headers={"Retry-After": "0"}, text="busy")
+        return httpx.Response(200, json=_response_body("ok"))
+
+    mock_upstream(handler)
+    app.state.retry = RetryPolicy(Settings(retry_max_attempts=3))
+    payload = {"model": "m", "messages": [{"role": "user", "content": "x"}]}
+    response = client.post("/v1/chat/completions", json=payload)
+    stats = client.get("/debug/retry").json()
+
+    assert response.status_code == 200
+    assert response.json()["choices"][0]["message"]["content"] == "ok"
+    assert seen == [429, 503, 200]
+    assert stats["retries"] == 2
+
+
+def test_retries_stop_at_max_attempts_and_skip_client_errors(client, mock_upstream):
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.path)
+        return httpx.Response(400 if len(calls) > 10 else 502, text="bad")
+
+    mock_upstream(handler)
+    app.state.retry = RetryPolicy(Settings(retry_max_attempts=2, retry_backoff_base=0.0))
+    response = client.post("/v1/completions", json={"model": "m", "prompt": "x"})
+
+    assert response.status_code == 502
+    assert len(calls) == 2
+
+
+def test_retry_budget_limits_extra_attempts():
+    now = [0.0]
+    budget = RetryBudget(ratio=0.5, min_per_second=0.0, clock=lambda: now[0])
+    budget.balance = 1.0
+
+    assert budget.withdraw() is True
+    assert budget.withdraw() is False
+    budget.deposit()
+    budget.deposit()
+    assert budget.withdraw() is True
+    assert budget.denied == 1
+
+
+def test_retry_after_accepts_seconds_and_dates():
+    assert retry_after_seconds("2.5") == 2.5
+    assert retry_after_seconds("Thu, 01 Jan 1970 00:00:00 GMT") == 0.0
+    assert retry_after_seconds("soon") is None
+    assert retry_after_seconds(None) is None
+
+
+def test_hedge_returns_fast_leg_and_cancels_slow_one():
+    policy = RetryPolicy(Settings(hedge_enabled=True, hedge_min_delay=0.01))
+    for _ in range(policy.latencies.min_samples):
+        policy.latencies.add(0.01)
+    cancelled = []
+    calls = 0
+
+    async def attempt():
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+        return httpx.Response(200, text=f"leg-{calls}")
+
+    response = asyncio.run(policy.call(attempt))
+
+    assert response.text == "leg-2"
+    assert cancelled == [True]
+    assert policy.hedges == 1
+    assert policy.hedge_wins == 1
+
+
+def test_retry_after_longer_than_backoff_cap_is_returned_not_retried(client, mock_upstream):
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(429, headers={"Retry-After": "30"}, text="slow down")
+
+    mock_upstream(handler)
+    app.state.retry = RetryPolicy(Settings(retry_max_attempts=3))
+    response = client.post("/v1/completions", json={"model": "m", "prompt": "x"})
+
+    assert response.status_code == 429
+    assert len(calls) == 1
+
+
+def test_hedge_prefers_successful_leg_when_both_finish_together():
+    policy = RetryPolicy(Settings(hedge_enabled=True, hedge_min_delay=0.01))
+    for _ in range(policy.latencies.min_samples):
+        policy.latencies.add(0.01)
+    calls = 0
+
+    async def run():
+        gate = asyncio.Event()
+
+        async def attempt():
+            nonlocal calls
+            calls += 1
+            if calls == 1:
+                await gate.wait()
+                raise httpx.ConnectError("reset")
+            gate.set()
+            return httpx.Response(200, text="hedge")
+
+        return await policy.call(attempt)
+
+    response = asyncio.run(run())
+
+    assert response.text == "hedge"
+    assert policy.hedge_wins == 1
@@ -0,0 +1,75 @@
+import json
+import os
+
+import httpx
+
+from openai_responses_bridge.config import Settings
+from openai_responses_bridge.main import app
+from openai_responses_bridge.routing import Router, RoutingTable
+
+
+def test_exact_rules_win_then_patterns_in_order():
+    table = RoutingTable.from_sources(
+        {"gpt-3.5-turbo": "gpt-4.1-mini"},
+        {
+            "routes": [
+                {"match": "gpt-4o", "model": "gpt-4.1", "timeout": 90},
+                {"match": "gpt-4o-*", "model": "gpt-4.1-mini"},
+                {"match": "gpt-4*", "upstream": "eu"},
+                {"match": "o[13]-??", "params": {"reasoning": {"effort": "low"}}},
+            ]
+        },
+    )
+
+    assert table.resolve("gpt-4o") == ("gpt-4.1", None, 90.0, {}, {})
+    assert table.resolve("gpt-4o-mini").model == "gpt-4.1-mini"
+    assert table.resolve("gpt-4-turbo").upstream == "eu"
+    assert table.resolve("o3-hi").params == {"reasoning": {"effort": "low"}}
+    assert table.resolve("gpt-3.5-turbo").model == "gpt-4.1-mini"
+    assert table.resolve("claude").model is None
+    assert table.aliases() == {"gpt-4o": "gpt-4.1", "gpt-3.5-turbo": "gpt-4.1-mini"}
+
+
+def test_reload_swaps_table_and_keeps_old_one_on_bad_file(tmp_path):
+    path = tmp_path / "routes.json"
+    path.write_text(json.dumps([{"match": "a", "model": "b"}]))
+    router = Router({}, str(path))
+    old_table = router.table
+
+    path.write_text(json.dumps([{"match": "a", "model": "c"}]))
+    os.utime(path, (1, 1))
+    assert router.reload() is True
+    assert router.table is not old_table
+    assert old_table.resolve("a").model == "b"
+    assert router.table.resolve("a").model == "c"
+
+    path.write_text("{not json")
+    assert router.reload() is False
+    assert router.table.resolve("a").model == "c"
+    assert router.stats()["errors"] == 1
+
+
+def test_route_picks_upstream_timeout_and_default_params(tmp_path, client, mock_upstream):
+    path = tmp_path / "routes.json"
+    path.write_text(
+        json.dumps(
+            [{"match": "fast-*", "model": "small", "upstream": "b", "timeout": 7, "params": {"temperature": 0.1}}]
+        )
+    )
+    seen = []
+
+    def handler(request):
+        seen.append((request.url.host, json.loads(request.content), request.extensions["timeout"]["read"]))
+        return httpx.Response(200, json={"output": [], "usage": {}})
+
+    upstreams = '[{"name": "a", "url": "http://a.test"}, {"name": "b", "url": "http://b.test"}]'
+    mock_upstream(handler, Settings(upstreams=upstreams))
+    app.state.router = Router({}, str(path))
+    client.post("/v1/completions", json={"model": "fast-1", "prompt": "x"})
+    client.post("/v1/completions", json={"model": "fast-1", "prompt": "x", "temperature": 0.9})
+
+    assert [host for host, _, _ in seen] == ["b.test", "b.test"]
+    assert seen[0][1]["model"] == "small"
+    assert seen[0][1]["temperature"] == 0.1
+    assert seen[1][1]["temperature"] == 0.9
+    assert seen[0][2] == 7.0
@@ -0,0 +1,149 @@
+import asyncio
+import json
+
+from openai_responses_bridge.streaming import (
+    SSEParser,
+    parse_coalesce,
+    stream_chat_completions,
+    stream_completions,
+)
+
+
+def _chunks(raw, size):
+    async def gen():
+        for i in range(0, len(raw), size):
+            yield raw[i:i + size]
+
+    return gen()
+
+
+def _collect(stream):
+    async def run():
+        return [frame async for frame in stream]
+
+    return asyncio.run(run())
+
+
+def _frames(frames):
+    return [frame for frame in b"".join(frames).split(b"\n\n") if frame]
+
+
+UPSTREAM = (
+    b'event: response.created\ndata: {"type":"response.created","response":{}}\n\n'
+    b'event: response.output_text.delta\ndata: {"type":"response.output_text.delta","delta":"He said \\"hi\\\\\\""}\n\n'
+    b'data: {"type": "response.output_text.delta", "delta": "\\u4f60\\u597d"}\r\n\r\n'
+    b'data: {"type":"response.output_text.delta","delta":"","text":"fallback"}\n\n'
+    b'data: {"type":"response.completed","response":{"output":[{"type":"message"}]}}\n\n'
+)
+
+
+def test_parser_handles_events_split_across_chunks():
+    for size in (1, 3, 7, len(UPSTREAM)):
+        parser = SSEParser()
+        events = []
+        for i in range(0, len(UPSTREAM), size):
+            events.extend(parser.feed(UPSTREAM[i:i + size]))
+        events.extend(parser.close())
+
+        assert [name for name, _ in events] == [b"response.created", b"response.output_text.delta", b"", b"", b""]
+        assert json.loads(events[2][1])["delta"] == "你好"
+
+
+def test_stream_chat_completions_emits_templated_chunks():
+    frames = _frames(_collect(stream_chat_completions(_chunks(UPSTREAM, 5))))
+
+    decoded = [json.loads(frame[6:]) for frame in frames[:-1]]
+    assert [chunk["choices"][0]["delta"].get("content") for chunk in decoded] == [
+        'He said "hi\\"',
+        "你好",
+        "fallback",
+        None,
+    ]
+    assert decoded[-1]["choices"][0]["finish_reason"] == "stop"
+    assert decoded[0]["object"] == "chat.completion.chunk"
+    assert frames[-1] == b"data: [DONE]"
+
+
+def test_stream_completions_handles_trailing_event_without_blank_line():
+    raw = b'data: {"type":"response.output_text.delta","delta":"a"}\n\ndata: [DONE]'
+    frames = _frames(_collect(stream_completions(_chunks(raw, 4))))
+
+    assert json.loads(frames[0][6:])["choices"][0]["text"] == "a"
+    assert frames[-1] == b"data: [DONE]"
+
+
+def test_coalescing_merges_deltas_and_flushes_on_completion():
+    merged = []
+    frames = _frames(
+        _collect(stream_chat_completions(_chunks(UPSTREAM, 5), coalesce=(1024, 10.0), on_frame=merged.append))
+    )
+
+    decoded = [json.loads(frame[6:]) for frame in frames[:-1]]
+    assert decoded[0]["choices"][0]["delta"]["content"] == 'He said "hi\\"你好fallback'
+    assert decoded[1]["choices"][0]["finish_reason"] == "stop"
+    assert frames[-1] == b"data: [DONE]"
+    assert merged == [3]
+
+
+def test_coalescing_flushes_on_byte_threshold_and_timer():
+    async def slow():
+        for text in ("ab", "cd", "ef", "g"):
+            yield b'data: {"type":"response.output_text.delta","delta":"' + text.encode() + b'"}\n\n'
+        await asyncio.sleep(0.05)
+        yield b'data: {"type":"response.output_text.delta","delta":"h"}\n\n'
+        await asyncio.sleep(0.05)
+        yield b"data: [DONE]\n\n"
+
+    frames = _frames(_collect(stream_completions(slow(), coalesce=(4, 0.01))))
+
+    texts = [json.loads(frame[6:])["choices"][0]["text"] for frame in frames[:-1]]
+    assert texts == ["abcd", "efg", "h"]
+    assert frames[-1] == b"data: [DONE]"
+
+
+def test_coalescing_flushes_buffered_text_before_upstream_error():
+    async def broken():
+        yield b'data: {"type":"response.output_text.delta","delta":"partial"}\n\n'
+        raise ConnectionError("upstream went away")
+
+    async def run():
+        frames = []
+        try:
+            async for frame in stream_completions(broken(), coalesce=(1024, 10.0)):
+                frames.append(frame)
+        except ConnectionError:
+            return frames
+        raise AssertionError("error was swallowed")
+
+    frames = asyncio.run(run())
+    assert json.loads(_frames(frames)[0][6:])["choices"][0]["text"] == "partial"
+
+
+def test_closing_coalesced_stream_mid_read_closes_upstream():
+    closed = []
+
+    async def stalled():
+        try:
+            yield b'data: {"type":"response.output_text.delta","delta":"a"}\n\n'
+            await asyncio.sleep(10)
+        finally:
+            closed.append(True)
+
+    async def run():
+        stream = stream_completions(stalled(), coalesce=(1024, 0.01))
+        first = await stream.__anext__()
+        await stream.aclose()
+        return first, list(closed)
+
+    first, closed_on_return = asyncio.run(run())
+    assert json.loads(first[6:])["choices"][0]["text"] == "a"
+    assert closed_on_return == [True]
+
+
+def test_parse_coalesce_prefers_request_value_over_settings():
+    assert parse_coalesce(None, 0, 5.0) is None
+    assert parse_coalesce(None, 128, 5.0) == (128, 0.005)
+    assert parse_coalesce("off", 128, 5.0) is None
+    assert parse_coalesce("on", 0, 5.0) == (256, 0.005)
+    assert parse_coalesce("64:20", 0, 5.0) == (64, 0.02)
+    assert parse_coalesce("junk", 128, 5.0) == (128, 0.005)
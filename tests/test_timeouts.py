@@ -0,0 +1,143 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from openai_responses_bridge import main
+from openai_responses_bridge.coalesce import Coalescer, parse_routes
+from openai_responses_bridge.config import Settings
+from openai_responses_bridge.main import app
+from openai_responses_bridge.metrics import STREAM_TIMEOUTS
+from openai_responses_bridge.routing import Router
+from openai_responses_bridge.timeouts import PhaseTimeouts
+
+
+def _delta(text):
+    event = {"type": "response.output_text.delta", "delta": text}
+    return f"event: response.output_text.delta\ndata: {json.dumps(event)}\n\n".encode()
+
+
+def _stalling_handler(pauses):
+    def handler(request):
+        async def body():
+            for index, pause in enumerate(pauses):
+                yield _delta(f"t{index}")
+                await asyncio.sleep(pause)
+
+        return httpx.Response(200, content=body(), headers={"Content-Type": "text/event-stream"})
+
+    return handler
+
+
+def _events(text):
+    return [block for block in text.split("\n\n") if block]
+
+
+def test_phase_timeouts_fall_back_and_override():
+    settings = Settings(request_timeout=20, upstream_connect_timeout=2, stream_idle_timeout=0)
+    defaults = PhaseTimeouts.from_settings(settings)
+    assert defaults == PhaseTimeouts(connect=2.0, pool=10.0, ttfb=20.0, idle=None, total=None)
+
+    route = defaults.override(90, {"connect": 1, "total": 600})
+    assert route == PhaseTimeouts(connect=1.0, pool=10.0, ttfb=90.0, idle=90.0, total=600.0)
+    assert route.for_httpx().as_dict() == {"connect": 1.0, "read": 90.0, "write": 90.0, "pool": 10.0}
+    assert defaults.override(None, {}) is defaults
+
+
+def test_silent_upstream_gets_heartbeats_then_a_clean_idle_error(monkeypatch, client, mock_upstream):
+    monkeypatch.setattr(main.settings, "stream_heartbeat_interval", 0.1)
+    before = STREAM_TIMEOUTS.labels("chat", "idle").value
+    payload = {"model": "m", "stream": True, "messages": [{"role": "user", "content": "x"}]}
+    mock_upstream(_stalling_handler([0.35, 10]), Settings(stream_idle_timeout=0.5))
+    response = client.post("/v1/chat/completions", json=payload)
+
+    events = _events(response.text)
+    assert response.status_code == 200
+    assert events.count(": keep-alive") >= 4
+    contents = [json.loads(event[6:])["choices"][0]["delta"].get("content") for event in events if "choices" in event]
+    assert contents[-2:] == ["t0", "t1"]
+    assert json.loads(events[-2][6:])["error"]["code"] == "stream_idle"
+    assert events[-1] == "data: [DONE]"
+    assert STREAM_TIMEOUTS.labels("chat", "idle").value == before + 1
+
+
+def test_route_total_duration_ends_steady_stream(tmp_path, monkeypatch, client, mock_upstream):
+    monkeypatch.setattr(main.settings, "stream_heartbeat_interval", 0)
+    path = tmp_path / "routes.json"
+    path.write_text(json.dumps([{"match": "slow-*", "timeouts": {"total": 0.4}}]))
+    before = STREAM_TIMEOUTS.labels("completions", "total").value
+    handler = _stalling_handler([0.05] * 200)
+    mock_upstream(handler)
+    app.state.router = Router({}, str(path))
+    response = client.post("/v1/completions", json={"model": "slow-1", "prompt": "x", "stream": True})
+
+    events = _events(response.text)
+    assert ": keep-alive" not in events
+    assert 3 < sum("choices" in event for event in events) < 20
+    assert json.loads(events[-2][6:])["error"]["code"] == "stream_total"
+    assert events[-1] == "data: [DONE]"
+    assert STREAM_TIMEOUTS.labels("completions", "total").value == before + 1
+
+
+def test_responses_passthrough_ends_with_error_event(monkeypatch, client, mock_upstream):
+    monkeypatch.setattr(main.settings, "stream_heartbeat_interval", 0)
+    handler = _stalling_handler([10])
+    mock_upstream(handler, Settings(stream_idle_timeout=0.2))
+    response = client.post("/v1/responses", json={"model": "m", "input": "x", "stream": True})
+
+    events = _events(response.text)
+    assert events[0].startswith("event: response.output_text.delta")
+    assert events[-1].startswith("event: error\ndata: ")
+    assert json.loads(events[-1].split("data: ", 1)[1])["code"] == "stream_idle"
+
+
+def test_coalesced_stream_timeout_ends_with_error_frame(monkeypatch, client, mock_upstream):
+    monkeypatch.setattr(main.settings, "stream_heartbeat_interval", 0)
+
+    def handler(request):
+        async def body():
+            yield _delta("t0")
+            raise httpx.ReadTimeout("stalled")
+
+        return httpx.Response(200, content=body(), headers={"Content-Type": "text/event-stream"})
+
+    payload = {"model": "m", "stream": True, "messages": [{"role": "user", "content": "x"}]}
+    mock_upstream(handler)
+    app.state.coalescer = Coalescer(parse_routes("chat"))
+    response = client.post("/v1/chat/completions", json=payload)
+
+    events = _events(response.text)
+    assert json.loads(events[0][6:])["choices"][0]["delta"]["content"] == "t0"
+    assert json.loads(events[-2][6:])["error"]["code"] == "stream_idle"
+    assert events[-1] == "data: [DONE]"
+
+
+@pytest.mark.parametrize("coalesce", ["", "chat"])
+@pytest.mark.parametrize("error", [httpx.RemoteProtocolError, httpx.ReadError])
+def test_mid_stream_upstream_failure_ends_with_error_frame(monkeypatch, client, mock_upstream, coalesce, error):
+    monkeypatch.setattr(main.settings, "stream_heartbeat_interval", 0)
+
+    def handler(request):
+        async def body():
+            yield _delta("t0")
+            raise error("connection dropped")
+
+        return httpx.Response(200, content=body(), headers={"Content-Type": "text/event-stream"})
+
+    payload = {"model": "m", "stream": True, "messages": [{"role": "user", "content": "x"}]}
+    mock_upstream(handler)
+    app.state.coalescer = Coalescer(parse_routes(coalesce))
+    chat = client.post("/v1/chat/completions", json=payload)
+    responses = client.post("/v1/responses", json={"model": "m", "input": "x", "stream": True})
+
+    events = _events(chat.text)
+    assert json.loads(events[0][6:])["choices"][0]["delta"]["content"] == "t0"
+    assert json.loads(events[-2][6:])["error"] == {
+        "message": "upstream stream ended unexpectedly",
+        "type": "upstream_error",
+        "code": "stream_upstream_error",
+    }
+    assert events[-1] == "data: [DONE]"
+    events = _events(responses.text)
+    assert json.loads(events[-1].split("data: ", 1)[1])["code"] == "stream_upstream_error"
@@ -0,0 +1,100 @@
+import asyncio
+
+import httpx
+
+from openai_responses_bridge.config import Settings
+from openai_responses_bridge.upstream import UpstreamPool
+
+
+def _response_body(text):
+    return {
+        "id": "resp-1",
+        "output": [{"content": [{"type": "output_text", "text": text}]}],
+        "usage": {"input_tokens": 1, "output_tokens": 1},
+    }
+
+
+def test_handlers_share_one_upstream_client(client, mock_upstream):
+    seen = []
+
+    def handler(request):
+        seen.append(request.url.path)
+        if request.url.path.endswith("/models"):
+            return httpx.Response(200, json={"data": []})
+        return httpx.Response(200, json=_response_body("hi"))
+
+    pool = mock_upstream(handler)
+    upstream_client = pool.client
+
+    chat = client.post("/v1/chat/completions", json={"model": "m", "messages": [{"role": "user", "content": "x"}]})
+    client.get("/v1/models")
+
+    assert chat.json()["choices"][0]["message"]["content"] == "hi"
+    assert pool.client is upstream_client
+    assert seen == ["/v1/responses", "/v1/models"]
+    stats = client.get("/debug/pool").json()
+    assert stats["requests_total"] == 2
+    assert stats["pending_requests"] == 0
+
+
+def test_pool_limits_come_from_settings():
+    pool = UpstreamPool(Settings(upstream_max_connections=7, upstream_max_keepalive_connections=3))
+    stats = pool.stats()
+
+    assert stats["max_connections"] == 7
+    assert stats["max_keepalive_connections"] == 3
+    assert stats["connections"] == 0
+
+
+def _multi_settings(**kwargs):
+    upstreams = '[{"name": "a", "url": "http://a.test"}, {"name": "b", "url": "http://b.test/v1", "weight": 2}]'
+    return Settings(upstreams=upstreams, **kwargs)
+
+
+async def _chunks():
+    yield b"data: x\n\n"
+
+
+def test_least_outstanding_balancing_keeps_streams_sticky():
+    hosts = []
+
+    def handler(request):
+        hosts.append((request.url.host, request.url.path))
+        return httpx.Response(200, content=_chunks())
+
+    async def run():
+        pool = UpstreamPool(_multi_settings(), transport=httpx.MockTransport(handler))
+        first = await pool.request("POST", "/v1/responses", stream=True)
+        second = await pool.request("POST", "/v1/responses", stream=True)
+        outstanding = [upstream.outstanding for upstream in pool.upstreams]
+        await first.aread()
+        await first.aclose()
+        await second.aclose()
+        released = [upstream.outstanding for upstream in pool.upstreams]
+        await pool.close()
+        return outstanding, released
+
+    outstanding, released = asyncio.run(run())
+    assert hosts == [("b.test", "/v1/responses"), ("a.test", "/v1/responses")]
+    assert outstanding == [1, 1]
+    assert released == [0, 0]
+
+
+def test_circuit_breaker_ejects_failing_upstream():
+    def handler(request):
+        if request.url.host == "b.test":
+            return httpx.Response(503)
+        return httpx.Response(200, json={})
+
+    async def run():
+        pool = UpstreamPool(_multi_settings(upstream_failure_threshold=2), transport=httpx.MockTransport(handler))
+        statuses = [(await pool.request("GET", "/v1/models")).status_code for _ in range(4)]
+        stats = {item["name"]: item for item in pool.stats()["upstreams"]}
+        await pool.close()
+        return statuses, stats
+
+    statuses, stats = asyncio.run(run())
+    assert statuses == [503, 503, 200, 200]
+    assert stats["b"]["ejected"] is True
+    assert stats["b"]["ejections"] == 1
+    assert stats["a"]["ejected"] is False